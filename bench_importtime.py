@@ -0,0 +1,63 @@
+"""Startup regression benchmark for script.py.
+
+Runs ``python -X importtime`` on a fresh interpreter, reports the slowest
+imports and fails if importing script.py exceeds the budget or pulls in
+matplotlib. Usage:
+
+    python bench_importtime.py [--budget-ms 250] [--runs 5] [--top 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Importing script.py (numpy + geometry kernel, no matplotlib) must stay under this.
+DEFAULT_BUDGET_MS = 250
+FORBIDDEN_MODULES = ('matplotlib',)
+
+def measure_import(module='script'):
+    """Import module in a fresh interpreter; return {module_name: (self_us, cumulative_us)}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure script.py import time against a budget.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5, help="Best-of-N runs to smooth out noise.")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest imports to report.")
+    parser.add_argument('--module', default='script')
+    args = parser.parse_args(argv)
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    best = min(runs, key=lambda timings: timings[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    print(f"Import of {args.module}: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    print("Slowest imports (cumulative):")
+    top_level = [(name, cumulative) for name, (_, cumulative) in best.items() if name != args.module]
+    for name, cumulative in sorted(top_level, key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    forbidden = sorted(name for name in best if name.split('.')[0] in FORBIDDEN_MODULES)
+    if forbidden:
+        failures.append(f"forbidden modules imported at startup: {', '.join(forbidden[:5])}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""Batch grading runs: build and render many sizes across a process pool.
+
+    python pattern_batch.py --sizes S M L --chart --workers 4 --output-dir batch_output
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pattern_cache import (
+    DEFAULT_RENDER_CACHE_BYTES, DEFAULT_RENDER_CACHE_DIR, cached_build_polo_pattern, shared_render_cache,
+)
+from pattern_geometry import product_details
+from pattern_grading import GRADING_METHODS, SIZE_CHART_PATH, chart_size_jobs, size_measurements
+
+logger = logging.getLogger(__name__)
+
+def size_directory_name(size_name):
+    """Filesystem-safe directory name for a size label such as 'Men/Size/XS'.
+
+    Names made only of dots ('.', '..') would resolve outside the output
+    directory and are replaced like empty ones.
+    """
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', str(size_name)).strip('_')
+    return 'size' if not name or re.fullmatch(r'\.+', name) else name
+
+def process_size(job, output_dir='batch_output', render=True, fmt='png', tolerance='screen',
+                 render_cache_dir=None, render_cache_bytes=DEFAULT_RENDER_CACHE_BYTES, directory=None):
+    """Build (and optionally render) one size; returns a JSON-serialisable result dict.
+
+    job is a (size_name, measurements) pair. Failures are reported in the
+    result's 'error' field so one bad size does not abort the whole run.
+    Pages go to output_dir/directory (default: named after the size). With
+    render_cache_dir, pages are served from and stored in the worker's
+    shared_render_cache, a directory shared by all workers.
+    """
+    size_name, measurements = job
+    started = time.perf_counter()
+    result = {'size': size_name, 'outputs': [], 'product_details': None, 'timings': {}, 'error': None}
+    try:
+        geometry = cached_build_polo_pattern(measurements, size_name)
+        result['timings']['geometry_s'] = time.perf_counter() - started
+        result['product_details'] = product_details(measurements, geometry.derived)
+        if render:
+            # Imported here so --no-render workers never load matplotlib.
+            from script import render_pattern_pages
+            render_started = time.perf_counter()
+            size_dir = os.path.join(output_dir, size_directory_name(directory or size_name))
+            os.makedirs(size_dir, exist_ok=True)
+            cache = shared_render_cache(render_cache_dir, render_cache_bytes) if render_cache_dir else None
+            for filename, data in render_pattern_pages(geometry, tolerance, fmt, cache=cache):
+                path = os.path.join(size_dir, filename)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                result['outputs'].append(path)
+            result['timings']['render_s'] = time.perf_counter() - render_started
+    except Exception as e:
+        logger.error(f"Error processing size {size_name}: {e}")
+        result['error'] = str(e)
+    result['timings']['total_s'] = time.perf_counter() - started
+    return result
+
+def skipped_result(size_name, reason):
+    """Result dict for a size that was not processed, e.g. a chart row outside the graded range."""
+    return {'size': size_name, 'outputs': [], 'product_details': None, 'timings': {}, 'error': None,
+            'skipped': reason}
+
+def _process_size_star(args):
+    # ProcessPoolExecutor.map passes one argument; unpack (job, options) here.
+    job, options = args
+    return process_size(job, **options)
+
+def run_batch(jobs, workers=None, chunksize=1, output_dir='batch_output', render=True, fmt='png', tolerance='screen',
+              render_cache_dir=None, render_cache_bytes=DEFAULT_RENDER_CACHE_BYTES):
+    """Process (size_name, measurements) jobs across a process pool; yields results in job order.
+
+    workers=None uses one process per CPU; workers=1 runs inline without a pool.
+    """
+    try:
+        options = dict(output_dir=output_dir, render=render, fmt=fmt, tolerance=tolerance,
+                       render_cache_dir=render_cache_dir, render_cache_bytes=render_cache_bytes)
+        tasks = ((job, options) for job in jobs)
+        if workers == 1:
+            yield from map(_process_size_star, tasks)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(_process_size_star, tasks, chunksize=chunksize)
+    except Exception as e:
+        logger.error(f"Error running batch: {e}")
+        raise
+
+def collect_jobs(sizes=(), measurement_files=(), chart_path=None, grading='linear', skipped=None):
+    """Build the job list from predefined size names, JSON measurement files and the size chart.
+
+    Sizes are predefined or graded chart sizes (see
+    pattern_grading.size_measurements); chart rows are graded with the given
+    method (see pattern_grading.GRADING_METHODS); rows that cannot be
+    graded are added to skipped, if given, as (label, reason).
+    """
+    try:
+        jobs = []
+        for size in sizes:
+            jobs.append(size_measurements(size, grading, chart_path or SIZE_CHART_PATH))
+        for path in measurement_files:
+            with open(path) as f:
+                data = json.load(f)
+            # Either a single measurement set or a {size_name: measurements} mapping.
+            if all(isinstance(v, dict) for v in data.values()):
+                jobs.extend((name, m) for name, m in data.items())
+            else:
+                jobs.append((os.path.splitext(os.path.basename(path))[0], data))
+        if chart_path:
+            jobs.extend(chart_size_jobs(chart_path, grading, skipped=skipped))
+        return jobs
+    except Exception as e:
+        logger.error(f"Error collecting batch jobs: {e}")
+        raise
+
+def main(argv=None):
+    """Command line entry point for batch grading runs."""
+    parser = argparse.ArgumentParser(description="Generate polo patterns for many sizes in parallel.")
+    parser.add_argument('--sizes', nargs='*', default=[], help="Predefined or graded sizes to generate (e.g. S M L 2XL).")
+    parser.add_argument('--measurements', nargs='*', default=[],
+                        help="JSON files holding a measurement set or a {size: measurements} mapping.")
+    parser.add_argument('--chart', nargs='?', const=SIZE_CHART_PATH, default=None,
+                        help="Grade every size chart row within the Men XS-4XL chest range (default: sizes.json); "
+                             "other rows are listed as skipped.")
+    parser.add_argument('--grading', default='linear', choices=GRADING_METHODS,
+                        help="Interpolate chart sizes linearly or with a monotone spline.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--chunksize', type=int, default=1, help="Jobs handed to a worker at a time.")
+    parser.add_argument('--output-dir', default='batch_output')
+    parser.add_argument('--format', default='png', choices=['png', 'pdf', 'svg'])
+    parser.add_argument('--tolerance', default='screen')
+    parser.add_argument('--no-render', action='store_true', help="Only compute geometry and product details.")
+    parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_DIR, default=None,
+                        help="Serve unchanged pages from this on-disk render cache directory.")
+    parser.add_argument('--render-cache-mb', type=float, default=DEFAULT_RENDER_CACHE_BYTES / 2**20,
+                        help="Size bound of the render cache in MiB.")
+    parser.add_argument('--results', default=None, help="Write all results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    skipped = []
+    jobs = collect_jobs(args.sizes, args.measurements, args.chart, args.grading, skipped)
+    if not jobs:
+        parser.error("nothing to do: give --sizes, --measurements and/or --chart")
+    started = time.perf_counter()
+    results = [skipped_result(label, reason) for label, reason in skipped]
+    for result in run_batch(jobs, args.workers, args.chunksize, args.output_dir,
+                            not args.no_render, args.format, args.tolerance,
+                            args.render_cache, int(args.render_cache_mb * 2**20)):
+        status = f"error: {result['error']}" if result['error'] else f"{result['timings']['total_s']:.2f}s"
+        logger.info(f"Size {result['size']}: {status}")
+        results.append(result)
+    failed = sum(1 for r in results if r['error'])
+    logger.info(f"Processed {len(results) - len(skipped)} sizes in {time.perf_counter() - started:.2f}s "
+                f"({failed} failed, {len(skipped)} chart rows skipped)")
+    if args.results:
+        with open(args.results, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""Caches for pattern geometry and rendered pages.
+
+Geometry is cached in-process, keyed by a canonical hash of the measurement
+set, so regenerating a standard size skips every Bezier and offset
+computation (pieces keep their flattened outlines and cut lines cached).
+Rendered pages are cached on disk, content-addressed by the measurements,
+renderer version and output options.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from pattern_geometry import MEASUREMENT_KEYS, PatternGeometry, build_polo_pattern
+
+logger = logging.getLogger(__name__)
+
+# Measurements are rounded before hashing so 20 and 20.0000000001 share an entry
+MEASUREMENT_PRECISION = 6
+EVICTION_POLICIES = ('lru', 'fifo')
+
+def canonical_measurements(measurements):
+    """The pattern measurement keys in a fixed order with rounded float values."""
+    try:
+        return [[key, round(float(measurements[key]), MEASUREMENT_PRECISION)] for key in MEASUREMENT_KEYS]
+    except Exception as e:
+        logger.error(f"Error canonicalising measurements: {e}")
+        raise
+
+def measurement_key(measurements, *extra):
+    """Stable hex digest of a measurement set plus any extra JSON-serialisable parts."""
+    try:
+        payload = json.dumps([canonical_measurements(measurements), list(extra)], separators=(',', ':'))
+        return hashlib.sha256(payload.encode()).hexdigest()
+    except Exception as e:
+        logger.error(f"Error hashing measurements: {e}")
+        raise
+
+class LRUCache:
+    """A bounded, thread-safe mapping with hit/miss/eviction counters.
+
+    policy 'lru' evicts the least recently used entry, 'fifo' the oldest
+    inserted one regardless of use.
+    """
+
+    def __init__(self, maxsize=128, policy='lru'):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}'. Choose from: {', '.join(EVICTION_POLICIES)}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the cached value (counting a hit) or default (counting a miss)."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                if self.policy == 'lru':
+                    self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store a value, evicting entries beyond maxsize."""
+        with self._lock:
+            self._data[key] = value
+            if self.policy == 'lru':
+                self._data.move_to_end(key)
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def resize(self, maxsize):
+        """Change the capacity, evicting entries if it shrinks."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Counters and occupancy as a dict."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._data), 'maxsize': self.maxsize, 'policy': self.policy}
+
+    def _evict(self):
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+GEOMETRY_CACHE = LRUCache(maxsize=128)
+
+def configure_geometry_cache(maxsize=None, policy=None):
+    """Resize the shared geometry cache or change its eviction policy."""
+    try:
+        if policy is not None:
+            if policy not in EVICTION_POLICIES:
+                raise ValueError(f"Unknown eviction policy '{policy}'. Choose from: {', '.join(EVICTION_POLICIES)}")
+            GEOMETRY_CACHE.policy = policy
+        if maxsize is not None:
+            GEOMETRY_CACHE.resize(maxsize)
+        return GEOMETRY_CACHE.stats()
+    except Exception as e:
+        logger.error(f"Error configuring geometry cache: {e}")
+        raise
+
+def cached_build_polo_pattern(measurements, size_name=None, cache=None):
+    """build_polo_pattern behind an LRU cache keyed by the canonical measurement hash.
+
+    The returned geometry is shared between callers and must be treated as
+    read-only. A hit for a different size label returns a relabelled view
+    sharing the same pieces.
+    """
+    try:
+        cache = GEOMETRY_CACHE if cache is None else cache
+        key = measurement_key(measurements)
+        geometry = cache.get_or_compute(key, lambda: build_polo_pattern(measurements, size_name))
+        if geometry.size_name != size_name:
+            geometry = PatternGeometry(size_name, geometry.measurements, geometry.pieces, geometry.derived)
+        return geometry
+    except Exception as e:
+        logger.error(f"Error building cached polo pattern: {e}")
+        raise
+
+DEFAULT_RENDER_CACHE_DIR = os.environ.get(
+    'POLO_RENDER_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'polo-sewing-pattern'))
+DEFAULT_RENDER_CACHE_BYTES = 512 * 1024 * 1024
+
+def render_cache_key(measurements, size_name, page, fmt, dpi, tolerance, renderer_version, backend=None):
+    """Content address of one rendered page.
+
+    backend names the writer when a format has more than one (SVG); it is
+    left out of the key otherwise, so existing entries keep their address.
+    """
+    parts = (size_name, page, fmt, dpi, tolerance, renderer_version)
+    return measurement_key(measurements, *parts, *((backend,) if backend is not None else ()))
+
+class DiskRenderCache:
+    """A size-bounded on-disk store of rendered page bytes.
+
+    Entries live at <directory>/<key[:2]>/<key>.<fmt>. Writes go to a
+    temporary file in the same directory and are moved into place with
+    os.replace, so readers (including other processes) never see a partial
+    file. Hits refresh the file's mtime; when the total size exceeds
+    max_bytes the entries with the oldest mtime are removed first.
+
+    The total is scanned from disk once, then kept as a running count
+    updated by put and evict; the directory is only scanned again when the
+    count goes over max_bytes, so a put does not cost a walk of the cache.
+    Writes by other processes are picked up at that rescan. Keep one
+    instance per process (see shared_render_cache) so the count survives
+    between jobs.
+    """
+
+    def __init__(self, directory=DEFAULT_RENDER_CACHE_DIR, max_bytes=DEFAULT_RENDER_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = None
+        self._lock = threading.Lock()
+
+    def path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f"{key}.{fmt}")
+
+    def get(self, key, fmt):
+        """Cached bytes for key, or None."""
+        path = self.path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Render cache read failed for {path}: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key, fmt, data):
+        """Atomically store bytes under key, then enforce the size bound."""
+        path = self.path(key, fmt)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._lock:
+                if self.total_bytes is None:
+                    self.total_bytes = sum(size for _, size, _ in self.entries())
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            with self._lock:
+                self.total_bytes += len(data) - replaced
+                if self.total_bytes > self.max_bytes:
+                    self.evict()
+        except Exception as e:
+            # The cache is an optimisation: a failed write must not fail the render.
+            logger.warning(f"Render cache write failed for {path}: {e}")
+
+    def entries(self):
+        """(mtime, size, path) for every cached file."""
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
+
+    def clear(self):
+        """Remove every cached entry."""
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self.total_bytes = 0
+
+    def stats(self):
+        entries = self.entries()
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes, 'directory': self.directory}
+
+_RENDER_CACHES = {}
+_RENDER_CACHES_LOCK = threading.Lock()
+
+def shared_render_cache(directory=DEFAULT_RENDER_CACHE_DIR, max_bytes=DEFAULT_RENDER_CACHE_BYTES):
+    """This process's DiskRenderCache for a directory and size bound, created on first use.
+
+    Batch and service workers call this per job, so the cache directory is
+    scanned once per worker rather than once per job.
+    """
+    key = (os.path.abspath(directory), max_bytes)
+    with _RENDER_CACHES_LOCK:
+        cache = _RENDER_CACHES.get(key)
+        if cache is None:
+            cache = _RENDER_CACHES[key] = DiskRenderCache(directory, max_bytes)
+        return cache
@@ -0,0 +1,316 @@
+"""DXF export in the AAMA/ASTM D6673 style for CAD systems and automated cutters.
+
+    python pattern_dxf.py --sizes S M L --output polo.dxf
+    python pattern_dxf.py --chart --sample-size M --output polo_graded.dxf
+
+Every piece of every size becomes a block holding its cut line (layer 1),
+sew line (14), grainline (7), notches (4), mirror line (6), internal lines
+(8), drill holes (13) and annotation text, and is inserted once in the
+ENTITIES section. The file is R12 (AC1009) ASCII DXF; R12 has no units
+header variable, so coordinates are in inches as AAMA readers assume and
+the header annotation says "Units: ENGLISH". It is written to a text
+stream as it is produced: sizes are drafted one at a time from an
+iterable and only each block's name and extent are kept for the
+insertions, so a long size run costs little more than the bytes written.
+"""
+import argparse
+import datetime
+import logging
+import re
+import sys
+import time
+
+import numpy as np
+
+from pattern_geometry import build_polo_pattern
+from pattern_layout import cutting_notes, piece_material
+
+logger = logging.getLogger(__name__)
+
+# AAMA/ASTM D6673 layer numbers: boundary, notches, mirror line, grain line,
+# internal lines, drill holes, sew lines and annotation text
+BOUNDARY_LAYER = '1'
+NOTCH_LAYER = '4'
+MIRROR_LAYER = '6'
+GRAIN_LAYER = '7'
+INTERNAL_LAYER = '8'
+DRILL_LAYER = '13'
+SEW_LAYER = '14'
+ANNOTATION_LAYER = '15'
+# DXF colour numbers per layer
+LAYER_COLOURS = {BOUNDARY_LAYER: 7, NOTCH_LAYER: 1, MIRROR_LAYER: 3, GRAIN_LAYER: 5, INTERNAL_LAYER: 2,
+                 DRILL_LAYER: 6, SEW_LAYER: 8, ANNOTATION_LAYER: 4}
+# Markings drawn on the mirror layer; every other line marking is an internal line
+MIRROR_MARKINGS = ('fold_line',)
+NOTCH_DEPTH = 0.25
+TEXT_HEIGHT = 0.25
+# Space between inserted pieces, and decimal places written for coordinates (inches)
+INSERT_GAP = 2.0
+PRECISION = 4
+
+class DxfWriter:
+    """Writes DXF group code / value pairs straight to a text stream."""
+    __slots__ = ('stream', 'precision')
+
+    def __init__(self, stream, precision=PRECISION):
+        self.stream = stream
+        self.precision = precision
+
+    def pairs(self, *pairs):
+        self.stream.write(''.join(f"{code}\n{value}\n" for code, value in pairs))
+
+    def begin_section(self, name):
+        self.pairs((0, 'SECTION'), (2, name))
+
+    def end_section(self):
+        self.pairs((0, 'ENDSEC'))
+
+    def header(self, variables):
+        """HEADER section from (name, group code, value) triples."""
+        self.begin_section('HEADER')
+        for name, code, value in variables:
+            self.pairs((9, name), (code, value))
+        self.end_section()
+
+    def tables(self, layers):
+        """TABLES section with the CONTINUOUS line type and the given {layer: colour}."""
+        self.begin_section('TABLES')
+        self.pairs((0, 'TABLE'), (2, 'LTYPE'), (70, 1),
+                   (0, 'LTYPE'), (2, 'CONTINUOUS'), (70, 0), (3, 'Solid line'), (72, 65), (73, 0), (40, 0.0),
+                   (0, 'ENDTAB'))
+        self.pairs((0, 'TABLE'), (2, 'LAYER'), (70, len(layers)))
+        for layer, colour in layers.items():
+            self.pairs((0, 'LAYER'), (2, layer), (70, 0), (62, colour), (6, 'CONTINUOUS'))
+        self.pairs((0, 'ENDTAB'))
+        self.end_section()
+
+    def begin_block(self, name):
+        self.pairs((0, 'BLOCK'), (8, '0'), (2, name), (70, 0), (10, 0.0), (20, 0.0), (30, 0.0), (3, name))
+
+    def end_block(self):
+        self.pairs((0, 'ENDBLK'), (8, '0'))
+
+    def polyline(self, points, layer, closed=True):
+        """A 2D polyline through points (an (N, 2) array), closed unless closed=False."""
+        coords = np.round(np.asarray(points, dtype=float), self.precision).tolist()
+        self.pairs((0, 'POLYLINE'), (8, layer), (66, 1), (70, 1 if closed else 0), (10, 0.0), (20, 0.0), (30, 0.0))
+        self.stream.write(''.join([f"0\nVERTEX\n8\n{layer}\n10\n{x}\n20\n{y}\n30\n0.0\n" for x, y in coords]))
+        self.pairs((0, 'SEQEND'), (8, layer))
+
+    def line(self, start, end, layer):
+        p = self.precision
+        self.pairs((0, 'LINE'), (8, layer), (10, round(start[0], p)), (20, round(start[1], p)), (30, 0.0),
+                   (11, round(end[0], p)), (21, round(end[1], p)), (31, 0.0))
+
+    def point(self, at, layer):
+        self.pairs((0, 'POINT'), (8, layer), (10, round(at[0], self.precision)), (20, round(at[1], self.precision)),
+                   (30, 0.0))
+
+    def text(self, at, text, layer, height=TEXT_HEIGHT, angle=0.0):
+        self.pairs((0, 'TEXT'), (8, layer), (10, round(at[0], self.precision)), (20, round(at[1], self.precision)),
+                   (30, 0.0), (40, height), (1, text), (50, angle))
+
+    def insert(self, name, at, layer='0'):
+        self.pairs((0, 'INSERT'), (8, layer), (2, name), (10, round(at[0], self.precision)),
+                   (20, round(at[1], self.precision)), (30, 0.0))
+
+    def close(self):
+        self.pairs((0, 'EOF'))
+
+def _dxf_name(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(text)).strip('_').upper()
+
+def size_tag(size_name, taken=()):
+    """DXF-safe tag for a size's block names, e.g. 'MEN_SIZE_M', numbered ('M_2') if already taken."""
+    base = _dxf_name(size_name) or 'SIZE'
+    tag, n = base, 1
+    while tag in taken:
+        n += 1
+        tag = f"{base}_{n}"
+    return tag
+
+def block_name(tag, piece_name):
+    """DXF-safe block name for one piece of one size (see size_tag), e.g. 'M-1_FRONT_BODY'."""
+    return f"{tag}-{_dxf_name(piece_name)}"
+
+def resolve_sample_size(sample_size, sizes):
+    """The size list entry naming the sample size: an exact label, or the unique label ending in it.
+
+    'M' resolves to 'Men/Size/M' in a chart export; raises ValueError when
+    nothing or more than one size matches.
+    """
+    if sample_size is None:
+        return sizes[0]
+    if sample_size in sizes:
+        return sample_size
+    wanted = str(sample_size).upper()
+    matches = [size for size in sizes if str(size).rsplit('/', 1)[-1].upper() == wanted]
+    if len(matches) != 1:
+        found = f"matches {', '.join(map(str, matches))}" if matches else "is not in the size list"
+        raise ValueError(f"Sample size '{sample_size}' {found}")
+    return matches[0]
+
+def notch_line(point, direction, cut):
+    """(start, end) of a notch cut NOTCH_DEPTH into the piece from the cut line.
+
+    Notches are stored on the sew line; cutters expect them on the
+    boundary, so the notch starts at the closest point of the cut line and
+    points back towards the sew line point (along direction, outward, when
+    the two coincide).
+    """
+    p = np.asarray(point, dtype=float)
+    a, b = cut, np.roll(cut, -1, axis=0)
+    edge = b - a
+    lengths = np.einsum('ij,ij->i', edge, edge)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.clip(np.einsum('ij,ij->i', p - a, edge) / lengths, 0.0, 1.0)
+    closest = a + np.nan_to_num(u)[:, None] * edge
+    start = closest[np.argmin(np.hypot(*(closest - p).T))]
+    inward = p - start
+    length = np.hypot(*inward)
+    if length < 1e-9:
+        inward, length = -np.asarray(direction, dtype=float), np.hypot(*direction)
+    return start.tolist(), (start + NOTCH_DEPTH * inward / length).tolist()
+
+def write_piece_block(dxf, piece, name, size_name, note, tolerance='print'):
+    """Write one piece as a block; returns the block's cut line extent ((x_min, y_min), (x_max, y_max))."""
+    sew = piece.outline(tolerance)
+    cut = piece.cut_line(tolerance=tolerance) if piece.allowances.any() else sew
+    dxf.begin_block(name)
+    dxf.polyline(cut, BOUNDARY_LAYER)
+    if cut is not sew:
+        dxf.polyline(sew, SEW_LAYER)
+    if piece.grainline is not None:
+        x, y_start, y_end = piece.grainline
+        dxf.line((x, y_start), (x, y_end), GRAIN_LAYER)
+    for point, direction in piece.notches:
+        dxf.line(*notch_line(point, direction, cut), NOTCH_LAYER)
+    for kind, data in piece.markings:
+        if kind == 'button':
+            dxf.point(data[0], DRILL_LAYER)
+        else:
+            dxf.polyline(data, MIRROR_LAYER if kind in MIRROR_MARKINGS else INTERNAL_LAYER, closed=False)
+    quantity = re.match(r'Cut (\d+)', note)
+    (x_min, y_min), (x_max, y_max) = piece.bounds
+    cx, y = (x_min + x_max) / 2, (y_min + y_max) / 2
+    annotations = [f"Piece Name: {piece.name}", f"Size: {size_name}",
+                   f"Quantity: {quantity.group(1) if quantity else 1}",
+                   f"Material: {piece_material(piece.name).upper()}"]
+    for i, text in enumerate(annotations):
+        dxf.text((cx, y - i * TEXT_HEIGHT * 1.6), text, BOUNDARY_LAYER)
+    dxf.text((cx, y - len(annotations) * TEXT_HEIGHT * 1.6), note, ANNOTATION_LAYER)
+    dxf.end_block()
+    return tuple(cut.min(axis=0).tolist()), tuple(cut.max(axis=0).tolist())
+
+def write_dxf(stream, geometries, style_name="Polo Shirt", sample_size=None, tolerance='print', created=None,
+              skipped=()):
+    """Write pattern geometries (any iterable, consumed once) as one AAMA-style DXF to a text stream.
+
+    Each geometry is one size; sample_size (default: the first) is recorded
+    as the base size of the grade and must name one of them (see
+    resolve_sample_size). skipped names sizes left out of the export (e.g.
+    chart rows outside the graded range); they are listed after the size
+    list. Returns a summary dict.
+    """
+    try:
+        created = created or datetime.datetime.now()
+        dxf = DxfWriter(stream)
+        # R12 drawings are unitless ($INSUNITS and $MEASUREMENT came later); the
+        # coordinates are inches, as AAMA readers assume, and the header text says ENGLISH.
+        dxf.header([('$ACADVER', 1, 'AC1009')])
+        dxf.tables({'0': 7, **LAYER_COLOURS})
+        dxf.begin_section('BLOCKS')
+        sizes, blocks, tags = [], [], set()
+        for geometry in geometries:
+            notes = cutting_notes(geometry)
+            # Sizes with the same name (from different measurement files) get distinct blocks.
+            tag = size_tag(geometry.size_name, tags)
+            tags.add(tag)
+            row = []
+            for piece in geometry.pieces.values():
+                name = block_name(tag, piece.name)
+                row.append((name, write_piece_block(dxf, piece, name, geometry.size_name,
+                                                    notes.get(piece.name, ''), tolerance)))
+            sizes.append(geometry.size_name)
+            blocks.append(row)
+        dxf.end_section()
+        if not sizes:
+            raise ValueError("no sizes to export")
+        sample_size = resolve_sample_size(sample_size, sizes)
+        # One row of pieces per size, the first size at the top
+        dxf.begin_section('ENTITIES')
+        y = 0.0
+        for row in blocks:
+            x, height = 0.0, max(upper[1] - lower[1] for _, (lower, upper) in row)
+            for name, (lower, upper) in row:
+                dxf.insert(name, (x - lower[0], y - height - lower[1]))
+                x += upper[0] - lower[0] + INSERT_GAP
+            y -= height + INSERT_GAP
+        annotations = [f"Style Name: {style_name}", f"Creation Date: {created:%m/%d/%Y}",
+                       f"Creation Time: {created:%H:%M:%S}", f"Sample Size: {sample_size}",
+                       f"Size List: {' '.join(map(str, sizes))}", "Units: ENGLISH"]
+        if skipped:
+            annotations.append(f"Skipped Sizes: {' '.join(map(str, skipped))}")
+        for i, text in enumerate(annotations):
+            dxf.text((0.0, (len(annotations) - i) * TEXT_HEIGHT * 2), text, ANNOTATION_LAYER)
+        dxf.end_section()
+        dxf.close()
+        return {'sizes': sizes, 'blocks': sum(len(row) for row in blocks),
+                'sample_size': sample_size, 'skipped': list(skipped)}
+    except Exception as e:
+        logger.error(f"Error writing DXF: {e}")
+        raise
+
+def save_dxf(path, geometries, **options):
+    """write_dxf to a file; returns its summary dict."""
+    with open(path, 'w', newline='\n') as f:
+        return write_dxf(f, geometries, **options)
+
+def iter_geometries(jobs):
+    """Draft (size_name, measurements) jobs one at a time, without caching them."""
+    for size_name, measurements in jobs:
+        yield build_polo_pattern(measurements, size_name)
+
+def main(argv=None):
+    """Command line entry point for DXF export."""
+    from pattern_batch import collect_jobs
+    from pattern_grading import GRADING_METHODS, SIZE_CHART_PATH
+
+    parser = argparse.ArgumentParser(description="Export polo patterns as AAMA/ASTM-style DXF.")
+    parser.add_argument('--sizes', nargs='*', default=[], help="Predefined or graded sizes to export (e.g. S M L 2XL).")
+    parser.add_argument('--measurements', nargs='*', default=[],
+                        help="JSON files holding a measurement set or a {size: measurements} mapping.")
+    parser.add_argument('--chart', nargs='?', const=SIZE_CHART_PATH, default=None,
+                        help="Export every size chart row within the Men XS-4XL chest range (default: sizes.json); "
+                             "other rows are listed as skipped.")
+    parser.add_argument('--grading', default='linear', choices=GRADING_METHODS,
+                        help="Interpolate chart sizes linearly or with a monotone spline.")
+    parser.add_argument('--output', default='polo_pattern.dxf', help="DXF file to write.")
+    parser.add_argument('--sample-size', default=None, help="Base size of the grade (default: the first size).")
+    parser.add_argument('--style', default="Polo Shirt", help="Style name written to the file.")
+    parser.add_argument('--tolerance', default='print', help="Curve flattening tolerance or preset.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    skipped = []
+    jobs = collect_jobs(args.sizes, args.measurements, args.chart, args.grading, skipped)
+    if not jobs:
+        parser.error("nothing to do: give --sizes, --measurements and/or --chart")
+    try:
+        sample_size = resolve_sample_size(args.sample_size, [size_name for size_name, _ in jobs])
+    except ValueError as e:
+        parser.error(str(e))
+    started = time.perf_counter()
+    try:
+        summary = save_dxf(args.output, iter_geometries(jobs), style_name=args.style,
+                           sample_size=sample_size, tolerance=args.tolerance,
+                           skipped=[label for label, _ in skipped])
+    except Exception as e:
+        logger.error(f"DXF export failed: {e}")
+        return 1
+    logger.info(f"Wrote {summary['blocks']} pieces in {len(summary['sizes'])} sizes to {args.output} "
+                f"in {time.perf_counter() - started:.2f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1242 @@
+"""Pure pattern geometry for the polo shirt: curves, pieces and derived lengths.
+
+Nothing in this module imports matplotlib, so costing and QA jobs can build
+a full pattern without creating any figures.
+"""
+import functools
+import math
+import logging
+from collections.abc import Mapping
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Conversion factor
+IN_TO_CM = 2.54
+
+# Helper Functions
+def dist(p1, p2):
+    """Calculate distance between two points."""
+    try:
+        return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+    except Exception as e:
+        logger.error(f"Error calculating distance: {e}")
+        raise
+
+def get_path_length(points_list):
+    """Calculate length of a path defined by points."""
+    try:
+        length = 0
+        for i in range(len(points_list) - 1):
+            length += dist(points_list[i], points_list[i + 1])
+        return length
+    except Exception as e:
+        logger.error(f"Error calculating path length: {e}")
+        raise
+
+@functools.lru_cache(maxsize=64)
+def bernstein_basis(num_points):
+    """Return the quadratic Bernstein basis matrix for a uniform t-grid.
+
+    The matrix has shape (num_points + 1, 3) and is shared read-only between
+    callers, so every curve sampled on the same grid reuses it.
+    """
+    try:
+        t = np.linspace(0.0, 1.0, num_points + 1)
+        basis = np.stack(((1 - t)**2, 2 * (1 - t) * t, t**2), axis=-1)
+        basis.setflags(write=False)
+        return basis
+    except Exception as e:
+        logger.error(f"Error building Bernstein basis: {e}")
+        raise
+
+def bernstein_basis_at(t):
+    """Return the quadratic Bernstein basis matrix for arbitrary t values."""
+    try:
+        t = np.asarray(t, dtype=float)
+        return np.stack(((1 - t)**2, 2 * (1 - t) * t, t**2), axis=-1)
+    except Exception as e:
+        logger.error(f"Error building Bernstein basis: {e}")
+        raise
+
+def bernstein_derivative_basis_at(t):
+    """Return the basis matrix for the first derivative of a quadratic Bezier."""
+    try:
+        t = np.asarray(t, dtype=float)
+        return np.stack((-2 * (1 - t), 2 * (1 - t) - 2 * t, 2 * t), axis=-1)
+    except Exception as e:
+        logger.error(f"Error building Bernstein derivative basis: {e}")
+        raise
+
+def evaluate_bezier_batch(control_points, num_points=30, t=None):
+    """Evaluate many quadratic Bezier curves on a shared t-grid.
+
+    control_points has shape (..., 3, 2) (any number of curves, sizes, ...).
+    Returns an array of shape (..., T, 2) where T is num_points + 1, or len(t)
+    when an explicit t-grid is given.
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        basis = bernstein_basis(num_points) if t is None else bernstein_basis_at(t)
+        return basis @ cp
+    except Exception as e:
+        logger.error(f"Error evaluating Bezier batch: {e}")
+        raise
+
+def evaluate_bezier_derivative_batch(control_points, num_points=30, t=None):
+    """Evaluate the tangent vectors of many quadratic Bezier curves on a shared t-grid."""
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        if t is None:
+            t = np.linspace(0.0, 1.0, num_points + 1)
+        return bernstein_derivative_basis_at(t) @ cp
+    except Exception as e:
+        logger.error(f"Error evaluating Bezier derivative batch: {e}")
+        raise
+
+def offset_bezier_batch(control_points, offset=0.375, num_points=10):
+    """Offset many quadratic Bezier curves along their left-hand normals.
+
+    Returns (points, valid): the offset samples with shape (..., T, 2) and a
+    boolean mask of shape (..., T) that is False where the tangent vanishes.
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        points = evaluate_bezier_batch(cp, num_points)
+        tangents = evaluate_bezier_derivative_batch(cp, num_points)
+        normals = np.stack((-tangents[..., 1], tangents[..., 0]), axis=-1)
+        lengths = np.hypot(normals[..., 0], normals[..., 1])
+        valid = lengths > 0
+        safe_lengths = np.where(valid, lengths, 1.0)[..., None]
+        return points + offset * normals / safe_lengths, valid
+    except Exception as e:
+        logger.error(f"Error offsetting Bezier batch: {e}")
+        raise
+
+def quadratic_bezier(p0, p1, p2, t):
+    """Calculate a point on a quadratic Bezier curve."""
+    try:
+        x, y = evaluate_bezier_batch((p0, p1, p2), t=t)
+        return (float(x), float(y))
+    except Exception as e:
+        logger.error(f"Error in quadratic Bezier calculation: {e}")
+        raise
+
+# Chord-deviation tolerances (inches) for adaptive curve flattening
+FLATTEN_TOLERANCES = {
+    'screen': 0.02,
+    'print': 0.005,
+    'plotter': 0.001,
+}
+MAX_FLATTEN_SEGMENTS = 4096
+
+def resolve_tolerance(tolerance):
+    """Resolve a tolerance preset name or numeric value (a number or numeric string) to inches."""
+    try:
+        if isinstance(tolerance, str) and tolerance in FLATTEN_TOLERANCES:
+            return FLATTEN_TOLERANCES[tolerance]
+        try:
+            value = float(tolerance)
+        except (TypeError, ValueError):
+            raise ValueError(f"Unknown tolerance preset '{tolerance}'. "
+                             f"Give inches or one of: {', '.join(FLATTEN_TOLERANCES)}")
+        if not (math.isfinite(value) and value > 0):
+            raise ValueError("Tolerance must be positive.")
+        return value
+    except Exception as e:
+        logger.error(f"Error resolving flattening tolerance: {e}")
+        raise
+
+def bezier_segment_count_batch(control_points, tolerance='screen'):
+    """Number of chords needed to flatten each quadratic Bezier within tolerance.
+
+    A quadratic has constant second derivative 2*(p0 - 2*p1 + p2), so a chord
+    spanning a parameter interval h deviates from the curve by at most
+    |p0 - 2*p1 + p2| * h**2 / 4. Uniform subdivision into n chords therefore
+    meets the tolerance exactly when n >= sqrt(|p0 - 2*p1 + p2| / (4 * tol)).
+    """
+    try:
+        tol = resolve_tolerance(tolerance)
+        cp = np.asarray(control_points, dtype=float)
+        acc = cp[..., 0, :] - 2 * cp[..., 1, :] + cp[..., 2, :]
+        deviation = np.hypot(acc[..., 0], acc[..., 1])
+        counts = np.ceil(np.sqrt(deviation / (4 * tol)))
+        return np.clip(counts, 1, MAX_FLATTEN_SEGMENTS).astype(int)
+    except Exception as e:
+        logger.error(f"Error computing Bezier segment count: {e}")
+        raise
+
+def bezier_segment_count(p0, p1, p2, tolerance='screen'):
+    """Number of chords needed to flatten a quadratic Bezier within tolerance."""
+    try:
+        return int(bezier_segment_count_batch((p0, p1, p2), tolerance))
+    except Exception as e:
+        logger.error(f"Error computing Bezier segment count: {e}")
+        raise
+
+def generate_bezier_points(p0, p1, p2, num_points=30, tolerance=None):
+    """Generate points along a quadratic Bezier curve.
+
+    If tolerance (inches or a FLATTEN_TOLERANCES preset) is given, the number
+    of points adapts to the curve instead of using num_points.
+    """
+    try:
+        if tolerance is not None:
+            num_points = bezier_segment_count(p0, p1, p2, tolerance)
+        return [tuple(p) for p in evaluate_bezier_batch((p0, p1, p2), num_points).tolist()]
+    except Exception as e:
+        logger.error(f"Error generating Bezier points: {e}")
+        raise
+
+def offset_bezier_curve(p0, p1, p2, offset=0.375, num_points=10, tolerance=None):
+    """Generate offset points for a Bezier curve."""
+    try:
+        if tolerance is not None:
+            num_points = bezier_segment_count(p0, p1, p2, tolerance)
+        points, valid = offset_bezier_batch((p0, p1, p2), offset, num_points)
+        return [tuple(p) for p in points[valid].tolist()]
+    except Exception as e:
+        logger.error(f"Error offsetting Bezier curve: {e}")
+        raise
+
+def quadratic_bezier_length_batch(control_points):
+    """Exact arc length of many quadratic Bezier curves.
+
+    control_points has shape (..., 3, 2); returns an array of shape (...).
+    With A = p0 - 2*p1 + p2 and B = p1 - p0 the speed is 2*|A*t + B|, whose
+    integral over [0, 1] has a closed form in terms of asinh.
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        p0, p1, p2 = cp[..., 0, :], cp[..., 1, :], cp[..., 2, :]
+        acc = p0 - 2 * p1 + p2
+        vel = p1 - p0
+        a = np.einsum('...i,...i->...', acc, acc)
+        b = np.einsum('...i,...i->...', acc, vel)
+        c = np.einsum('...i,...i->...', vel, vel)
+        # Near-zero curvature: the curve is a uniformly parametrised segment.
+        straight = a <= 1e-12 * np.maximum(c, 1e-300)
+        safe_a = np.where(straight, 1.0, a)
+        q = np.maximum(c / safe_a - (b / safe_a)**2, 0.0)
+        u0 = b / safe_a
+        u1 = u0 + 1.0
+        root_q = np.sqrt(q)
+        safe_root_q = np.where(root_q > 0, root_q, 1.0)
+
+        def antiderivative(u):
+            # Integral of sqrt(u**2 + q) du; falls back to u*|u|/2 when q == 0
+            # (control points collinear), where the asinh term vanishes.
+            log_term = np.where(root_q > 0, q * np.arcsinh(u / safe_root_q), 0.0)
+            return 0.5 * (u * np.sqrt(u * u + q) + log_term)
+
+        curved = 2 * np.sqrt(safe_a) * (antiderivative(u1) - antiderivative(u0))
+        return np.where(straight, 2 * np.sqrt(c), curved)
+    except Exception as e:
+        logger.error(f"Error calculating Bezier arc length: {e}")
+        raise
+
+def quadratic_bezier_length(p0, p1, p2):
+    """Calculate the exact arc length of a quadratic Bezier curve."""
+    try:
+        return float(quadratic_bezier_length_batch((p0, p1, p2)))
+    except Exception as e:
+        logger.error(f"Error calculating Bezier arc length: {e}")
+        raise
+
+SEAM_ALLOWANCE = 0.375
+MITER_LIMIT = 4.0
+
+def flatten_edges(edges, tolerance='screen'):
+    """Flatten an edge list into a single outline.
+
+    edges is a list of ('straight', [p1, p2]) / ('bezier', [p0, p1, p2])
+    tuples as used by the pattern pieces. Returns (points, edge_index): the
+    outline vertices with shape (N, 2), without repeating the start point,
+    and for each vertex the index of the edge its outgoing segment belongs to.
+    """
+    try:
+        chunks, owners = [], []
+        for i, (edge_type, pts) in enumerate(edges):
+            if edge_type == 'straight':
+                chunk = np.asarray(pts[:1], dtype=float)
+            elif edge_type == 'bezier':
+                n = bezier_segment_count(pts[0], pts[1], pts[2], tolerance)
+                chunk = evaluate_bezier_batch(pts, n)[:-1]
+            else:
+                raise ValueError(f"Unknown edge type '{edge_type}'")
+            chunks.append(chunk)
+            owners.append(np.full(len(chunk), i))
+        points = np.concatenate(chunks)
+        owners = np.concatenate(owners)
+        # Drop zero-length segments, they have no direction to offset along.
+        keep = np.hypot(*(np.roll(points, -1, axis=0) - points).T) > 1e-12
+        return points[keep], owners[keep]
+    except Exception as e:
+        logger.error(f"Error flattening edges: {e}")
+        raise
+
+def signed_area(points):
+    """Shoelace signed area of a closed outline (positive when counter-clockwise)."""
+    try:
+        pts = np.asarray(points, dtype=float)
+        x, y = pts[..., 0], pts[..., 1]
+        return 0.5 * np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)
+    except Exception as e:
+        logger.error(f"Error calculating signed area: {e}")
+        raise
+
+def offset_outline(points, allowances, join='miter', miter_limit=MITER_LIMIT, tolerance='screen'):
+    """Offset a closed outline outward by a per-segment allowance.
+
+    points has shape (N, 2); allowances has shape (N,) where allowances[i]
+    applies to the segment from points[i] to points[i + 1]. Segments are
+    offset along their outward normals (whatever the winding) and adjacent
+    offset lines are joined at every vertex in one vectorized solve. join is
+    'miter', 'bevel' or 'round'; miters longer than miter_limit times the
+    allowance fall back to bevels.
+    """
+    try:
+        if join not in ('miter', 'bevel', 'round'):
+            raise ValueError(f"Unknown join '{join}'. Choose from: miter, bevel, round")
+        pts = np.asarray(points, dtype=float)
+        d1 = np.broadcast_to(np.asarray(allowances, dtype=float), (len(pts),))
+        d0 = np.roll(d1, 1)
+        seg = np.roll(pts, -1, axis=0) - pts
+        tangents = seg / np.hypot(seg[:, 0], seg[:, 1])[:, None]
+        orientation = 1.0 if signed_area(pts) >= 0 else -1.0
+        normals = orientation * np.stack((tangents[:, 1], -tangents[:, 0]), axis=-1)
+        n1 = normals
+        n0 = np.roll(normals, 1, axis=0)
+        t0 = np.roll(tangents, 1, axis=0)
+
+        # Intersection of the two offset lines n0.x = d0 and n1.x = d1.
+        det = n0[:, 0] * n1[:, 1] - n0[:, 1] * n1[:, 0]
+        parallel = np.abs(det) < 1e-9
+        safe_det = np.where(parallel, 1.0, det)
+        miter = np.stack(((d0 * n1[:, 1] - d1 * n0[:, 1]) / safe_det,
+                          (n0[:, 0] * d1 - n1[:, 0] * d0) / safe_det), axis=-1)
+        miter = np.where(parallel[:, None], d1[:, None] * n1, miter)
+
+        # Convex corners turn towards the outside; only those need bevels/arcs.
+        turn = orientation * (t0[:, 0] * tangents[:, 1] - t0[:, 1] * tangents[:, 0])
+        convex = turn > 1e-9
+        limit = miter_limit * np.maximum(np.maximum(d0, d1), 1e-12)
+        too_long = np.hypot(miter[:, 0], miter[:, 1]) > limit
+        step = parallel & ((d0 != d1) | (np.einsum('ij,ij->i', n0, n1) < 0))
+        tol = resolve_tolerance(tolerance)
+        angle = np.arccos(np.clip(np.einsum('ij,ij->i', n0, n1), -1.0, 1.0))
+        if join == 'miter':
+            special = (convex & too_long) | step
+        else:
+            # Gentle corners (e.g. along flattened curves) keep their miter
+            # while it overshoots the round join by less than the tolerance.
+            overshoot = np.maximum(d0, d1) * (1 / np.maximum(np.cos(angle / 2), 1e-12) - 1)
+            special = (convex & (too_long | (overshoot > tol))) | step
+
+        cut = pts + miter
+        if not special.any():
+            return cut
+
+        pieces, start = [], 0
+        for i in np.flatnonzero(special):
+            pieces.append(cut[start:i])
+            a, b = pts[i] + d0[i] * n0[i], pts[i] + d1[i] * n1[i]
+            if join == 'round' and convex[i] and not step[i]:
+                radius = max(d0[i], d1[i])
+                start_angle = math.atan2(n0[i, 1], n0[i, 0])
+                sweep = orientation * angle[i]
+                max_step = 2 * math.acos(max(-1.0, 1 - tol / radius)) if radius > tol else math.pi
+                steps = max(2, int(math.ceil(abs(sweep) / max_step)))
+                theta = start_angle + sweep * np.linspace(0.0, 1.0, steps + 1)
+                radii = np.linspace(d0[i], d1[i], steps + 1)
+                pieces.append(pts[i] + radii[:, None] * np.stack((np.cos(theta), np.sin(theta)), axis=-1))
+            else:
+                pieces.append(np.stack((a, b)))
+            start = i + 1
+        pieces.append(cut[start:])
+        return np.concatenate(pieces)
+    except Exception as e:
+        logger.error(f"Error offsetting outline: {e}")
+        raise
+
+def offset_outline_batch(points, allowances, miter_limit=MITER_LIMIT):
+    """Mitered offsets of many closed outlines with the same vertex count.
+
+    points has shape (..., N, 2) and allowances (N,) or (..., N). Joins
+    follow offset_outline's 'miter' rule, but as bevels would give outlines
+    different vertex counts every vertex yields two points: its miter point
+    twice, or the two ends of its bevel. Returns shape (..., 2 * N, 2).
+    """
+    try:
+        pts = np.asarray(points, dtype=float)
+        # Work on separate x and y arrays; strided (..., 2) slices are slow on big batches.
+        x, y = pts[..., 0], pts[..., 1]
+        d1 = np.asarray(allowances, dtype=float)
+        d0 = np.roll(d1, 1, axis=-1)
+        sx, sy = np.roll(x, -1, axis=-1) - x, np.roll(y, -1, axis=-1) - y
+        length = np.hypot(sx, sy)
+        tx, ty = sx / length, sy / length
+        orientation = np.where(signed_area(pts) >= 0, 1.0, -1.0)[..., None]
+        n1x, n1y = orientation * ty, -orientation * tx
+        n0x, n0y = np.roll(n1x, 1, axis=-1), np.roll(n1y, 1, axis=-1)
+
+        det = n0x * n1y - n0y * n1x
+        parallel = np.abs(det) < 1e-9
+        safe_det = np.where(parallel, 1.0, det)
+        mx = np.where(parallel, d1 * n1x, (d0 * n1y - d1 * n0y) / safe_det)
+        my = np.where(parallel, d1 * n1y, (n0x * d1 - n1x * d0) / safe_det)
+
+        turn = orientation * (np.roll(tx, 1, axis=-1) * ty - np.roll(ty, 1, axis=-1) * tx)
+        limit = miter_limit * np.maximum(np.maximum(d0, d1), 1e-12)
+        too_long = np.hypot(mx, my) > limit
+        step = parallel & ((d0 != d1) | (n0x * n1x + n0y * n1y < 0))
+        bevel = ((turn > 1e-9) & too_long) | step
+        out = np.empty(pts.shape[:-2] + (pts.shape[-2], 2, 2))
+        out[..., 0, 0] = x + np.where(bevel, d0 * n0x, mx)
+        out[..., 0, 1] = y + np.where(bevel, d0 * n0y, my)
+        out[..., 1, 0] = x + np.where(bevel, d1 * n1x, mx)
+        out[..., 1, 1] = y + np.where(bevel, d1 * n1y, my)
+        return out.reshape(pts.shape[:-2] + (2 * pts.shape[-2], 2))
+    except Exception as e:
+        logger.error(f"Error offsetting outline batch: {e}")
+        raise
+
+def cut_line_polygon(edges, allowance=SEAM_ALLOWANCE, join='miter', tolerance='screen',
+                     miter_limit=MITER_LIMIT, closing_allowance=0.0):
+    """Build the closed cut-line polygon for a piece from its edge list.
+
+    allowance is a single value or one value per edge (e.g. a deeper hem).
+    If the edge list does not close (a piece cut on the fold), the gap is
+    bridged with a straight edge that gets closing_allowance.
+    """
+    try:
+        edges = list(edges)
+        allowances = np.broadcast_to(np.asarray(allowance, dtype=float), (len(edges),))
+        first, last = edges[0][1][0], edges[-1][1][-1]
+        if dist(first, last) > 1e-9:
+            edges.append(('straight', [last, first]))
+            allowances = np.append(allowances, closing_allowance)
+        points, owners = flatten_edges(edges, tolerance)
+        return offset_outline(points, allowances[owners], join, miter_limit, tolerance)
+    except Exception as e:
+        logger.error(f"Error building cut line polygon: {e}")
+        raise
+
+def rectangle_edges(x, y, width, height):
+    """Edge list for a rectangular piece with its lower-left corner at (x, y)."""
+    try:
+        corners = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+        return [('straight', [corners[i], corners[(i + 1) % 4]]) for i in range(4)]
+    except Exception as e:
+        logger.error(f"Error building rectangle edges: {e}")
+        raise
+
+def translate_marking(kind, data, dx, dy):
+    """Move a piece marking by (dx, dy); buttons are (center, radius), others point lists."""
+    try:
+        if kind == 'button':
+            (x, y), radius = data
+            return ((x + dx, y + dy), radius)
+        return [(x + dx, y + dy) for x, y in data]
+    except Exception as e:
+        logger.error(f"Error translating marking: {e}")
+        raise
+
+EDGE_KINDS = ('straight', 'bezier')
+EDGE_ORDER = {'straight': 1, 'bezier': 2}
+
+class Edge:
+    """A piece edge: a straight segment or a quadratic Bezier.
+
+    points is a view into the owning piece's vertex array. An Edge unpacks
+    like the legacy ('straight', [p1, p2]) tuples, so it can be passed to
+    the edge-list helpers unchanged.
+    """
+    __slots__ = ('kind', 'points')
+
+    def __init__(self, kind, points):
+        self.kind = kind
+        self.points = points
+
+    def __iter__(self):
+        yield self.kind
+        yield self.points
+
+    def __repr__(self):
+        return f"Edge({self.kind!r}, {self.points.tolist()!r})"
+
+    def length(self):
+        """Exact length of the edge."""
+        try:
+            if self.kind == 'bezier':
+                return float(quadratic_bezier_length_batch(self.points))
+            return dist(self.points[0], self.points[1])
+        except Exception as e:
+            logger.error(f"Error calculating edge length: {e}")
+            raise
+
+class Piece:
+    """A pattern piece backed by one contiguous vertex array.
+
+    Edges are stored back to back: edge i owns the control points
+    vertices[starts[i]:starts[i] + order + 1], sharing its end point with
+    the start of edge i + 1, and the last vertex repeats the first. kinds
+    holds one EDGE_KINDS code per edge and allowances the seam allowance per
+    edge. Derived data (outline, cut line, bounds, area, perimeter) is
+    computed on first use and cached on the piece.
+    """
+    __slots__ = ('name', 'kinds', 'vertices', 'starts', 'allowances', 'fold_edge',
+                 'notches', 'grainline', 'markings', '_cache')
+
+    def __init__(self, name, kinds, vertices, starts, allowances, fold_edge=-1,
+                 notches=(), grainline=None, markings=()):
+        self.name = name
+        self.kinds = kinds
+        self.vertices = vertices
+        self.starts = starts
+        self.allowances = allowances
+        self.fold_edge = fold_edge
+        # Notches are (point, direction) pairs, the grainline is (x, y_start, y_end)
+        # and markings are (kind, data) pairs such as ('fold_line', [p1, p2]).
+        self.notches = tuple(notches)
+        self.grainline = grainline
+        self.markings = tuple(markings)
+        self._cache = None
+
+    @classmethod
+    def from_edges(cls, name, edges, allowance=SEAM_ALLOWANCE, dtype=np.float64, closing_allowance=0.0):
+        """Build a piece from a legacy edge list.
+
+        An open edge list (a piece cut on the fold) is closed with a straight
+        fold edge that gets closing_allowance.
+        """
+        try:
+            edges = [(kind, [tuple(p) for p in pts]) for kind, pts in edges]
+            allowances = list(np.broadcast_to(np.asarray(allowance, dtype=float), (len(edges),)))
+            fold_edge = -1
+            if dist(edges[0][1][0], edges[-1][1][-1]) > 1e-9:
+                fold_edge = len(edges)
+                edges.append(('straight', [edges[-1][1][-1], edges[0][1][0]]))
+                allowances.append(closing_allowance)
+            vertices, starts, kinds = [edges[0][1][0]], [], []
+            for kind, pts in edges:
+                if kind not in EDGE_ORDER:
+                    raise ValueError(f"Unknown edge type '{kind}'")
+                if dist(vertices[-1], pts[0]) > 1e-9:
+                    raise ValueError(f"Edges of piece '{name}' are not connected at {pts[0]}")
+                starts.append(len(vertices) - 1)
+                kinds.append(EDGE_KINDS.index(kind))
+                vertices.extend(pts[1:])
+            vertices[-1] = vertices[0]
+            return cls(name, np.array(kinds, dtype=np.uint8), np.array(vertices, dtype=dtype),
+                       np.array(starts, dtype=np.int32), np.array(allowances, dtype=dtype), fold_edge)
+        except Exception as e:
+            logger.error(f"Error building piece '{name}': {e}")
+            raise
+
+    @classmethod
+    def rectangle(cls, name, width, height, x=0, y=0, allowance=SEAM_ALLOWANCE, dtype=np.float64):
+        """Build a rectangular piece with its lower-left corner at (x, y)."""
+        return cls.from_edges(name, rectangle_edges(x, y, width, height), allowance, dtype)
+
+    def with_details(self, notches=(), grainline=None, markings=()):
+        """Attach notches, grainline and markings to the piece and return it."""
+        self.notches = tuple(notches)
+        self.grainline = grainline
+        self.markings = tuple(markings)
+        return self
+
+    def copy(self, name):
+        """Return a piece with a new name sharing this piece's geometry arrays."""
+        return Piece(name, self.kinds, self.vertices, self.starts, self.allowances, self.fold_edge,
+                     self.notches, self.grainline, self.markings)
+
+    def __repr__(self):
+        return f"Piece({self.name!r}, edges={len(self.kinds)})"
+
+    @property
+    def edges(self):
+        """Edges of the piece as Edge views into the vertex array."""
+        return [Edge(EDGE_KINDS[k], self.vertices[s:s + EDGE_ORDER[EDGE_KINDS[k]] + 1])
+                for k, s in zip(self.kinds.tolist(), self.starts.tolist())]
+
+    @property
+    def seam_edges(self):
+        """Edges that are sewn, i.e. every edge except the fold."""
+        return [edge for i, edge in enumerate(self.edges) if i != self.fold_edge]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the piece's arrays, excluding cached derived data."""
+        return self.kinds.nbytes + self.vertices.nbytes + self.starts.nbytes + self.allowances.nbytes
+
+    def translated(self, dx, dy):
+        """Return a copy of the piece, with its notches, grainline and markings, moved by (dx, dy)."""
+        try:
+            vertices = self.vertices + np.array((dx, dy), dtype=self.vertices.dtype)
+            notches = [((p[0] + dx, p[1] + dy), d) for p, d in self.notches]
+            grainline = None
+            if self.grainline is not None:
+                x, y_start, y_end = self.grainline
+                grainline = (x + dx, y_start + dy, y_end + dy)
+            markings = [(kind, translate_marking(kind, data, dx, dy)) for kind, data in self.markings]
+            piece = Piece(self.name, self.kinds, vertices, self.starts, self.allowances, self.fold_edge,
+                          notches, grainline, markings)
+            if self._cache:
+                # Shift already-derived data instead of flattening and offsetting again.
+                shift = np.array((dx, dy))
+                piece._cache = {}
+                for key, value in self._cache.items():
+                    if key == 'bounds':
+                        value = tuple((x + dx, y + dy) for x, y in value)
+                    elif isinstance(value, np.ndarray):
+                        value = value + shift
+                    piece._cache[key] = value
+            return piece
+        except Exception as e:
+            logger.error(f"Error translating piece '{self.name}': {e}")
+            raise
+
+    def _cached(self, key, compute):
+        if self._cache is None:
+            self._cache = {}
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _edge_controls(self, kind):
+        # Control points of every edge of one kind, shape (E, order + 1, 2).
+        order = EDGE_ORDER[kind]
+        starts = self.starts[self.kinds == EDGE_KINDS.index(kind)]
+        return self.vertices[starts[:, None] + np.arange(order + 1)].astype(float)
+
+    def outline(self, tolerance='screen'):
+        """Flattened outline vertices, shape (N, 2), without repeating the start."""
+        return self._cached(('outline', tolerance), lambda: flatten_edges(self.edges, tolerance)[0])
+
+    def cut_line(self, join='miter', tolerance='screen'):
+        """Closed seam allowance cut-line polygon, shape (M, 2)."""
+        def compute():
+            points, owners = flatten_edges(self.edges, tolerance)
+            return offset_outline(points, self.allowances.astype(float)[owners], join, MITER_LIMIT, tolerance)
+        return self._cached(('cut_line', join, tolerance), compute)
+
+    def unfolded_cut_line(self, join='miter', tolerance='screen'):
+        """Cut line of the whole piece as laid on open fabric, shape (M, 2).
+
+        For a piece cut on the fold the cut line is mirrored across the fold
+        edge and joined to itself; otherwise it is the plain cut line.
+        """
+        def compute():
+            cut = self.cut_line(join, tolerance)
+            if self.fold_edge < 0:
+                return cut
+            start = self.vertices[self.starts[self.fold_edge]].astype(float)
+            axis = self.vertices[self.starts[self.fold_edge] + 1].astype(float) - start
+            axis /= np.hypot(*axis)
+            normal = np.array((-axis[1], axis[0]))
+            on_fold = np.abs((cut - start) @ normal) < 1e-9
+            # Start the path at the first point off the fold, so the points on
+            # the fold are the (single) run at its end.
+            first = int(np.flatnonzero(~on_fold & np.roll(on_fold, 1))[0])
+            cut, on_fold = np.roll(cut, -first, axis=0), np.roll(on_fold, -first)
+            end = int(np.flatnonzero(on_fold)[0])
+            half = np.vstack((cut[-1:], cut[:end + 1]))
+            mirrored = half - 2 * np.outer((half - start) @ normal, normal)
+            return np.vstack((half, mirrored[-2:0:-1]))
+        return self._cached(('unfolded_cut_line', join, tolerance), compute)
+
+    @property
+    def bounds(self):
+        """Exact bounding box ((x_min, y_min), (x_max, y_max)) of the sew line."""
+        def compute():
+            lower = self.vertices[self.starts].astype(float).min(axis=0)
+            upper = self.vertices[self.starts].astype(float).max(axis=0)
+            curves = self._edge_controls('bezier')
+            if len(curves):
+                boxes = bezier_bounds_batch(curves)
+                lower = np.minimum(lower, boxes[:, 0].min(axis=0))
+                upper = np.maximum(upper, boxes[:, 1].max(axis=0))
+            return (tuple(lower.tolist()), tuple(upper.tolist()))
+        return self._cached('bounds', compute)
+
+    @property
+    def area(self):
+        """Exact area enclosed by the sew line.
+
+        Shoelace over the edge end points, plus for each Bezier the area
+        between chord and curve, which is 2/3 of its control triangle.
+        """
+        def compute():
+            total = signed_area(self.vertices[self.starts].astype(float))
+            curves = self._edge_controls('bezier')
+            if len(curves):
+                total += 2.0 / 3.0 * np.sum(signed_area(curves))
+            return float(abs(total))
+        return self._cached('area', compute)
+
+    @property
+    def perimeter(self):
+        """Exact length of the sew line, fold edge included."""
+        def compute():
+            lines = self._edge_controls('straight')
+            total = np.sum(np.hypot(*(lines[:, 1] - lines[:, 0]).T))
+            curves = self._edge_controls('bezier')
+            if len(curves):
+                total += np.sum(quadratic_bezier_length_batch(curves))
+            return float(total)
+        return self._cached('perimeter', compute)
+
+def bezier_extremum_candidates_batch(control_points, axis):
+    """Parameters where a quadratic Bezier can reach its extremes along one axis.
+
+    Returns an array of shape (..., 3): the two endpoints (t = 0, 1) and the
+    root of the derivative along axis, clamped to [0, 1] (a duplicate
+    endpoint when the root lies outside the curve or the axis is linear).
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        acc = cp[..., 0, axis] - 2 * cp[..., 1, axis] + cp[..., 2, axis]
+        vel = cp[..., 1, axis] - cp[..., 0, axis]
+        has_root = acc != 0
+        t_root = np.clip(np.divide(-vel, acc, out=np.zeros_like(acc), where=has_root), 0.0, 1.0)
+        return np.stack((np.zeros_like(t_root), np.ones_like(t_root), t_root), axis=-1)
+    except Exception as e:
+        logger.error(f"Error computing Bezier extremum candidates: {e}")
+        raise
+
+def bezier_axis_extreme_batch(control_points, axis=1, largest=True):
+    """Exact point of maximum (or minimum) coordinate along axis for many curves.
+
+    control_points has shape (..., 3, 2); returns points of shape (..., 2).
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        t = bezier_extremum_candidates_batch(cp, axis)
+        points = bernstein_basis_at(t) @ cp
+        values = points[..., axis]
+        index = np.argmax(values, axis=-1) if largest else np.argmin(values, axis=-1)
+        return np.take_along_axis(points, index[..., None, None], axis=-2)[..., 0, :]
+    except Exception as e:
+        logger.error(f"Error finding Bezier extreme point: {e}")
+        raise
+
+def bezier_bounds_batch(control_points):
+    """Exact bounding boxes of many quadratic Bezier curves.
+
+    Returns an array of shape (..., 2, 2): [[x_min, y_min], [x_max, y_max]].
+    """
+    try:
+        cp = np.asarray(control_points, dtype=float)
+        lower, upper = [], []
+        for axis in (0, 1):
+            values = (bernstein_basis_at(bezier_extremum_candidates_batch(cp, axis)) @ cp)[..., axis]
+            lower.append(values.min(axis=-1))
+            upper.append(values.max(axis=-1))
+        return np.stack((np.stack(lower, axis=-1), np.stack(upper, axis=-1)), axis=-2)
+    except Exception as e:
+        logger.error(f"Error computing Bezier bounds: {e}")
+        raise
+
+def find_max_y_bezier(p0, p1, p2):
+    """Find the point with maximum y-coordinate on a Bezier curve."""
+    try:
+        x, y = bezier_axis_extreme_batch((p0, p1, p2), axis=1, largest=True)
+        return (float(x), float(y))
+    except Exception as e:
+        logger.error(f"Error finding max y on Bezier: {e}")
+        raise
+
+def find_min_y_bezier(p0, p1, p2):
+    """Find the point with minimum y-coordinate on a Bezier curve."""
+    try:
+        x, y = bezier_axis_extreme_batch((p0, p1, p2), axis=1, largest=False)
+        return (float(x), float(y))
+    except Exception as e:
+        logger.error(f"Error finding min y on Bezier: {e}")
+        raise
+
+def bezier_bounding_box(p0, p1, p2):
+    """Return ((x_min, y_min), (x_max, y_max)) for a quadratic Bezier curve."""
+    try:
+        (x_min, y_min), (x_max, y_max) = bezier_bounds_batch((p0, p1, p2)).tolist()
+        return ((x_min, y_min), (x_max, y_max))
+    except Exception as e:
+        logger.error(f"Error computing Bezier bounding box: {e}")
+        raise
+
+# Predefined Measurements (Corrected)
+PREDEFINED_MEASUREMENTS = {
+    'S': {
+        'half_chest_flat': 18, 'garment_length': 24.5, 'neck_width_half': 3.0,
+        'front_neck_drop': 2.75, 'back_neck_drop': 0.75, 'shoulder_width': 4.5,
+        'shoulder_slope': 1.5, 'armhole_depth': 8.0, 'sleeve_length_outer': 7,
+        'sleeve_bicep_flat': 7, 'sleeve_cuff_flat': 6, 'collar_height_flat': 3,
+        'placket_width': 1.5, 'placket_length': 5
+    },
+    'M': {
+        'half_chest_flat': 20, 'garment_length': 25.5, 'neck_width_half': 3.25,
+        'front_neck_drop': 3.0, 'back_neck_drop': 1.0, 'shoulder_width': 5.0,
+        'shoulder_slope': 1.75, 'armhole_depth': 9.0, 'sleeve_length_outer': 7.5,
+        'sleeve_bicep_flat': 7.5, 'sleeve_cuff_flat': 6.5, 'collar_height_flat': 3,
+        'placket_width': 1.5, 'placket_length': 5.5
+    },
+    'L': {
+        'half_chest_flat': 22, 'garment_length': 26.5, 'neck_width_half': 3.5,
+        'front_neck_drop': 3.25, 'back_neck_drop': 1.0, 'shoulder_width': 5.5,
+        'shoulder_slope': 2.0, 'armhole_depth': 9.5, 'sleeve_length_outer': 8,
+        'sleeve_bicep_flat': 8, 'sleeve_cuff_flat': 7, 'collar_height_flat': 3.25,
+        'placket_width': 1.5, 'placket_length': 6
+    },
+}
+
+MEASUREMENT_KEYS = tuple(PREDEFINED_MEASUREMENTS['M'])
+
+PIECE_NAMES = (
+    "1. Front Body", "2. Back Body",
+    "3. Sleeve (Piece 1)", "4. Sleeve (Piece 2)",
+    "5. Collar (Piece 1)", "6. Collar (Piece 2)",
+    "7. Placket (Button Side)", "8. Placket (Buttonhole Side)",
+    "9. Collar Interfacing", "10. Placket Interfacing",
+)
+
+def clamped_shoulder_slope(shoulder_width, shoulder_slope):
+    """Shoulder slope, kept just below the shoulder width so the shoulder seam has a horizontal run."""
+    return shoulder_width * 0.98 if shoulder_width < shoulder_slope else shoulder_slope
+
+def back_neck_curve(neck_width_half, garment_length, back_neck_drop):
+    """Control points of the back neckline, from the shoulder point to centre back."""
+    p_hps = (neck_width_half, garment_length)
+    p_cb = (0, garment_length - back_neck_drop)
+    p_ctrl = (neck_width_half * 0.5, (p_cb[1] + p_hps[1]) / 2 + back_neck_drop * 0.2)
+    return (p_hps, p_ctrl, p_cb)
+
+def front_neck_curve(neck_width_half, garment_length, front_neck_drop):
+    """Control points of the right front neckline, from centre front to the shoulder point."""
+    p_cf = (0, garment_length - front_neck_drop)
+    p_hps = (neck_width_half, garment_length)
+    p_ctrl = (neck_width_half * 0.4, p_cf[1] + (p_hps[1] - p_cf[1]) * 0.3)
+    return (p_cf, p_ctrl, p_hps)
+
+# Derived measurements: name -> (inputs, function of the input values).
+# Inputs are measurement keys or other derived names; names must not clash
+# with MEASUREMENT_KEYS.
+DERIVED_MEASUREMENTS = {
+    'clamped_shoulder_slope': (('shoulder_width', 'shoulder_slope'), clamped_shoulder_slope),
+    'dx_shoulder': (('shoulder_width', 'clamped_shoulder_slope'),
+                    lambda width, slope: math.sqrt(max(0, width**2 - slope**2))),
+    'cap_height': (('sleeve_length_outer',), lambda sleeve_length: sleeve_length * 0.25),
+    'underarm_length': (('sleeve_length_outer', 'cap_height'), lambda sleeve_length, cap: sleeve_length - cap),
+    'clamped_cuff_flat': (('sleeve_cuff_flat', 'sleeve_bicep_flat'), min),
+    'back_neck_curve': (('neck_width_half', 'garment_length', 'back_neck_drop'), back_neck_curve),
+    'front_neck_curve': (('neck_width_half', 'garment_length', 'front_neck_drop'), front_neck_curve),
+    'half_back_neckline_length': (('back_neck_curve',), lambda curve: quadratic_bezier_length(*curve)),
+    'half_front_neckline_length': (('front_neck_curve',), lambda curve: quadratic_bezier_length(*curve)),
+    'collar_length_calculated': (('half_back_neckline_length', 'half_front_neckline_length'),
+                                 lambda back, front: (back + front) * 2),
+}
+
+# The seam lengths among the derived measurements (see PatternGeometry.lengths)
+LENGTH_NAMES = ('half_back_neckline_length', 'half_front_neckline_length', 'collar_length_calculated')
+
+@functools.lru_cache(maxsize=None)
+def derived_inputs(name):
+    """The measurement keys a derived measurement depends on, directly or through other derived values."""
+    try:
+        if name in MEASUREMENT_KEYS:
+            return frozenset((name,))
+        inputs, _ = DERIVED_MEASUREMENTS[name]
+        return frozenset().union(*(derived_inputs(dep) for dep in inputs))
+    except Exception as e:
+        logger.error(f"Error resolving inputs of derived measurement '{name}': {e}")
+        raise
+
+class DerivedMeasurements(Mapping):
+    """Lazily evaluated derived measurements of one measurement set.
+
+    Each value in DERIVED_MEASUREMENTS is computed on first access, from its
+    inputs, and cached; measurement keys read through to the measurements
+    themselves. evaluated() shows what has been computed so far and
+    explain() what a value was computed from. Iterating (or dict()) forces
+    every value.
+    """
+    __slots__ = ('measurements', '_values')
+
+    def __init__(self, measurements, values=None):
+        self.measurements = measurements
+        self._values = dict(values or {})
+
+    def __getitem__(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name in DERIVED_MEASUREMENTS:
+            inputs, func = DERIVED_MEASUREMENTS[name]
+            value = self._values[name] = func(*(self[dep] for dep in inputs))
+            return value
+        if name in MEASUREMENT_KEYS:
+            return self.measurements[name]
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(DERIVED_MEASUREMENTS)
+
+    def __len__(self):
+        return len(DERIVED_MEASUREMENTS)
+
+    def __repr__(self):
+        return f"DerivedMeasurements(evaluated={sorted(self._values)!r})"
+
+    def evaluated(self):
+        """The values computed so far, without evaluating anything else."""
+        return dict(self._values)
+
+    def explain(self, name):
+        """(inputs, {input: value}) for a derived measurement, evaluating it if needed."""
+        try:
+            inputs, _ = DERIVED_MEASUREMENTS[name]
+            self[name]
+            return inputs, {dep: self[dep] for dep in inputs}
+        except Exception as e:
+            logger.error(f"Error explaining derived measurement '{name}': {e}")
+            raise
+
+    def updated(self, measurements):
+        """Derived values for new measurements, keeping the computed values whose inputs did not change."""
+        try:
+            changed = set(changed_measurements(self.measurements, measurements))
+            kept = {name: value for name, value in self._values.items() if not changed & derived_inputs(name)}
+            return DerivedMeasurements(measurements, kept)
+        except Exception as e:
+            logger.error(f"Error updating derived measurements: {e}")
+            raise
+
+class PatternGeometry:
+    """Every piece of a polo pattern plus the values derived while drafting it.
+
+    pieces maps the PIECE_NAMES titles to Piece objects in local
+    coordinates and derived is the DerivedMeasurements the pieces were
+    drafted from (dx_shoulder, clamped_shoulder_slope, cap_height, neckline
+    and collar lengths, ...).
+    """
+    __slots__ = ('size_name', 'measurements', 'pieces', 'derived')
+
+    def __init__(self, size_name, measurements, pieces, derived):
+        self.size_name = size_name
+        self.measurements = measurements
+        self.pieces = pieces
+        self.derived = derived
+
+    def __repr__(self):
+        return f"PatternGeometry(size={self.size_name!r}, pieces={len(self.pieces)})"
+
+    def __getitem__(self, name):
+        return self.pieces[name]
+
+    @property
+    def lengths(self):
+        """The measured seam lengths (half necklines and collar)."""
+        return {name: self.derived[name] for name in LENGTH_NAMES}
+
+    @property
+    def collar_length_calculated(self):
+        return self.derived['collar_length_calculated']
+
+# The *_edges functions below only do arithmetic on the values they read, so
+# given NumPy arrays of measurements (and derived values) they return the
+# edges of a whole batch of sizes at once (see pattern_consumption).
+
+def back_edges(m, d):
+    """Sew-line edges of the half back, open along the centre back fold."""
+    shoulder_slope, dx_shoulder = d['clamped_shoulder_slope'], d['dx_shoulder']
+    half_chest, length = m['half_chest_flat'], m['garment_length']
+    neck_w, armhole = m['neck_width_half'], m['armhole_depth']
+
+    p5_b, p_neck_ctrl_b, p6_b = d['back_neck_curve']
+    p1_b = (0, 0)
+    p2_b = (half_chest / 2, 0)
+    p3_b = (half_chest / 2, length - armhole)
+    p4_b = (neck_w + dx_shoulder, length - shoulder_slope)
+    p_arm_ctrl_b = ((p4_b[0] + p3_b[0]) / 2 + (half_chest / 2 - (neck_w + dx_shoulder)) * 0.2,
+                    (p4_b[1] + p3_b[1]) / 2 - armhole * 0.1)
+    return [
+        ('straight', [p1_b, p2_b]),
+        ('straight', [p2_b, p3_b]),
+        ('bezier', [p3_b, p_arm_ctrl_b, p4_b]),
+        ('straight', [p4_b, p5_b]),
+        ('bezier', [p5_b, p_neck_ctrl_b, p6_b])
+    ]
+
+def draft_back(m, d, dtype=np.float64):
+    """Back body (cut on fold)."""
+    try:
+        edges = back_edges(m, d)
+        length = m['garment_length']
+        back = Piece.from_edges(PIECE_NAMES[1], edges, dtype=dtype).with_details(
+            notches=[(find_max_y_bezier(*edges[2][1]), (0, 1))],
+            grainline=(1, 1, length - 1),
+            markings=[('fold_line', [edges[0][1][0], edges[-1][1][-1]])])
+        return {PIECE_NAMES[1]: back}
+    except Exception as e:
+        logger.error(f"Error drafting back body: {e}")
+        raise
+
+def front_edges(m, d):
+    """Sew-line edges of the whole front, centred on x = 0."""
+    shoulder_slope, dx_shoulder = d['clamped_shoulder_slope'], d['dx_shoulder']
+    half_chest, length = m['half_chest_flat'], m['garment_length']
+    neck_w, armhole = m['neck_width_half'], m['armhole_depth']
+
+    p_cf_neck, p_fn_ctrl_r, p_hps_r = d['front_neck_curve']
+    p_st_r = (neck_w + dx_shoulder, length - shoulder_slope)
+    p_au_r = (half_chest / 2, length - armhole)
+    p_sh_r = (half_chest / 2, 0)
+    p_fa_ctrl_r = ((p_st_r[0] + p_au_r[0]) / 2 + (half_chest / 2 - (neck_w + dx_shoulder)) * 0.15,
+                   (p_st_r[1] + p_au_r[1]) / 2 - armhole * 0.05)
+
+    def mirror(p):
+        return (-p[0], p[1])
+
+    return [
+        ('bezier', [p_cf_neck, p_fn_ctrl_r, p_hps_r]),
+        ('straight', [p_hps_r, p_st_r]),
+        ('bezier', [p_st_r, p_fa_ctrl_r, p_au_r]),
+        ('straight', [p_au_r, p_sh_r]),
+        ('straight', [p_sh_r, mirror(p_sh_r)]),
+        ('straight', [mirror(p_sh_r), mirror(p_au_r)]),
+        ('bezier', [mirror(p_au_r), mirror(p_fa_ctrl_r), mirror(p_st_r)]),
+        ('straight', [mirror(p_st_r), mirror(p_hps_r)]),
+        ('bezier', [mirror(p_hps_r), mirror(p_fn_ctrl_r), p_cf_neck])
+    ]
+
+def draft_front(m, d, dtype=np.float64):
+    """Front body with the placket guide."""
+    try:
+        length = m['garment_length']
+        edges = front_edges(m, d)
+        p_cf_neck, p_fn_ctrl_r, _ = d['front_neck_curve']
+        v = (p_fn_ctrl_r[0] - p_cf_neck[0], p_fn_ctrl_r[1] - p_cf_neck[1])
+        length_v = math.sqrt(v[0]**2 + v[1]**2)
+        cf_notch_dir = (-v[1] / length_v, v[0] / length_v) if length_v > 0 else (1, 0)
+        placket_w, placket_l = m['placket_width'], m['placket_length']
+        guide_x, guide_y = p_cf_neck[0] - placket_w / 2, p_cf_neck[1] - placket_l
+        front = Piece.from_edges(PIECE_NAMES[0], edges, dtype=dtype).with_details(
+            notches=[(p_cf_neck, cf_notch_dir), (find_max_y_bezier(*edges[2][1]), (0, 1))],
+            grainline=(0, 1, length - 1),
+            markings=[('placket_guide', [(guide_x, guide_y), (guide_x + placket_w, guide_y),
+                                         (guide_x + placket_w, guide_y + placket_l), (guide_x, guide_y + placket_l)])])
+        return {PIECE_NAMES[0]: front}
+    except Exception as e:
+        logger.error(f"Error drafting front body: {e}")
+        raise
+
+def sleeve_edges(m, d):
+    """Sew-line edges of one sleeve, cuff along y = 0."""
+    sL, sWB, sWC = m['sleeve_length_outer'], m['sleeve_bicep_flat'], d['clamped_cuff_flat']
+    cap_height, underarm_length = d['cap_height'], d['underarm_length']
+    p1_cuff_left = ((sWB - sWC) / 2, 0)
+    p2_cuff_right = ((sWB - sWC) / 2 + sWC, 0)
+    p5_underarm_left = (0, underarm_length)
+    p3_underarm_right = (sWB, underarm_length)
+    p_cap_peak = (sWB / 2, sL)
+    p_carrier_left = (sWB * 0.1, underarm_length + cap_height * 0.5)
+    p_carrier_right = (sWB * 0.9, underarm_length + cap_height * 0.5)
+    return [
+        ('straight', [p1_cuff_left, p2_cuff_right]),
+        ('straight', [p2_cuff_right, p3_underarm_right]),
+        ('bezier', [p3_underarm_right, p_carrier_right, p_cap_peak]),
+        ('bezier', [p_cap_peak, p_carrier_left, p5_underarm_left]),
+        ('straight', [p5_underarm_left, p1_cuff_left])
+    ]
+
+def draft_sleeve(m, d, dtype=np.float64):
+    """Both sleeve pieces."""
+    try:
+        sleeve = Piece.from_edges(PIECE_NAMES[2], sleeve_edges(m, d), dtype=dtype)
+        return {PIECE_NAMES[2]: sleeve, PIECE_NAMES[3]: sleeve.copy(PIECE_NAMES[3])}
+    except Exception as e:
+        logger.error(f"Error drafting sleeve pieces: {e}")
+        raise
+
+def draft_collar(m, d, dtype=np.float64):
+    """Both collar pieces and the collar interfacing, sized to the measured neckline."""
+    try:
+        collar_length, collar_h = d['collar_length_calculated'], m['collar_height_flat']
+        collar = Piece.rectangle(PIECE_NAMES[4], collar_length, collar_h, dtype=dtype).with_details(
+            markings=[('collar_fold', [(0, collar_h / 2), (collar_length, collar_h / 2)])])
+        return {
+            PIECE_NAMES[4]: collar,
+            PIECE_NAMES[5]: collar.copy(PIECE_NAMES[5]),
+            PIECE_NAMES[8]: Piece.rectangle(PIECE_NAMES[8], collar_length, collar_h, allowance=0.0, dtype=dtype),
+        }
+    except Exception as e:
+        logger.error(f"Error drafting collar pieces: {e}")
+        raise
+
+def draft_placket(m, d, dtype=np.float64):
+    """Both plackets (buttons on the button side) and the placket interfacing."""
+    try:
+        placket_w, placket_l = m['placket_width'], m['placket_length']
+        buttons = []
+        num_buttons = 3
+        if placket_l > 1 and placket_w > 0.2:
+            button_spacing = placket_l / (num_buttons + 1)
+            button_radius = min(placket_w * 0.15, 0.18)
+            buttons = [('button', ((placket_w / 2, (i + 1) * button_spacing), button_radius))
+                       for i in range(num_buttons)]
+        placket = Piece.rectangle(PIECE_NAMES[6], placket_w, placket_l, dtype=dtype)
+        return {
+            PIECE_NAMES[6]: placket.copy(PIECE_NAMES[6]).with_details(markings=buttons),
+            PIECE_NAMES[7]: placket.copy(PIECE_NAMES[7]),
+            PIECE_NAMES[9]: Piece.rectangle(PIECE_NAMES[9], placket_w, placket_l, allowance=0.0, dtype=dtype),
+        }
+    except Exception as e:
+        logger.error(f"Error drafting placket pieces: {e}")
+        raise
+
+# Drafting groups: (name, values read, drafter). The values are measurement
+# keys and derived names; a group is redrafted when any measurement they
+# depend on changes.
+DRAFT_GROUPS = (
+    ('back', ('half_chest_flat', 'garment_length', 'neck_width_half', 'armhole_depth',
+              'clamped_shoulder_slope', 'dx_shoulder', 'back_neck_curve'), draft_back),
+    ('front', ('half_chest_flat', 'garment_length', 'neck_width_half', 'armhole_depth',
+               'clamped_shoulder_slope', 'dx_shoulder', 'front_neck_curve',
+               'placket_width', 'placket_length'), draft_front),
+    ('sleeve', ('sleeve_length_outer', 'sleeve_bicep_flat', 'clamped_cuff_flat',
+                'cap_height', 'underarm_length'), draft_sleeve),
+    ('collar', ('collar_length_calculated', 'collar_height_flat'), draft_collar),
+    ('placket', ('placket_width', 'placket_length'), draft_placket),
+)
+
+GROUP_PIECES = {
+    'front': (PIECE_NAMES[0],),
+    'back': (PIECE_NAMES[1],),
+    'sleeve': PIECE_NAMES[2:4],
+    'collar': (PIECE_NAMES[4], PIECE_NAMES[5], PIECE_NAMES[8]),
+    'placket': (PIECE_NAMES[6], PIECE_NAMES[7], PIECE_NAMES[9]),
+}
+
+# Drafting group -> measurement keys it depends on.
+GROUP_INPUTS = {
+    group: frozenset().union(*(derived_inputs(name) for name in reads))
+    for group, reads, _ in DRAFT_GROUPS
+}
+
+# Measurement key -> names of the pieces that change when it changes.
+MEASUREMENT_DEPENDENCIES = {
+    key: tuple(name for group, _, _ in DRAFT_GROUPS if key in GROUP_INPUTS[group] for name in GROUP_PIECES[group])
+    for key in MEASUREMENT_KEYS
+}
+
+def normalise_measurements(measurements):
+    """The pattern measurement keys as floats; raises ValueError if any are missing or not positive."""
+    try:
+        missing = [key for key in MEASUREMENT_KEYS if key not in measurements]
+        if missing:
+            raise ValueError(f"Missing measurements: {', '.join(missing)}")
+        flags = [key for key in MEASUREMENT_KEYS if isinstance(measurements[key], bool)]
+        if flags:
+            raise ValueError(f"Measurements must be numbers, not true/false: {', '.join(flags)}")
+        values = {key: float(measurements[key]) for key in MEASUREMENT_KEYS}
+        invalid = [key for key, value in values.items() if not (math.isfinite(value) and value > 0)]
+        if invalid:
+            raise ValueError(f"Measurements must be positive numbers: {', '.join(invalid)}")
+        return values
+    except Exception as e:
+        logger.error(f"Error normalising measurements: {e}")
+        raise
+
+def derive_measurements(measurements):
+    """Lazily evaluated DerivedMeasurements for a measurement set (which is not modified)."""
+    try:
+        return DerivedMeasurements(normalise_measurements(measurements))
+    except Exception as e:
+        logger.error(f"Error deriving measurements: {e}")
+        raise
+
+def changed_measurements(old, new):
+    """Keys whose values differ between two measurement sets."""
+    try:
+        return [key for key in MEASUREMENT_KEYS if float(old[key]) != float(new[key])]
+    except Exception as e:
+        logger.error(f"Error comparing measurements: {e}")
+        raise
+
+def dirty_pieces(old, new):
+    """Names (in PIECE_NAMES order) of the pieces affected by the changes from old to new."""
+    try:
+        affected = {name for key in changed_measurements(old, new) for name in MEASUREMENT_DEPENDENCIES[key]}
+        return [name for name in PIECE_NAMES if name in affected]
+    except Exception as e:
+        logger.error(f"Error finding dirty pieces: {e}")
+        raise
+
+def _draft(derived, groups, pieces=None, dtype=np.float64):
+    pieces = dict(pieces or {})
+    for group, _, drafter in DRAFT_GROUPS:
+        if group in groups:
+            pieces.update(drafter(derived.measurements, derived, dtype))
+    return {name: pieces[name] for name in PIECE_NAMES}
+
+def build_polo_pattern(measurements, size_name=None, dtype=np.float64):
+    """Compute the full polo pattern geometry for a measurement set.
+
+    The input dict is not modified. All pieces are returned in local
+    coordinates (front body centred on x = 0, everything else with its
+    lower-left corner at the origin).
+    """
+    try:
+        derived = derive_measurements(measurements)
+        return PatternGeometry(size_name, derived.measurements, _draft(derived, GROUP_PIECES, dtype=dtype), derived)
+    except Exception as e:
+        logger.error(f"Error building polo pattern: {e}")
+        raise
+
+def update_polo_pattern(geometry, measurements, size_name=None, dtype=np.float64):
+    """Rebuild only the pieces of geometry affected by edited measurements.
+
+    Returns (new geometry, names of the redrafted pieces). Pieces whose
+    inputs did not change are shared with geometry, together with their
+    cached outlines and cut lines, and so are the derived values. With
+    geometry None this is a full build.
+    """
+    try:
+        if geometry is None:
+            return build_polo_pattern(measurements, size_name, dtype), list(PIECE_NAMES)
+        derived = geometry.derived.updated(normalise_measurements(measurements))
+        changed = set(changed_measurements(geometry.measurements, derived.measurements))
+        groups = {group for group, inputs in GROUP_INPUTS.items() if changed & inputs}
+        pieces = _draft(derived, groups, geometry.pieces, dtype)
+        dirty = [name for name in PIECE_NAMES if any(name in GROUP_PIECES[group] for group in groups)]
+        return PatternGeometry(size_name, derived.measurements, pieces, derived), dirty
+    except Exception as e:
+        logger.error(f"Error updating polo pattern: {e}")
+        raise
+
+def product_details(measurements, derived=None):
+    """Approximate finished garment dimensions in cm.
+
+    The collar opening comes from derived (a DerivedMeasurements) when
+    given; otherwise only the two neckline lengths it needs are evaluated
+    from the measurements. The measurements are not modified.
+    """
+    try:
+        m = measurements
+        details = {
+            'chest_cm': 2 * m['half_chest_flat'] * IN_TO_CM,
+            'length_cm': m['garment_length'] * IN_TO_CM,
+            'sleeve_length_cm': m['sleeve_length_outer'] * IN_TO_CM,
+            'bicep_cm': 2 * m['sleeve_bicep_flat'] * IN_TO_CM,
+            'cuff_cm': 2 * m['sleeve_cuff_flat'] * IN_TO_CM,
+        }
+        if derived is None and all(key in m for key in MEASUREMENT_KEYS):
+            derived = derive_measurements(m)
+        if derived is not None:
+            details['collar_opening_cm'] = derived['collar_length_calculated'] * IN_TO_CM
+        elif 'collar_length_calculated' in m:
+            details['collar_opening_cm'] = m['collar_length_calculated'] * IN_TO_CM
+        return details
+    except Exception as e:
+        logger.error(f"Error calculating product details: {e}")
+        raise
@@ -0,0 +1,296 @@
+"""Grading: derive pattern measurements for sizes that are not predefined.
+
+    python pattern_grading.py --method monotone          # XS-4XL from the Men chart
+
+The predefined S/M/L measurement sets are anchored to the body chest of the
+matching rows in the Men chart of sizes.json; any other chart row is graded
+from those anchors by its chest (or bust) measurement. Every measurement
+key is graded at once for a whole run of chests, either piecewise-linearly
+or with a monotone cubic (Fritsch-Carlson) through the anchors, which never
+overshoots between them; beyond the anchors both continue in a straight
+line. That line only holds across the anchor chart itself (XS to 4XL), so
+rows of other charts whose chest falls outside it, such as the Kids sizes,
+are not graded.
+
+size_measurements resolves a size name for every command line tool: S/M/L
+come straight from PREDEFINED_MEASUREMENTS, and only other names load and
+grade the chart.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+
+from pattern_geometry import PREDEFINED_MEASUREMENTS, MEASUREMENT_KEYS
+
+logger = logging.getLogger(__name__)
+
+SIZE_CHART_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sizes.json')
+ANCHOR_CHART = ('Men', 'Size')
+CHEST_COLUMNS = ('Chest', 'Bust')
+# Graded values never drop below this fraction of the smallest anchor value
+MIN_GRADED_FRACTION = 0.25
+GRADING_METHODS = ('linear', 'monotone')
+
+def parse_chart_value(text):
+    """Parse a size chart cell such as '36', '36-37' or 'Up to 35' (ranges give their midpoint)."""
+    try:
+        text = str(text).strip()
+        if text.lower().startswith('up to'):
+            return float(text[len('up to'):])
+        if '-' in text:
+            low, high = text.split('-', 1)
+            return (float(low) + float(high)) / 2
+        return float(text)
+    except Exception as e:
+        logger.error(f"Error parsing size chart value '{text}': {e}")
+        raise
+
+def load_size_chart(path=SIZE_CHART_PATH):
+    """Load the size chart JSON."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading size chart {path}: {e}")
+        raise
+
+def iter_size_chart(chart, path=()):
+    """Yield (path, row) for every row of a nested size chart; row values are parsed floats."""
+    try:
+        for key, value in chart.items():
+            if isinstance(value, dict) and value and all(not isinstance(v, dict) for v in value.values()):
+                yield path + (key,), {column: parse_chart_value(cell) for column, cell in value.items()}
+            elif isinstance(value, dict):
+                yield from iter_size_chart(value, path + (key,))
+    except Exception as e:
+        logger.error(f"Error reading size chart: {e}")
+        raise
+
+def row_chest(row):
+    """Body chest (or bust) of a chart row, or None if the row has neither."""
+    for column in CHEST_COLUMNS:
+        if column in row:
+            return row[column]
+    return None
+
+def anchor_chests(chart=None):
+    """Body chest of each predefined size, taken from the Men chart rows with the same label."""
+    try:
+        chart = load_size_chart() if chart is None else chart
+        rows = chart
+        for key in ANCHOR_CHART:
+            rows = rows[key]
+        return {size: row_chest({c: parse_chart_value(v) for c, v in rows[size].items()})
+                for size in PREDEFINED_MEASUREMENTS if size in rows}
+    except Exception as e:
+        logger.error(f"Error reading anchor sizes from size chart: {e}")
+        raise
+
+def grading_range(chart=None):
+    """(lowest, highest) body chest of the anchor chart rows, the span grading extrapolates over."""
+    try:
+        chart = load_size_chart() if chart is None else chart
+        rows = chart
+        for key in ANCHOR_CHART:
+            rows = rows[key]
+        chests = [row_chest({c: parse_chart_value(v) for c, v in row.items()}) for row in rows.values()]
+        chests = [chest for chest in chests if chest is not None]
+        return min(chests), max(chests)
+    except Exception as e:
+        logger.error(f"Error reading the grading range from size chart: {e}")
+        raise
+
+def monotone_slopes(x, y):
+    """Fritsch-Carlson tangents at the anchors x (shape (n,)) of the columns of y (shape (n, K)).
+
+    Interior tangents are weighted harmonic means of the neighbouring
+    secants (zero where they change sign); end tangents use the one-sided
+    three-point formula, limited so the cubic stays monotone.
+    """
+    try:
+        h = np.diff(x)[:, None]
+        secants = np.diff(y, axis=0) / h
+        slopes = np.zeros_like(y)
+        if len(x) == 2:
+            slopes[:] = secants[0]
+            return slopes
+        w1, w2 = 2 * h[1:] + h[:-1], h[1:] + 2 * h[:-1]
+        same_sign = secants[:-1] * secants[1:] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / secants[:-1] + w2 / secants[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+        for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], secants[0], secants[1])),
+                                      (-1, (h[-1], h[-2], secants[-1], secants[-2]))):
+            slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+            slope = np.where(np.sign(slope) != np.sign(d0), 0.0, slope)
+            slopes[end] = np.where((np.sign(d0) != np.sign(d1)) & (np.abs(slope) > 3 * np.abs(d0)), 3 * d0, slope)
+        return slopes
+    except Exception as e:
+        logger.error(f"Error calculating monotone slopes: {e}")
+        raise
+
+def grade_table(chests, anchors=None, method='linear'):
+    """Measurements graded to body chests, shape (len(chests), len(MEASUREMENT_KEYS)).
+
+    anchors maps predefined size -> body chest (default: from the Men
+    chart). method 'linear' interpolates piecewise-linearly between the
+    anchors and extends the end segments; 'monotone' uses a monotone cubic
+    and extends along its end tangents. Values are rounded to 4 places and
+    kept above MIN_GRADED_FRACTION of the smallest anchor value.
+    """
+    try:
+        if method not in GRADING_METHODS:
+            raise ValueError(f"Unknown grading method '{method}'. Choose from: {', '.join(GRADING_METHODS)}")
+        anchors = anchor_chests() if anchors is None else anchors
+        sizes = sorted(anchors, key=anchors.get)
+        if len(sizes) < 2:
+            raise ValueError("Grading needs at least two anchor sizes")
+        x = np.array([anchors[size] for size in sizes], dtype=float)
+        y = np.array([[PREDEFINED_MEASUREMENTS[size][key] for key in MEASUREMENT_KEYS] for size in sizes], dtype=float)
+        chests = np.atleast_1d(np.asarray(chests, dtype=float))
+        segment = np.clip(np.searchsorted(x, chests, side='right') - 1, 0, len(x) - 2)
+        h = (x[segment + 1] - x[segment])[:, None]
+        t = ((chests - x[segment]) / (x[segment + 1] - x[segment]))[:, None]
+        y0, y1 = y[segment], y[segment + 1]
+        if method == 'linear':
+            graded = y0 + t * (y1 - y0)
+        else:
+            slopes = monotone_slopes(x, y)
+            m0, m1 = slopes[segment], slopes[segment + 1]
+            # Cubic Hermite basis inside the anchor range...
+            u = np.clip(t, 0.0, 1.0)
+            graded = ((2 * u**3 - 3 * u**2 + 1) * y0 + (u**3 - 2 * u**2 + u) * h * m0
+                      + (-2 * u**3 + 3 * u**2) * y1 + (u**3 - u**2) * h * m1)
+            # ...and straight lines along the end tangents outside it.
+            below, above = (chests < x[0])[:, None], (chests > x[-1])[:, None]
+            graded = np.where(below, y[0] + (chests[:, None] - x[0]) * slopes[0], graded)
+            graded = np.where(above, y[-1] + (chests[:, None] - x[-1]) * slopes[-1], graded)
+        return np.round(np.maximum(graded, MIN_GRADED_FRACTION * y.min(axis=0)), 4)
+    except Exception as e:
+        logger.error(f"Error grading measurements: {e}")
+        raise
+
+def measurements_for_chest(chest, anchors=None, method='linear'):
+    """Grade all measurement keys to a body chest (see grade_table)."""
+    try:
+        return dict(zip(MEASUREMENT_KEYS, grade_table([chest], anchors, method)[0].tolist()))
+    except Exception as e:
+        logger.error(f"Error grading measurements for chest {chest}: {e}")
+        raise
+
+def size_run(chart=None, run=ANCHOR_CHART, method='linear'):
+    """Size label -> graded measurements for every row of one chart table, e.g. XS to 4XL of the Men chart."""
+    try:
+        chart = load_size_chart() if chart is None else chart
+        rows = chart
+        for key in run:
+            rows = rows[key]
+        chests = {size: row_chest({c: parse_chart_value(v) for c, v in row.items()}) for size, row in rows.items()}
+        low, high = grading_range(chart)
+        labels = [size for size, chest in chests.items() if chest is not None and low <= chest <= high]
+        if len(labels) < len(chests):
+            logger.warning(f"Not grading {len(chests) - len(labels)} sizes of {'/'.join(run)} "
+                           f"without a chest between {low:g} and {high:g}")
+        table = grade_table([chests[size] for size in labels], anchor_chests(chart), method)
+        return {size: dict(zip(MEASUREMENT_KEYS, values)) for size, values in zip(labels, table.tolist())}
+    except Exception as e:
+        logger.error(f"Error grading size run {'/'.join(run)}: {e}")
+        raise
+
+def chart_size_jobs(path=SIZE_CHART_PATH, method='linear', quiet=False, skipped=None):
+    """(size label, measurements) for every size chart row with a chest or bust inside grading_range.
+
+    Other rows are skipped with a warning (a debug message if quiet); if
+    skipped is a list, (label, reason) is appended to it for each of them.
+    """
+    try:
+        chart = load_size_chart(path)
+        low, high = grading_range(chart)
+        labels, chests, outside = [], [], []
+        for row_path, row in iter_size_chart(chart):
+            label, chest = '/'.join(row_path), row_chest(row)
+            if chest is None:
+                reason = "no chest measurement"
+            elif not low <= chest <= high:
+                reason = f"chest {chest:g} outside the graded range {low:g}-{high:g}"
+                outside.append(label)
+            else:
+                labels.append(label)
+                chests.append(chest)
+                continue
+            if skipped is not None:
+                skipped.append((label, reason))
+            if chest is None:
+                logger.warning(f"Skipping size chart row {label}: {reason}")
+        if outside:
+            (logger.debug if quiet else logger.warning)(
+                f"Skipping {len(outside)} size chart rows with a chest outside {low:g}-{high:g}: {', '.join(outside)}")
+        table = grade_table(chests, anchor_chests(chart), method)
+        return [(label, dict(zip(MEASUREMENT_KEYS, values))) for label, values in zip(labels, table.tolist())]
+    except Exception as e:
+        logger.error(f"Error building size chart jobs: {e}")
+        raise
+
+@functools.lru_cache(maxsize=None)
+def graded_sizes(path=SIZE_CHART_PATH, method='linear'):
+    """Upper-cased name -> (label, measurements) for every graded row of a size chart, cached per chart and method.
+
+    Rows are found by their full label ('Men/Size/XL') and rows of the
+    anchor chart by their short one ('XL') too. The measurement dicts are
+    shared; size_measurements hands out copies.
+    """
+    try:
+        prefix = '/'.join(ANCHOR_CHART) + '/'
+        names = {}
+        for label, measurements in chart_size_jobs(path, method, quiet=True):
+            names[label.upper()] = (label, measurements)
+            if label.startswith(prefix):
+                names[label[len(prefix):].upper()] = (label[len(prefix):], measurements)
+        return names
+    except Exception as e:
+        logger.error(f"Error loading graded sizes: {e}")
+        raise
+
+def size_measurements(size, method='linear', path=SIZE_CHART_PATH):
+    """(size name, measurements) for a predefined size or a graded size chart row.
+
+    S/M/L are returned without reading the chart; any other name ('XL',
+    'Women/EU/US/42', any case) is looked up in graded_sizes. Raises
+    ValueError for names that match neither.
+    """
+    name = str(size).strip()
+    if name.upper() in PREDEFINED_MEASUREMENTS:
+        return name.upper(), dict(PREDEFINED_MEASUREMENTS[name.upper()])
+    graded = graded_sizes(path, method)
+    if name.upper() not in graded:
+        low, high = grading_range(load_size_chart(path))
+        raise ValueError(f"Unknown size '{size}'. Choose from: {', '.join(PREDEFINED_MEASUREMENTS)}, "
+                         f"a graded chart size such as XS or 2XL, or the full label of a chart row "
+                         f"with a chest of {low:g}-{high:g}")
+    label, measurements = graded[name.upper()]
+    return label, dict(measurements)
+
+def main(argv=None):
+    """Command line entry point: print a graded size run as JSON."""
+    parser = argparse.ArgumentParser(description="Grade polo measurements for a size chart run.")
+    parser.add_argument('--chart', default=SIZE_CHART_PATH, help="Size chart JSON (default: sizes.json).")
+    parser.add_argument('--run', default='/'.join(ANCHOR_CHART), help="Chart table to grade, e.g. Men/Size.")
+    parser.add_argument('--method', default='linear', choices=GRADING_METHODS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        run = size_run(load_size_chart(args.chart), tuple(args.run.split('/')), args.method)
+    except Exception as e:
+        logger.error(f"Grading failed: {e}")
+        return 1
+    print(json.dumps(run, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Streaming made-to-measure job processor.
+
+Reads one JSON request per line from a file or stdin and writes one JSON
+result per line, keeping only a bounded number of requests in flight so
+memory stays flat however long the input is:
+
+    python pattern_jobs.py orders.jsonl --workers 4 --output results.jsonl
+    cat orders.jsonl | python pattern_jobs.py - --no-render
+
+A request is {"id": ..., "size": "M", "measurements": {...}}. size picks a
+predefined or chart-graded measurement set (see
+pattern_grading.size_measurements) and measurements overrides some or all
+of its keys; without size, measurements must give every key. id defaults to the
+line number and names the order's output directory. A later request whose id
+maps to a directory already in use (a repeated id, or 'a/b' after 'a_b') is
+reported as an error instead of overwriting the earlier order's pages.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pattern_batch import process_size, size_directory_name
+from pattern_cache import DEFAULT_RENDER_CACHE_BYTES, DEFAULT_RENDER_CACHE_DIR
+from pattern_geometry import normalise_measurements
+from pattern_grading import size_measurements
+
+logger = logging.getLogger(__name__)
+
+# Requests handed to a worker at a time, and chunks in flight per worker
+DEFAULT_CHUNKSIZE = 16
+PENDING_PER_WORKER = 4
+
+def parse_request(line, line_number):
+    """(job id, size name, measurements) from one JSONL request line; raises ValueError if invalid."""
+    return resolve_request(json.loads(line), line_number)
+
+def resolve_request(request, default_id):
+    """(job id, size name, measurements) from a decoded request object; raises ValueError if invalid."""
+    if not isinstance(request, dict):
+        raise ValueError("request must be a JSON object")
+    job_id = str(request.get('id', default_id))
+    size = request.get('size')
+    measurements = request.get('measurements') or {}
+    if not isinstance(measurements, dict):
+        raise ValueError("'measurements' must be an object")
+    if size is not None:
+        size, base = size_measurements(size)
+        measurements = {**base, **measurements}
+    try:
+        measurements = normalise_measurements(measurements)
+    except TypeError as e:
+        raise ValueError(f"Measurements must be numbers: {e}")
+    return job_id, size or job_id, measurements
+
+def process_request(line_number, line, options, conflict=None):
+    """Process one request line; returns its result dict (errors are reported, not raised).
+
+    conflict, if given, says why the request's output directory cannot be
+    used (see claim_directories); the request is then reported, not run.
+    """
+    try:
+        job_id, size_name, measurements = parse_request(line, line_number)
+    except Exception as e:
+        logger.error(f"Invalid request on line {line_number}: {e}")
+        return {'id': None, 'line': line_number, 'size': None, 'outputs': [], 'product_details': None,
+                'timings': {}, 'error': f"invalid request: {e}"}
+    if conflict:
+        logger.error(f"Skipping request on line {line_number}: {conflict}")
+        return {'id': job_id, 'line': line_number, 'size': size_name, 'outputs': [], 'product_details': None,
+                'timings': {}, 'error': conflict}
+    result = process_size((size_name, measurements), directory=job_id, **options)
+    return {'id': job_id, 'line': line_number, **result}
+
+def _process_chunk(chunk, options):
+    return [process_request(line_number, line, options, conflict) for line_number, line, conflict in chunk]
+
+def claim_directories(chunks):
+    """Add to each (line number, line) the reason its output directory is taken, or None.
+
+    Ids are mapped to directories by size_directory_name, so 'a/b', 'a_b'
+    and a repeated id would share one; the first request keeps it and later
+    ones are reported instead of overwriting its pages. The claimed names
+    are the only state kept per request.
+    """
+    claimed = {}
+    for chunk in chunks:
+        marked = []
+        for line_number, line in chunk:
+            conflict = None
+            try:
+                request = json.loads(line)
+                directory = size_directory_name(request.get('id', line_number))
+            except Exception:
+                # Not a JSON object: the worker reports it.
+                directory = None
+            if directory in claimed:
+                conflict = (f"output directory '{directory}' is already used by the request "
+                            f"on line {claimed[directory]}")
+            elif directory is not None:
+                claimed[directory] = line_number
+            marked.append((line_number, line, conflict))
+        yield marked
+
+def iter_chunks(lines, chunksize=DEFAULT_CHUNKSIZE):
+    """Group the non-blank lines into lists of (line number, line), reading lazily."""
+    chunk = []
+    for line_number, line in enumerate(lines, start=1):
+        if line.strip():
+            chunk.append((line_number, line))
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def stream_jobs(lines, workers=None, chunksize=DEFAULT_CHUNKSIZE, max_pending=None, ordered=True, **options):
+    """Process request lines across a process pool; yields one result dict per request.
+
+    At most max_pending chunks (default PENDING_PER_WORKER per worker) are
+    submitted but not yet yielded, so memory does not grow with the input.
+    ordered=False yields chunks as they finish instead of in input order.
+    workers=1 runs inline without a pool. options are passed to process_size.
+    """
+    try:
+        chunks = iter_chunks(lines, chunksize)
+        if options.get('render', True):
+            chunks = claim_directories(chunks)
+        else:
+            chunks = ([(line_number, line, None) for line_number, line in chunk] for chunk in chunks)
+        if workers == 1:
+            for chunk in chunks:
+                yield from _process_chunk(chunk, options)
+            return
+        max_pending = max_pending or PENDING_PER_WORKER * (workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_process_chunk, chunk, options))
+                while len(pending) >= max_pending:
+                    yield from _next_results(pending, ordered)
+            while pending:
+                yield from _next_results(pending, ordered)
+    except Exception as e:
+        logger.error(f"Error streaming jobs: {e}")
+        raise
+
+def _next_results(pending, ordered):
+    # Ordered: wait for the oldest chunk. Unordered: take whichever finishes first.
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
+
+def main(argv=None):
+    """Command line entry point for streaming job runs."""
+    parser = argparse.ArgumentParser(description="Stream JSONL pattern requests through a worker pool.")
+    parser.add_argument('input', nargs='?', default='-', help="JSONL request file, or '-' for stdin (default).")
+    parser.add_argument('--output', default='-', help="JSONL result file, or '-' for stdout (default).")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Requests handed to a worker at a time.")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help=f"Chunks in flight (default: {PENDING_PER_WORKER} per worker).")
+    parser.add_argument('--unordered', action='store_true', help="Emit results as they finish, not in input order.")
+    parser.add_argument('--output-dir', default='orders_output')
+    parser.add_argument('--format', default='png', choices=['png', 'pdf', 'svg'])
+    parser.add_argument('--tolerance', default='screen')
+    parser.add_argument('--no-render', action='store_true', help="Only compute geometry and product details.")
+    parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_DIR, default=None,
+                        help="Serve unchanged pages from this on-disk render cache directory.")
+    parser.add_argument('--render-cache-mb', type=float, default=DEFAULT_RENDER_CACHE_BYTES / 2**20,
+                        help="Size bound of the render cache in MiB.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    options = dict(output_dir=args.output_dir, render=not args.no_render, fmt=args.format,
+                   tolerance=args.tolerance, render_cache_dir=args.render_cache,
+                   render_cache_bytes=int(args.render_cache_mb * 2**20))
+    source = sys.stdin if args.input == '-' else open(args.input)
+    sink = sys.stdout if args.output == '-' else open(args.output, 'w')
+    started = time.perf_counter()
+    processed = failed = 0
+    try:
+        for result in stream_jobs(source, args.workers, args.chunksize, args.max_pending,
+                                  not args.unordered, **options):
+            sink.write(json.dumps(result) + '\n')
+            sink.flush()
+            processed += 1
+            failed += bool(result['error'])
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    logger.info(f"Processed {processed} requests in {time.perf_counter() - started:.2f}s ({failed} failed)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
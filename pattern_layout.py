@@ -0,0 +1,155 @@
+"""Page layouts shared by every renderer.
+
+A layout says which pieces go on a page, in which panel of the page grid,
+where they are moved to and which notes and dimensions go with them. The
+matplotlib renderer in script.py and the direct SVG writer in
+pattern_svg.py both draw from these, so the two stay in step.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAGE_COUNT = 3
+
+# Fill and outline of each piece: (edge colour, face colour, line width, opacity)
+PIECE_STYLES = {
+    "1. Front Body": ('black', 'lightblue', 1.5, 1.0),
+    "2. Back Body": ('black', 'lightgreen', 1.5, 1.0),
+    "3. Sleeve (Piece 1)": ('black', 'thistle', 1.5, 1.0),
+    "4. Sleeve (Piece 2)": ('black', 'thistle', 1.5, 1.0),
+    "5. Collar (Piece 1)": ('black', 'moccasin', 1.5, 1.0),
+    "6. Collar (Piece 2)": ('black', 'moccasin', 1.5, 1.0),
+    "7. Placket (Button Side)": ('black', 'sandybrown', 1.5, 1.0),
+    "8. Placket (Buttonhole Side)": ('black', 'sandybrown', 1.5, 1.0),
+    "9. Collar Interfacing": ('dimgray', 'lightgray', 1.0, 0.4),
+    "10. Placket Interfacing": ('dimgray', 'lightgray', 1.0, 0.4),
+}
+
+class Panel:
+    """One piece on a page.
+
+    axis is the panel's index in the page grid (row-major), dx/dy move the
+    piece from local coordinates and dimensions is 'edges' (label every
+    straight edge) or 'rectangle' (label width and height).
+    """
+    __slots__ = ('axis', 'piece', 'dx', 'dy', 'details', 'dimensions')
+
+    def __init__(self, axis, piece, dx, dy, details, dimensions='edges'):
+        self.axis = axis
+        self.piece = piece
+        self.dx = dx
+        self.dy = dy
+        self.details = details
+        self.dimensions = dimensions
+
+class PageLayout:
+    """Title, size (inches), grid shape and panels of one page, panels in drawing order."""
+    __slots__ = ('number', 'name', 'title', 'figsize', 'shape', 'panels')
+
+    def __init__(self, number, name, title, figsize, shape, panels):
+        self.number = number
+        self.name = name
+        self.title = title
+        self.figsize = figsize
+        self.shape = shape
+        self.panels = panels
+
+def page_title(geometry, number, name):
+    return f"Polo Shirt - Size {geometry.size_name} - Page {number}/{PAGE_COUNT}: {name}"
+
+def body_page_layout(geometry):
+    """Page 1: front and back body."""
+    try:
+        m, lengths = geometry.measurements, geometry.lengths
+        base_offset_x, base_offset_y = 1, 1
+        back_details = [
+            "Cut 1 on Fold",
+            f"HPS to Hem: {m['garment_length']:.1f}\"",
+            f"Half Chest: {m['half_chest_flat']/2:.1f}\"",
+            f"Half Back Neckline: {lengths['half_back_neckline_length']:.2f}\""
+        ]
+        front_details = [
+            "Cut 1 Fabric",
+            f"HPS to Hem: {m['garment_length']:.1f}\"",
+            f"Chest Width: {m['half_chest_flat']:.1f}\"",
+            f"Half Front Neckline: {lengths['half_front_neckline_length']:.2f}\""
+        ]
+        front_plot_offset_x = base_offset_x + m['half_chest_flat'] / 2
+        return PageLayout(1, "Body Pieces", page_title(geometry, 1, "Body Pieces"), (12, 8), (1, 2), [
+            Panel(1, "2. Back Body", base_offset_x, base_offset_y, back_details),
+            Panel(0, "1. Front Body", front_plot_offset_x, base_offset_y, front_details),
+        ])
+    except Exception as e:
+        logger.error(f"Error laying out body page: {e}")
+        raise
+
+def sleeve_collar_page_layout(geometry):
+    """Page 2: sleeves and collars."""
+    try:
+        m = geometry.measurements
+        base_offset_x, base_offset_y = 1, 1
+        sleeve_details = [
+            "Cut 2 Fabric",
+            f"Length: {m['sleeve_length_outer']:.1f}\"",
+            f"Bicep (flat): {m['sleeve_bicep_flat']:.1f}\"",
+            f"Cuff (flat): {geometry.derived['clamped_cuff_flat']:.1f}\"",
+            "Sleeve cap to be refined"
+        ]
+        collar_details = [
+            "Cut 2 Fabric, Cut 1 Interfacing",
+            f"Length: {geometry.collar_length_calculated:.2f}\"",
+            f"Height: {m['collar_height_flat']:.1f}\""
+        ]
+        return PageLayout(2, "Sleeves & Collars", page_title(geometry, 2, "Sleeves & Collars"), (12, 10), (2, 2), [
+            Panel(0, "3. Sleeve (Piece 1)", base_offset_x, base_offset_y, sleeve_details),
+            Panel(1, "4. Sleeve (Piece 2)", base_offset_x, base_offset_y, sleeve_details),
+            Panel(2, "5. Collar (Piece 1)", base_offset_x, base_offset_y, collar_details, 'rectangle'),
+            Panel(3, "6. Collar (Piece 2)", base_offset_x, base_offset_y, collar_details, 'rectangle'),
+        ])
+    except Exception as e:
+        logger.error(f"Error laying out sleeve and collar page: {e}")
+        raise
+
+def placket_page_layout(geometry):
+    """Page 3: plackets and interfacing."""
+    try:
+        m = geometry.measurements
+        base_offset_x, base_offset_y = 1, 1
+        placket_w, placket_l = m['placket_width'], m['placket_length']
+        placket_details_buttons = [
+            "Cut 2 Fabric", "Cut 1-2 Interfacing",
+            f"Piece: {placket_w:.1f}\" x {placket_l:.1f}\""
+        ]
+        interfacing_details = [
+            "Cut 1 Interfacing",
+            f"Collar: {geometry.collar_length_calculated:.2f}\" x {m['collar_height_flat']:.1f}\"",
+            f"Placket: {placket_w:.1f}\" x {placket_l:.1f}\""
+        ]
+        name = "Plackets & Interfacing"
+        return PageLayout(3, name, page_title(geometry, 3, name), (12, 10), (2, 2), [
+            Panel(0, "7. Placket (Button Side)", base_offset_x, base_offset_y, placket_details_buttons, 'rectangle'),
+            Panel(1, "8. Placket (Buttonhole Side)", base_offset_x, base_offset_y, placket_details_buttons, 'rectangle'),
+            Panel(2, "9. Collar Interfacing", base_offset_x, base_offset_y, interfacing_details, 'rectangle'),
+            Panel(3, "10. Placket Interfacing", base_offset_x, base_offset_y, interfacing_details, 'rectangle'),
+        ])
+    except Exception as e:
+        logger.error(f"Error laying out placket page: {e}")
+        raise
+
+PAGE_LAYOUTS = (
+    ('pattern_page1', body_page_layout),
+    ('pattern_page2', sleeve_collar_page_layout),
+    ('pattern_page3', placket_page_layout),
+)
+
+def piece_material(piece_name):
+    """'interfacing' for interfacing pieces, otherwise 'fabric'."""
+    return 'interfacing' if 'Interfacing' in piece_name else 'fabric'
+
+def cutting_notes(geometry):
+    """Piece name -> cutting instruction (the first note of its panel), e.g. 'Cut 2 Fabric'."""
+    notes = {}
+    for _, layout in PAGE_LAYOUTS:
+        for panel in layout(geometry).panels:
+            notes[panel.piece] = panel.details[0]
+    return notes
@@ -0,0 +1,378 @@
+"""Marker making: nesting an order's cut pieces on a fabric width.
+
+    python pattern_nesting.py --size M --width 60 --time-budget 0.5 --svg marker.svg
+
+The fabric runs along y: x is across the width (0 to width) and the marker
+length is the largest y used. Grainlines in the pattern are vertical, so
+pieces may only be turned by 0 or 180 degrees. Pieces cut on the fold are
+unfolded into whole pieces first.
+
+A greedy bottom-left placer puts each piece, in order, at the lowest then
+leftmost candidate position where it overlaps nothing. By default the
+candidates come from the no-fit polygons of the pieces already placed (see
+pattern_nfp), so pieces slide into necklines and armholes; with method
+'bbox' they are the fabric edges and the bounding box edges of the placed
+pieces, tested exactly on the cut lines grown by half the spacing. Method
+'raster' instead searches a fabric bitmap by FFT (see pattern_raster),
+snapping positions to its grid. An optional
+improvement phase then reorders and re-rotates pieces at random, keeping
+the shortest marker found within a time budget.
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+
+import numpy as np
+
+from pattern_geometry import offset_outline, signed_area
+from pattern_layout import piece_material
+from pattern_nfp import no_fit_polygon, outline_key
+from pattern_raster import DEFAULT_RESOLUTION, FabricMask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FABRIC_WIDTH = 60.0
+# Clearance kept between pieces for the cutting knife, in inches
+DEFAULT_SPACING = 0.0625
+ROTATIONS = (0, 180)
+# 'nfp' places pieces against no-fit polygons, 'bbox' only at bounding box edges,
+# 'raster' on a grid by FFT collision search
+PLACEMENT_METHODS = ('nfp', 'bbox', 'raster')
+# Candidate positions tested against the no-fit polygons at a time
+CANDIDATE_CHUNK = 256
+
+class MarkerPiece:
+    """One piece to cut: its polygon at rotation 0, moved so its bounding box starts at the origin."""
+    __slots__ = ('name', 'polygon', 'area', 'size', '_rotated', '_grown', '_key')
+
+    def __init__(self, name, polygon):
+        polygon = np.asarray(polygon, dtype=float)
+        self.name = name
+        self.polygon = polygon - polygon.min(axis=0)
+        self.area = float(abs(signed_area(self.polygon)))
+        self.size = tuple(self.polygon.max(axis=0).tolist())
+        self._rotated = {}
+        self._grown = {}
+        self._key = None
+
+    def __repr__(self):
+        return f"MarkerPiece({self.name!r}, area={self.area:.1f})"
+
+    @property
+    def key(self):
+        """Hash of the outline; equal outlines share cached no-fit polygons."""
+        if self._key is None:
+            self._key = outline_key(self.polygon)
+        return self._key
+
+    def rotated(self, rotation):
+        """Polygon turned by rotation degrees (0 or 180), still starting at the origin."""
+        if rotation not in self._rotated:
+            if rotation == 0:
+                self._rotated[rotation] = self.polygon
+            elif rotation == 180:
+                self._rotated[rotation] = np.asarray(self.size) - self.polygon
+            else:
+                raise ValueError(f"Rotation {rotation} breaks the grainline; use one of {ROTATIONS}")
+        return self._rotated[rotation]
+
+    def grown(self, rotation, spacing):
+        """Rotated polygon grown by spacing / 2, as for the no-fit polygons (see pattern_nfp)."""
+        if spacing <= 0:
+            return self.rotated(rotation)
+        key = (rotation, spacing)
+        if key not in self._grown:
+            self._grown[key] = offset_outline(self.rotated(rotation), spacing / 2, 'miter')
+        return self._grown[key]
+
+class Placement:
+    """A piece placed on the marker: its polygon is moved to (x, y) after rotation."""
+    __slots__ = ('piece', 'rotation', 'x', 'y', 'polygon', 'box')
+
+    def __init__(self, piece, rotation, x, y):
+        self.piece = piece
+        self.rotation = rotation
+        self.x = x
+        self.y = y
+        self.polygon = piece.rotated(rotation) + (x, y)
+        self.box = (x, y, x + piece.size[0], y + piece.size[1])
+
+class Marker:
+    """Placed pieces on a fabric width; length is the fabric used along the grain."""
+    __slots__ = ('width', 'placements', 'length')
+
+    def __init__(self, width, placements):
+        self.width = width
+        self.placements = placements
+        self.length = max((p.box[3] for p in placements), default=0.0)
+
+    @property
+    def utilisation(self):
+        """Fraction of the used fabric rectangle covered by pieces."""
+        used = self.width * self.length
+        return sum(p.piece.area for p in self.placements) / used if used else 0.0
+
+    def summary(self):
+        return {'width': self.width, 'length': round(self.length, 3), 'pieces': len(self.placements),
+                'utilisation': round(self.utilisation, 4),
+                'placements': [{'piece': p.piece.name, 'rotation': p.rotation, 'x': round(p.x, 3),
+                                'y': round(p.y, 3)} for p in self.placements]}
+
+def order_pieces(geometry, garments=1, materials=('fabric',), tolerance='screen'):
+    """The MarkerPieces to cut for garments garments from the given materials.
+
+    Each geometry piece is cut once per garment: the pattern already holds
+    both sleeves, both collar pieces and both plackets as separate pieces.
+    """
+    try:
+        pieces = []
+        for piece in geometry.pieces.values():
+            if piece_material(piece.name) in materials:
+                polygon = piece.unfolded_cut_line(tolerance=tolerance)
+                pieces.extend(MarkerPiece(piece.name if garments == 1 else f"{piece.name} #{i + 1}", polygon)
+                              for i in range(garments))
+        return pieces
+    except Exception as e:
+        logger.error(f"Error collecting marker pieces: {e}")
+        raise
+
+def _orientation(o, p, q):
+    # z of (p - o) x (q - o), broadcast over leading axes
+    return (p[..., 0] - o[..., 0]) * (q[..., 1] - o[..., 1]) - (p[..., 1] - o[..., 1]) * (q[..., 0] - o[..., 0])
+
+def polygons_overlap(a, b):
+    """Whether two simple polygons overlap (touching edges do not count)."""
+    # Only edges inside the shared bounding box can cross.
+    lower = np.maximum(a.min(axis=0), b.min(axis=0))
+    upper = np.minimum(a.max(axis=0), b.max(axis=0))
+    if np.any(lower >= upper):
+        return False
+    a1, a2 = a, np.roll(a, -1, axis=0)
+    b1, b2 = b, np.roll(b, -1, axis=0)
+    keep_a = (np.minimum(a1, a2) <= upper).all(axis=1) & (np.maximum(a1, a2) >= lower).all(axis=1)
+    keep_b = (np.minimum(b1, b2) <= upper).all(axis=1) & (np.maximum(b1, b2) >= lower).all(axis=1)
+    a1, a2, b1, b2 = a1[keep_a, None], a2[keep_a, None], b1[None, keep_b], b2[None, keep_b]
+    if a1.size and b1.size:
+        d1, d2 = _orientation(a1, a2, b1), _orientation(a1, a2, b2)
+        d3, d4 = _orientation(b1, b2, a1), _orientation(b1, b2, a2)
+        if np.any((d1 * d2 < 0) & (d3 * d4 < 0)):
+            return True
+    # No proper crossings: the polygons can still overlap along collinear
+    # edges or by containment, which shows as a vertex or edge midpoint of
+    # one lying inside the other.
+    for p, q in ((a, b), (b, a)):
+        probes = np.vstack((p, (p + np.roll(p, -1, axis=0)) / 2, p.mean(axis=0)))
+        probes = probes[((probes >= lower) & (probes <= upper)).all(axis=1)]
+        if len(probes) and points_in_polygon(probes, q).any():
+            return True
+    return False
+
+def points_in_polygon(points, polygon):
+    """Even-odd rule test of points (shape (P, 2)) against a polygon; returns a bool array."""
+    x, y = points[:, 0, None], points[:, 1, None]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(straddles & (x < x_cross), axis=1) % 2 == 1
+
+def fits(piece, rotation, x, y, placements, spacing=DEFAULT_SPACING):
+    """Whether piece can go at (x, y) at least spacing away from every placed piece.
+
+    Only placements whose bounding boxes come within spacing are tested
+    exactly, on both outlines grown by spacing / 2.
+    """
+    w, h = piece.size
+    polygon = None
+    for placed in placements:
+        x0, y0, x1, y1 = placed.box
+        if x >= x1 + spacing or x + w <= x0 - spacing or y >= y1 + spacing or y + h <= y0 - spacing:
+            continue
+        if polygon is None:
+            polygon = piece.grown(rotation, spacing) + (x, y)
+        if polygons_overlap(polygon, placed.piece.grown(placed.rotation, spacing) + (placed.x, placed.y)):
+            return False
+    return True
+
+def candidate_positions(piece, width, placements, spacing=DEFAULT_SPACING):
+    """Bottom-left candidates (y, x) for a piece's lower-left corner, lowest then leftmost first."""
+    w = piece.size[0]
+    xs = {0.0, width - w}
+    ys = {0.0}
+    for placed in placements:
+        x0, _, x1, y1 = placed.box
+        xs.update((x1 + spacing, x0 - spacing - w))
+        ys.add(y1 + spacing)
+    xs = [x for x in xs if 0.0 <= x <= width - w + 1e-9]
+    return sorted((y, x) for y in ys for x in xs)
+
+def nfp_position(piece, rotation, width, placements, spacing=DEFAULT_SPACING):
+    """Lowest, then leftmost, (y, x) at which piece touches placed pieces or the fabric edges without overlap.
+
+    Candidates are the vertices of the placed pieces' no-fit polygons and
+    the points where their edges meet the fabric edges, kept to positions
+    inside the fabric; they are tested against every no-fit polygon a
+    chunk at a time, in bottom-left order.
+    """
+    right = width - piece.size[0]
+    nfps = [(no_fit_polygon(placed.piece, placed.rotation, piece, rotation, spacing), (placed.x, placed.y))
+            for placed in placements]
+    top = max((placed.box[3] + spacing for placed in placements), default=0.0)
+    candidates = [np.array([[0.0, 0.0], [right, 0.0], [0.0, top]])]
+    for nfp, offset in nfps:
+        candidates.extend((nfp.vertices + offset, nfp.crossings(0, 0.0, offset),
+                           nfp.crossings(0, right, offset), nfp.crossings(1, 0.0, offset)))
+    points = np.vstack(candidates)
+    points = points[(points[:, 0] >= -1e-9) & (points[:, 0] <= right + 1e-9) & (points[:, 1] >= -1e-9)]
+    points = np.clip(points, 0.0, (right, np.inf))
+    points = points[np.lexsort((points[:, 0], points[:, 1]))]
+    for begin in range(0, len(points), CANDIDATE_CHUNK):
+        block = points[begin:begin + CANDIDATE_CHUNK]
+        blocked = np.zeros(len(block), dtype=bool)
+        for nfp, offset in nfps:
+            blocked |= nfp.contains(block, offset)
+        free = np.flatnonzero(~blocked)
+        if len(free):
+            x, y = block[free[0]].tolist()
+            return y, x
+    return top, 0.0
+
+def bottom_left_fill(pieces, width, rotations=None, spacing=DEFAULT_SPACING, method='nfp',
+                     resolution=DEFAULT_RESOLUTION):
+    """Greedy bottom-left placement of pieces in the given order.
+
+    rotations gives each piece's rotations to try (default both); the
+    lowest, then leftmost, feasible position over them wins. method 'nfp'
+    slides pieces into each other's concavities using no-fit polygons;
+    'bbox' only tries positions against bounding box edges; 'raster'
+    searches a bitmap of resolution-inch cells.
+    """
+    try:
+        if method not in PLACEMENT_METHODS:
+            raise ValueError(f"Unknown placement method '{method}'. Choose from: {', '.join(PLACEMENT_METHODS)}")
+        placements = []
+        fabric = FabricMask(width, resolution, spacing) if method == 'raster' else None
+        for i, piece in enumerate(pieces):
+            if piece.size[0] > width:
+                raise ValueError(f"Piece '{piece.name}' ({piece.size[0]:.2f}\") is wider than the fabric ({width}\")")
+            if fabric is not None:
+                y, x, rotation = fabric.position(piece, rotations[i] if rotations else ROTATIONS)
+                fabric.place(piece, rotation, x, y)
+                placements.append(Placement(piece, rotation, x, y))
+                continue
+            best = None
+            for rotation in (rotations[i] if rotations else ROTATIONS):
+                if method == 'nfp':
+                    y, x = nfp_position(piece, rotation, width, placements, spacing)
+                    if best is None or (y, x) < best[:2]:
+                        best = (y, x, rotation)
+                    continue
+                for y, x in candidate_positions(piece, width, placements, spacing):
+                    if best is not None and (y, x) >= best[:2]:
+                        break
+                    if fits(piece, rotation, x, y, placements, spacing):
+                        best = (y, x, rotation)
+                        break
+            y, x, rotation = best
+            placements.append(Placement(piece, rotation, x, y))
+        return Marker(width, placements)
+    except Exception as e:
+        logger.error(f"Error placing marker pieces: {e}")
+        raise
+
+def nest_marker(pieces, width=DEFAULT_FABRIC_WIDTH, time_budget=0.0, seed=0, spacing=DEFAULT_SPACING,
+                method='nfp', resolution=DEFAULT_RESOLUTION):
+    """Nest pieces on a fabric width, minimising marker length.
+
+    Starts from bottom-left fill of the pieces sorted by decreasing area,
+    then until time_budget seconds have passed tries random swaps in the
+    order and random rotation choices, keeping any change that does not
+    lengthen the marker. seed fixes the sequence of tries, so equal budgets
+    on equal hardware give equal markers.
+    """
+    try:
+        started = time.perf_counter()
+        order = sorted(pieces, key=lambda piece: -piece.area)
+        best = bottom_left_fill(order, width, spacing=spacing, method=method, resolution=resolution)
+        rotations = [ROTATIONS] * len(order)
+        rng = random.Random(seed)
+        tries = 0
+        while time.perf_counter() - started < time_budget and len(order) > 1:
+            tries += 1
+            new_order, new_rotations = list(order), list(rotations)
+            i, j = rng.sample(range(len(order)), 2)
+            new_order[i], new_order[j] = new_order[j], new_order[i]
+            new_rotations[i], new_rotations[j] = new_rotations[j], new_rotations[i]
+            k = rng.randrange(len(order))
+            new_rotations[k] = rng.choice((ROTATIONS, (0,), (180,)))
+            marker = bottom_left_fill(new_order, width, new_rotations, spacing, method, resolution)
+            if marker.length <= best.length:
+                best, order, rotations = marker, new_order, new_rotations
+        logger.info(f"Nested {len(pieces)} pieces on {width}\" fabric: {best.length:.2f}\" long, "
+                    f"{best.utilisation:.1%} used ({tries} improvement tries)")
+        return best
+    except Exception as e:
+        logger.error(f"Error nesting marker: {e}")
+        raise
+
+def nest_order(geometry, width=DEFAULT_FABRIC_WIDTH, garments=1, time_budget=0.0, seed=0,
+               spacing=DEFAULT_SPACING, materials=('fabric',), tolerance='screen', method='nfp',
+               resolution=DEFAULT_RESOLUTION):
+    """Nest every cut piece of an order; returns a Marker."""
+    return nest_marker(order_pieces(geometry, garments, materials, tolerance), width, time_budget, seed, spacing,
+                       method, resolution)
+
+def marker_svg(marker, scale=10.0):
+    """The marker as an SVG document string (scale pixels per inch), fabric length downwards."""
+    width, length = marker.width * scale, marker.length * scale
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width + 20:.0f}" height="{length + 20:.0f}">',
+             f'<rect x="10" y="10" width="{width:.1f}" height="{length:.1f}" fill="white" stroke="black"/>']
+    for placed in marker.placements:
+        points = ' '.join(f"{10 + x * scale:.1f},{10 + y * scale:.1f}" for x, y in placed.polygon.tolist())
+        parts.append(f'<polygon points="{points}" fill="lightblue" stroke="navy" stroke-width="1"/>')
+        cx, cy = 10 + (placed.box[0] + placed.box[2]) / 2 * scale, 10 + (placed.box[1] + placed.box[3]) / 2 * scale
+        parts.append(f'<text x="{cx:.1f}" y="{cy:.1f}" font-size="10" text-anchor="middle">{placed.piece.name}</text>')
+    parts.append('</svg>\n')
+    return '\n'.join(parts)
+
+def main(argv=None):
+    """Command line entry point for marker making."""
+    import json
+    from pattern_cache import cached_build_polo_pattern
+    from pattern_grading import size_measurements
+
+    parser = argparse.ArgumentParser(description="Nest a polo order's cut pieces on a fabric width.")
+    parser.add_argument('--size', default='M', help="Predefined or graded size (e.g. M, 2XL).")
+    parser.add_argument('--width', type=float, default=DEFAULT_FABRIC_WIDTH, help="Fabric width in inches.")
+    parser.add_argument('--garments', type=int, default=1, help="Garments cut from one marker.")
+    parser.add_argument('--time-budget', type=float, default=0.5, help="Seconds spent improving the greedy marker.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--spacing', type=float, default=DEFAULT_SPACING, help="Clearance between pieces in inches.")
+    parser.add_argument('--material', default='fabric', choices=['fabric', 'interfacing'])
+    parser.add_argument('--method', default='nfp', choices=PLACEMENT_METHODS,
+                        help="Place pieces against no-fit polygons, bounding boxes or on a raster grid.")
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help="Raster cell size in inches for --method raster.")
+    parser.add_argument('--svg', default=None, help="Also draw the marker to this SVG file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        size_name, measurements = size_measurements(args.size)
+        geometry = cached_build_polo_pattern(measurements, size_name)
+        marker = nest_order(geometry, args.width, args.garments, args.time_budget, args.seed, args.spacing,
+                            (args.material,), method=args.method, resolution=args.resolution)
+    except Exception as e:
+        logger.error(f"Marker making failed: {e}")
+        return 1
+    if args.svg:
+        with open(args.svg, 'w') as f:
+            f.write(marker_svg(marker))
+    print(json.dumps(marker.summary(), indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""No-fit polygons for nesting, with a cache shared across orders.
+
+The no-fit polygon (NFP) of a fixed piece A and an orbiting piece B is
+the set of positions of B's reference point (the lower-left corner of its
+bounding box) at which B overlaps A: the Minkowski sum A + (-B). Pieces
+are concave (necklines, armholes, sleeve caps), so each is split into
+convex parts, by ear clipping followed by Hertel-Mehlhorn merging, and
+the NFP is kept as the union of the convex Minkowski sums of every pair
+of parts. Each part is stored as padded half-plane arrays, so testing
+thousands of candidate positions against an NFP is one vectorised
+expression, and part vertices are candidate touching positions.
+
+NFPs depend only on the two outlines, their rotations and the spacing, so
+they are cached under a hash of the outlines: every order of the same
+size reuses them.
+"""
+import hashlib
+import logging
+
+import numpy as np
+
+from pattern_cache import LRUCache
+from pattern_geometry import offset_outline, signed_area
+
+logger = logging.getLogger(__name__)
+
+# Positions closer than this to an NFP boundary count as touching, not overlapping
+TOUCH_EPSILON = 1e-7
+
+NFP_CACHE = LRUCache(maxsize=8192)
+PARTS_CACHE = LRUCache(maxsize=1024)
+
+def outline_key(polygon):
+    """Stable hex digest of an outline's coordinates."""
+    return hashlib.sha1(np.round(np.asarray(polygon, dtype=float), 6).tobytes()).hexdigest()
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+def convex_hull(points):
+    """Counter-clockwise convex hull (monotone chain) of points, without collinear vertices."""
+    pts = sorted(set(map(tuple, np.asarray(points, dtype=float).tolist())))
+    if len(pts) < 3:
+        return np.array(pts)
+    lower, upper = [], []
+    for p in pts:
+        while len(lower) >= 2 and _cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(pts):
+        while len(upper) >= 2 and _cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return np.array(lower[:-1] + upper[:-1])
+
+def triangulate(polygon):
+    """Ear-clipping triangulation of a simple counter-clockwise polygon; returns index triples."""
+    pts = np.asarray(polygon, dtype=float)
+    index = list(range(len(pts)))
+    triangles = []
+    while len(index) > 3:
+        for k in range(len(index)):
+            i0, i1, i2 = index[k - 1], index[k], index[(k + 1) % len(index)]
+            a, b, c = pts[i0], pts[i1], pts[i2]
+            turn = _cross(a, b, c)
+            if abs(turn) < 1e-12:
+                del index[k]  # collinear vertex: drop it without a triangle
+                break
+            if turn < 0:
+                continue  # reflex vertex
+            others = pts[[j for j in index if j not in (i0, i1, i2)]]
+            if len(others):
+                # An ear holds no other vertex inside or on it.
+                d1 = (b[0] - a[0]) * (others[:, 1] - a[1]) - (b[1] - a[1]) * (others[:, 0] - a[0])
+                d2 = (c[0] - b[0]) * (others[:, 1] - b[1]) - (c[1] - b[1]) * (others[:, 0] - b[0])
+                d3 = (a[0] - c[0]) * (others[:, 1] - c[1]) - (a[1] - c[1]) * (others[:, 0] - c[0])
+                if np.any((d1 >= 0) & (d2 >= 0) & (d3 >= 0)):
+                    continue
+            triangles.append((i0, i1, i2))
+            del index[k]
+            break
+        else:
+            raise ValueError("polygon is not simple: no ear found")
+    if abs(_cross(*pts[index])) >= 1e-12:
+        triangles.append(tuple(index))
+    return triangles
+
+def _is_convex(pts, cycle):
+    n = len(cycle)
+    return all(_cross(pts[cycle[i - 1]], pts[cycle[i]], pts[cycle[(i + 1) % n]]) >= -1e-12 for i in range(n))
+
+def convex_decomposition(polygon):
+    """Convex parts (counter-clockwise vertex arrays) covering a simple polygon.
+
+    Triangulates by ear clipping, then removes diagonals whose two sides
+    merge into a convex polygon (Hertel-Mehlhorn), leaving at most four
+    times the optimal number of parts.
+    """
+    try:
+        pts = np.asarray(polygon, dtype=float)
+        if signed_area(pts) < 0:
+            pts = pts[::-1]
+        parts = [list(t) for t in triangulate(pts)]
+        merged = True
+        while merged:
+            merged = False
+            edges = {}
+            for p, cycle in enumerate(parts):
+                for i in range(len(cycle)):
+                    edges[(cycle[i], cycle[(i + 1) % len(cycle)])] = p
+            for (u, v), p in edges.items():
+                q = edges.get((v, u))
+                if q is None or q == p:
+                    continue
+                first, second = parts[p], parts[q]
+                # first runs v ... u, second u ... v; join them across the diagonal.
+                start = first.index(v)
+                first = first[start:] + first[:start]
+                start = second.index(u)
+                second = second[start:] + second[:start]
+                cycle = first + second[1:-1]
+                if _is_convex(pts, cycle):
+                    parts[p] = cycle
+                    del parts[q]
+                    merged = True
+                    break
+        return [pts[cycle] for cycle in parts]
+    except Exception as e:
+        logger.error(f"Error decomposing polygon into convex parts: {e}")
+        raise
+
+class NoFitPolygon:
+    """Union of convex parts, each stored as padded half-planes and edges.
+
+    planes has shape (K, E, 3): a point p is strictly inside part k when
+    a * x + b * y + c > 0 for each of its E rows (padding rows are
+    (0, 0, 1)). starts/ends hold the parts' edges, padded with zero-length
+    edges.
+    """
+    __slots__ = ('parts', 'planes', 'starts', 'ends', 'vertices')
+
+    def __init__(self, parts):
+        self.parts = parts
+        edges = max(len(part) for part in parts)
+        self.planes = np.zeros((len(parts), edges, 3))
+        self.planes[..., 2] = 1.0
+        self.starts = np.zeros((len(parts), edges, 2))
+        self.ends = np.zeros((len(parts), edges, 2))
+        for k, part in enumerate(parts):
+            nxt = np.roll(part, -1, axis=0)
+            direction = nxt - part
+            normal = np.stack((-direction[:, 1], direction[:, 0]), axis=1)
+            normal /= np.hypot(normal[:, 0], normal[:, 1])[:, None]
+            n = len(part)
+            self.planes[k, :n, :2] = normal
+            self.planes[k, :n, 2] = -np.einsum('ij,ij->i', normal, part)
+            self.starts[k] = part[0]
+            self.ends[k] = part[0]
+            self.starts[k, :n] = part
+            self.ends[k, :n] = nxt
+        self.vertices = np.unique(np.vstack(parts).round(9), axis=0)
+
+    def __repr__(self):
+        return f"NoFitPolygon(parts={len(self.parts)}, vertices={len(self.vertices)})"
+
+    def contains(self, points, offset=(0.0, 0.0)):
+        """Whether each point (shape (P, 2)) lies strictly inside the NFP moved by offset."""
+        p = np.asarray(points, dtype=float) - offset
+        values = (self.planes[None, :, :, 0] * p[:, None, None, 0] + self.planes[None, :, :, 1] * p[:, None, None, 1]
+                  + self.planes[None, :, :, 2])
+        return (values > TOUCH_EPSILON).all(axis=2).any(axis=1)
+
+    def crossings(self, axis, value, offset=(0.0, 0.0)):
+        """Points where the edges of the NFP moved by offset cross the line points[axis] == value."""
+        start, end = self.starts + offset, self.ends + offset
+        a, b = start[..., axis], end[..., axis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (value - a) / (b - a)
+        hit = (t >= 0) & (t <= 1) & (a != b)
+        return start[hit] + t[hit][:, None] * (end[hit] - start[hit])
+
+def convex_parts(piece, rotation, spacing=0.0):
+    """Cached convex decomposition of a marker piece's rotated outline grown by spacing / 2."""
+    key = (piece.key, rotation, spacing)
+
+    def compute():
+        polygon = piece.rotated(rotation)
+        if spacing > 0:
+            polygon = offset_outline(polygon, spacing / 2, 'miter')
+        return convex_decomposition(polygon)
+    return PARTS_CACHE.get_or_compute(key, compute)
+
+def no_fit_polygon(fixed, fixed_rotation, moving, moving_rotation, spacing=0.0, cache=None):
+    """NFP of moving (at moving_rotation) around fixed (at fixed_rotation, placed at the origin).
+
+    fixed and moving are marker pieces (see pattern_nesting.MarkerPiece).
+    With spacing, both outlines are grown by spacing / 2 so placements on
+    the NFP boundary keep that clearance. Results are cached per pair of
+    outlines, rotations and spacing.
+    """
+    try:
+        cache = NFP_CACHE if cache is None else cache
+        key = (fixed.key, fixed_rotation, moving.key, moving_rotation, spacing)
+
+        def compute():
+            parts = []
+            for a in convex_parts(fixed, fixed_rotation, spacing):
+                for b in convex_parts(moving, moving_rotation, spacing):
+                    parts.append(convex_hull((a[:, None, :] - b[None, :, :]).reshape(-1, 2)))
+            return NoFitPolygon(parts)
+        return cache.get_or_compute(key, compute)
+    except Exception as e:
+        logger.error(f"Error computing no-fit polygon: {e}")
+        raise
@@ -0,0 +1,395 @@
+"""Full-scale tiled PDF output for home and office printers.
+
+Every piece is laid out at 1:1 scale on one large sheet, which is then
+tiled across A4 or Letter pages. Neighbouring pages share an overlap strip
+carrying registration targets, so the printed pages can be lined up and
+taped together; a cover page carries a calibration square and a map of
+the tiles. The PDF is written directly, one page at a time, to a binary
+stream: between pages only object offsets are kept, so memory does not
+grow with the number of pages.
+"""
+import logging
+import math
+import zlib
+
+from pattern_layout import cutting_notes
+
+logger = logging.getLogger(__name__)
+
+POINTS_PER_INCH = 72
+# Portrait paper sizes in inches
+PAPER_SIZES = {
+    'letter': (8.5, 11.0),
+    'a4': (210 / 25.4, 297 / 25.4),
+}
+DEFAULT_PAPER = 'letter'
+# Border left blank for the printer, and strip shared by neighbouring pages, in inches
+DEFAULT_MARGIN = 0.4
+DEFAULT_OVERLAP = 0.5
+# Space between pieces on the sheet
+PIECE_GAP = 1.0
+# Sheet widths tried when choosing the layout, in pages
+MAX_COLUMNS = 8
+CALIBRATION_INCHES = 2.0
+CALIBRATION_CM = 5.0
+REGISTRATION_RADIUS = 0.15
+# Bezier approximation of a quarter circle
+CIRCLE_KAPPA = 0.5523
+# Colours as PDF RGB operands
+MARKING_COLOURS = {
+    'fold_line': '0 0.39 0',
+    'placket_guide': '1 0 0',
+    'collar_fold': '1 0.65 0',
+}
+
+class PdfStream:
+    """A minimal PDF writer that streams pages to a binary file object.
+
+    Each page's content stream and page object are written as soon as the
+    page is added; only object offsets and page object numbers are kept
+    for the page tree and cross-reference table written by close(). Text
+    uses the standard Helvetica font, so nothing is embedded.
+    """
+    __slots__ = ('stream', 'position', 'offsets', 'pages', 'compress', '_next')
+
+    CATALOG, PAGES, FONT = 1, 2, 3
+
+    def __init__(self, stream, compress=True):
+        self.stream = stream
+        self.position = 0
+        self.offsets = {}
+        self.pages = []
+        self.compress = compress
+        self._next = self.FONT + 1
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(self.FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                b'/Encoding /WinAnsiEncoding >>')
+
+    def _write(self, data):
+        self.stream.write(data)
+        self.position += len(data)
+
+    def _object(self, number, body):
+        self.offsets[number] = self.position
+        self._write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def add_page(self, content, width, height):
+        """Write one page of width x height points drawn by content (PDF operators as bytes)."""
+        content_number, page_number = self._next, self._next + 1
+        self._next += 2
+        if self.compress:
+            content = zlib.compress(content, 6)
+            header = b'<< /Length %d /Filter /FlateDecode >>' % len(content)
+        else:
+            header = b'<< /Length %d >>' % len(content)
+        self._object(content_number, header + b'\nstream\n' + content + b'\nendstream')
+        self._object(page_number, (f"<< /Type /Page /Parent {self.PAGES} 0 R "
+                                   f"/MediaBox [0 0 {width:.2f} {height:.2f}] "
+                                   f"/Resources << /Font << /F1 {self.FONT} 0 R >> >> "
+                                   f"/Contents {content_number} 0 R >>").encode())
+        self.pages.append(page_number)
+
+    def close(self):
+        """Write the page tree, catalog, cross-reference table and trailer."""
+        kids = ' '.join(f"{number} 0 R" for number in self.pages)
+        self._object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>".encode())
+        self._object(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode())
+        xref = self.position
+        size = self._next
+        self._write(b'xref\n0 %d\n0000000000 65535 f \n' % size
+                    + b''.join(b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size)))
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (size, self.CATALOG, xref))
+
+def _pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def _text(ops, x, y, text, size, angle=0.0, anchor='start', colour='0 0 0'):
+    """Text at (x, y) points; anchor 'middle' centres it using an average Helvetica width."""
+    if anchor == 'middle':
+        shift = 0.26 * size * len(text)
+        x -= shift * math.cos(math.radians(angle))
+        y -= shift * math.sin(math.radians(angle))
+    cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    ops.append(f"BT {colour} rg /F1 {size} Tf {cos:.4f} {sin:.4f} {-sin:.4f} {cos:.4f} {x:.2f} {y:.2f} Tm "
+               f"({_pdf_text(text)}) Tj ET")
+
+def _path(points, dx, dy, close=True):
+    """Path construction operators for a point sequence in inches, moved by (dx, dy)."""
+    coords = [(round((x + dx) * POINTS_PER_INCH, 2), round((y + dy) * POINTS_PER_INCH, 2)) for x, y in points]
+    (x0, y0), rest = coords[0], coords[1:]
+    return f"{x0} {y0} m " + ' '.join([f"{x} {y} l" for x, y in rest]) + (' h' if close else '')
+
+def _circle(cx, cy, r):
+    """Path operators for a circle (all values in points)."""
+    k = CIRCLE_KAPPA * r
+    return (f"{cx + r:.2f} {cy:.2f} m "
+            f"{cx + r:.2f} {cy + k:.2f} {cx + k:.2f} {cy + r:.2f} {cx:.2f} {cy + r:.2f} c "
+            f"{cx - k:.2f} {cy + r:.2f} {cx - r:.2f} {cy + k:.2f} {cx - r:.2f} {cy:.2f} c "
+            f"{cx - r:.2f} {cy - k:.2f} {cx - k:.2f} {cy - r:.2f} {cx:.2f} {cy - r:.2f} c "
+            f"{cx + k:.2f} {cy - r:.2f} {cx + r:.2f} {cy - k:.2f} {cx + r:.2f} {cy:.2f} c h")
+
+def layout_sheet(geometry, width, tolerance='print', gap=PIECE_GAP):
+    """Place every piece at full scale on a sheet width inches wide.
+
+    Pieces keep their orientation (grainlines stay vertical) and are
+    packed tallest first into shelves from the bottom of the sheet up.
+    Returns ([(piece, dx, dy, (x_min, y_min, x_max, y_max)), ...], (width,
+    height)), the boxes being the placed cut lines in sheet inches.
+    """
+    try:
+        items = []
+        for piece in geometry.pieces.values():
+            cut = piece.cut_line(tolerance=tolerance)
+            (x_min, y_min), (x_max, y_max) = cut.min(axis=0).tolist(), cut.max(axis=0).tolist()
+            items.append((piece, x_min, y_min, x_max - x_min, y_max - y_min))
+        items.sort(key=lambda item: -item[4])
+        width = max(width, max(item[3] for item in items) + 2 * gap)
+        placed = []
+        x, shelf_y, shelf_height = gap, gap, 0.0
+        for piece, x_min, y_min, w, h in items:
+            if x + w + gap > width and x > gap:
+                x, shelf_y, shelf_height = gap, shelf_y + shelf_height + gap, 0.0
+            placed.append((piece, x - x_min, shelf_y - y_min, (x, shelf_y, x + w, shelf_y + h)))
+            x += w + gap
+            shelf_height = max(shelf_height, h)
+        return placed, (width, shelf_y + shelf_height + gap)
+    except Exception as e:
+        logger.error(f"Error laying out pattern sheet: {e}")
+        raise
+
+class TileGrid:
+    """The pages a sheet is tiled into.
+
+    Pages are printable wide x high inches after the margin; neighbouring
+    pages overlap by overlap inches, so page (row, column) shows the
+    sheet from (column * step_x, (rows - 1 - row) * step_y). Row 0 (A) is
+    the top of the sheet.
+    """
+    __slots__ = ('paper', 'margin', 'overlap', 'printable', 'step', 'rows', 'columns')
+
+    def __init__(self, sheet, paper=DEFAULT_PAPER, margin=DEFAULT_MARGIN, overlap=DEFAULT_OVERLAP):
+        if paper not in PAPER_SIZES:
+            raise ValueError(f"Unknown paper size '{paper}'. Choose from: {', '.join(PAPER_SIZES)}")
+        self.paper = paper
+        self.margin = margin
+        self.overlap = overlap
+        width, height = PAPER_SIZES[paper]
+        self.printable = (width - 2 * margin, height - 2 * margin)
+        self.step = (self.printable[0] - overlap, self.printable[1] - overlap)
+        if min(self.step) <= 0:
+            raise ValueError(f"Overlap {overlap}\" leaves no room on {paper} paper")
+        self.columns = max(1, math.ceil((sheet[0] - overlap) / self.step[0]))
+        self.rows = max(1, math.ceil((sheet[1] - overlap) / self.step[1]))
+
+    @staticmethod
+    def width_for(columns, paper=DEFAULT_PAPER, margin=DEFAULT_MARGIN, overlap=DEFAULT_OVERLAP):
+        """Sheet width in inches covered exactly by columns pages."""
+        return columns * (PAPER_SIZES[paper][0] - 2 * margin - overlap) + overlap
+
+    def origin(self, row, column):
+        """Lower-left sheet corner of a page, in inches."""
+        return column * self.step[0], (self.rows - 1 - row) * self.step[1]
+
+    def label(self, row, column):
+        return f"{chr(ord('A') + row) if row < 26 else row + 1}{column + 1}"
+
+    def shows(self, row, column, box):
+        """Whether page (row, column) shows any of box (x_min, y_min, x_max, y_max)."""
+        x0, y0 = self.origin(row, column)
+        return (box[0] < x0 + self.printable[0] and box[2] > x0
+                and box[1] < y0 + self.printable[1] and box[3] > y0)
+
+    def targets(self):
+        """Registration target centres on the sheet: corners and edge midpoints of every overlap strip."""
+        half = self.overlap / 2
+        points = []
+        for column in range(self.columns + 1):
+            for row in range(self.rows + 1):
+                x, y = column * self.step[0] + half, row * self.step[1] + half
+                points.append((x, y))
+                if row < self.rows:
+                    points.append((x, y + self.step[1] / 2))
+                if column < self.columns:
+                    points.append((x + self.step[0] / 2, y))
+        return points
+
+def piece_content(piece, dx, dy, size_name, note, tolerance='print'):
+    """PDF operators drawing one placed piece in sheet points."""
+    ops = ['q 1 J 1 j']
+    cut = piece.cut_line(tolerance=tolerance) if piece.allowances.any() else piece.outline(tolerance)
+    # Cut line solid, sew line dashed grey
+    ops.append(f"0 0 0 RG 1 w {_path(cut.tolist(), dx, dy)} S")
+    if piece.allowances.any():
+        ops.append(f"0.45 0.45 0.45 RG 0.6 w [4 2] 0 d {_path(piece.outline(tolerance).tolist(), dx, dy)} S [] 0 d")
+    ops.append("0 0 0 RG 0 0 0 rg")
+    for point, direction in piece.notches:
+        tip = (point[0] + 0.25 * direction[0], point[1] + 0.25 * direction[1])
+        ops.append(f"1.2 w {_path((point, tip), dx, dy, close=False)} S")
+    if piece.grainline is not None:
+        x, y_start, y_end = piece.grainline
+        ops.append(f"1 w {_path(((x, y_start), (x, y_end)), dx, dy, close=False)} S")
+        for y_tip, sign in ((y_end, 1), (y_start, -1)):
+            head = ((x - 0.1, y_tip - sign * 0.2), (x + 0.1, y_tip - sign * 0.2), (x, y_tip))
+            ops.append(f"{_path(head, dx, dy)} f")
+        _text(ops, (x + dx - 0.08) * POINTS_PER_INCH, ((y_start + y_end) / 2 + dy) * POINTS_PER_INCH,
+              "GRAINLINE", 8, 90, 'middle')
+    for kind, data in piece.markings:
+        if kind == 'button':
+            (cx, cy), radius = data
+            ops.append(f"0.66 g 0 0 0 RG 0.8 w "
+                       f"{_circle((cx + dx) * POINTS_PER_INCH, (cy + dy) * POINTS_PER_INCH, radius * POINTS_PER_INCH)} B "
+                       f"0 0 0 rg")
+            continue
+        colour = MARKING_COLOURS.get(kind, '0 0 0')
+        dash = '[6 2 1 2] 0 d' if kind == 'fold_line' else '[4 2] 0 d'
+        ops.append(f"{colour} RG 1 w {dash} {_path(data, dx, dy, close=False)} S [] 0 d 0 0 0 RG")
+        if kind == 'fold_line':
+            (fx, y1), (_, y2) = data
+            _text(ops, (fx + dx + 0.2) * POINTS_PER_INCH, ((y1 + y2) / 2 + dy) * POINTS_PER_INCH,
+                  "PLACE ON FOLD", 9, 90, 'middle', colour)
+    # Labels along the piece's longer side, centred on the sew line
+    (x_min, y_min), (x_max, y_max) = piece.bounds
+    cx, cy = ((x_min + x_max) / 2 + dx) * POINTS_PER_INCH, ((y_min + y_max) / 2 + dy) * POINTS_PER_INCH
+    angle = 90 if y_max - y_min > x_max - x_min else 0
+    lines = [(piece.name, 12), (f"Size {size_name}", 10), (note, 10)]
+    for i, (line, size) in enumerate(lines):
+        offset = (1 - i) * 14
+        if angle:
+            _text(ops, cx - offset + 16, cy, line, size, 90, 'middle')
+        else:
+            _text(ops, cx, cy + offset, line, size, 0, 'middle')
+    ops.append('Q')
+    return '\n'.join(ops)
+
+def choose_layout(geometry, paper=DEFAULT_PAPER, margin=DEFAULT_MARGIN, overlap=DEFAULT_OVERLAP,
+                  columns=None, tolerance='print'):
+    """(placed pieces, sheet size, tile grid) using the fewest printed pages.
+
+    With columns given the sheet is that many pages wide; otherwise every
+    width from 1 to MAX_COLUMNS pages is tried.
+    """
+    best = None
+    for count in ([columns] if columns else range(1, MAX_COLUMNS + 1)):
+        placed, sheet = layout_sheet(geometry, TileGrid.width_for(count, paper, margin, overlap), tolerance)
+        grid = TileGrid(sheet, paper, margin, overlap)
+        pages = sum(any(grid.shows(r, c, box) for *_, box in placed)
+                    for r in range(grid.rows) for c in range(grid.columns))
+        if best is None or pages < best[0]:
+            best = (pages, placed, sheet, grid)
+    return best[1:]
+
+def cover_content(geometry, grid, placed, used, tolerance='print'):
+    """PDF operators for the cover page: instructions, calibration squares and tile map."""
+    width, height = (size * POINTS_PER_INCH for size in PAPER_SIZES[grid.paper])
+    margin = grid.margin * POINTS_PER_INCH
+    ops = []
+    top = height - margin
+    _text(ops, margin, top - 16, f"Polo Shirt - Size {geometry.size_name} - Full-scale tiled pattern", 16)
+    paper = 'Letter' if grid.paper == 'letter' else grid.paper.upper()
+    lines = [
+        f"Print on {paper} paper at 100% / Actual size - do not fit or scale to page.",
+        f"Check the squares below before printing the rest: {CALIBRATION_INCHES:g} in and {CALIBRATION_CM:g} cm.",
+        f"{len(used)} pages in {grid.rows} rows (A-{grid.label(grid.rows - 1, 0)[0]}) and {grid.columns} columns; "
+        f"neighbouring pages overlap by {grid.overlap:g} in.",
+        "Trim or fold one page along its dashed overlap line, lay it over its neighbour",
+        "so the registration targets coincide, and tape. Solid line: cut. Dashed grey: sew.",
+    ]
+    for i, line in enumerate(lines):
+        _text(ops, margin, top - 40 - i * 14, line, 10)
+    # Calibration squares side by side, 1/4" ticks on the inch square
+    y = top - 40 - len(lines) * 14 - 10 - CALIBRATION_INCHES * POINTS_PER_INCH
+    side = CALIBRATION_INCHES * POINTS_PER_INCH
+    ops.append(f"0 0 0 RG 1 w {margin:.2f} {y:.2f} {side:.2f} {side:.2f} re S")
+    for i in range(1, int(CALIBRATION_INCHES * 4)):
+        tick = 6 if i % 4 else 12
+        ops.append(f"0.5 w {margin + i * 18:.2f} {y:.2f} m {margin + i * 18:.2f} {y + tick:.2f} l S")
+    _text(ops, margin + side / 2, y + side / 2, f"{CALIBRATION_INCHES:g} in", 10, anchor='middle')
+    side_cm = CALIBRATION_CM / 2.54 * POINTS_PER_INCH
+    x_cm = margin + side + 36
+    ops.append(f"1 w {x_cm:.2f} {y:.2f} {side_cm:.2f} {side_cm:.2f} re S")
+    _text(ops, x_cm + side_cm / 2, y + side_cm / 2, f"{CALIBRATION_CM:g} cm", 10, anchor='middle')
+    # Tile map: the sheet scaled into the rest of the page
+    map_top = y - 30
+    sheet_w = grid.columns * grid.step[0] + grid.overlap
+    sheet_h = grid.rows * grid.step[1] + grid.overlap
+    scale = min((width - 2 * margin) / sheet_w, (map_top - margin) / sheet_h)
+    ox, oy = margin, map_top - sheet_h * scale
+    ops.append(f"q {scale / POINTS_PER_INCH:.5f} 0 0 {scale / POINTS_PER_INCH:.5f} {ox:.2f} {oy:.2f} cm "
+               f"0.3 0.3 0.3 RG {0.5 * POINTS_PER_INCH / scale:.3f} w")
+    for piece, dx, dy, _ in placed:
+        ops.append(f"{_path(piece.cut_line(tolerance=tolerance).tolist(), dx, dy)} S")
+    ops.append("Q")
+    for row in range(grid.rows):
+        for column in range(grid.columns):
+            x0, y0 = grid.origin(row, column)
+            rx, ry = ox + x0 * scale, oy + y0 * scale
+            rw, rh = grid.printable[0] * scale, grid.printable[1] * scale
+            if (row, column) in used:
+                ops.append(f"0 0 1 RG 0.6 w {rx:.2f} {ry:.2f} {rw:.2f} {rh:.2f} re S")
+                _text(ops, rx + rw / 2, ry + rh / 2, grid.label(row, column), 9, anchor='middle', colour='0 0 1')
+            else:
+                ops.append(f"0.7 0.7 0.7 RG 0.4 w [2 2] 0 d {rx:.2f} {ry:.2f} {rw:.2f} {rh:.2f} re S [] 0 d")
+    return '\n'.join(ops).encode('cp1252', 'replace')
+
+def tile_content(grid, row, column, pieces, targets, page_number, page_count, size_name):
+    """PDF operators for one tile: the sheet clipped to the page, targets, overlap lines and label."""
+    margin = grid.margin * POINTS_PER_INCH
+    pw, ph = grid.printable[0] * POINTS_PER_INCH, grid.printable[1] * POINTS_PER_INCH
+    x0, y0 = grid.origin(row, column)
+    ops = [f"q {margin:.2f} {margin:.2f} {pw:.2f} {ph:.2f} re W n "
+           f"1 0 0 1 {margin - x0 * POINTS_PER_INCH:.2f} {margin - y0 * POINTS_PER_INCH:.2f} cm"]
+    ops.extend(pieces)
+    r = REGISTRATION_RADIUS * POINTS_PER_INCH
+    ops.append("0 0 0 RG 0.5 w")
+    for tx, ty in targets:
+        if x0 <= tx <= x0 + grid.printable[0] and y0 <= ty <= y0 + grid.printable[1]:
+            px, py = tx * POINTS_PER_INCH, ty * POINTS_PER_INCH
+            ops.append(f"{_circle(px, py, r)} S {px - 1.6 * r:.2f} {py:.2f} m {px + 1.6 * r:.2f} {py:.2f} l "
+                       f"{px:.2f} {py - 1.6 * r:.2f} m {px:.2f} {py + 1.6 * r:.2f} l S")
+    ops.append("Q")
+    # Overlap strip edges and the page label inside the bottom strip
+    inset = grid.overlap * POINTS_PER_INCH
+    ops.append(f"0.6 0.6 0.6 RG 0.4 w [3 3] 0 d {margin + inset:.2f} {margin + inset:.2f} "
+               f"{pw - 2 * inset:.2f} {ph - 2 * inset:.2f} re S [] 0 d")
+    _text(ops, margin + inset + 6, margin + inset / 2 - 3,
+          f"{grid.label(row, column)}   page {page_number} of {page_count}   Size {size_name}   "
+          f"print at 100%", 8, colour='0.3 0.3 0.3')
+    return '\n'.join(ops).encode('cp1252', 'replace')
+
+def write_tiled_pdf(stream, geometry, paper=DEFAULT_PAPER, margin=DEFAULT_MARGIN, overlap=DEFAULT_OVERLAP,
+                    columns=None, tolerance='print'):
+    """Write a full-scale tiled PDF of a pattern to a binary stream.
+
+    The first page is the cover with calibration squares and the tile map;
+    pages that would show nothing are left out. Returns a summary dict.
+    """
+    try:
+        placed, sheet, grid = choose_layout(geometry, paper, margin, overlap, columns, tolerance)
+        notes = cutting_notes(geometry)
+        contents = [piece_content(piece, dx, dy, geometry.size_name, notes.get(piece.name, ''), tolerance)
+                    for piece, dx, dy, _ in placed]
+        used = [(r, c) for r in range(grid.rows) for c in range(grid.columns)
+                if any(grid.shows(r, c, box) for *_, box in placed)]
+        targets = grid.targets()
+        width, height = (size * POINTS_PER_INCH for size in PAPER_SIZES[paper])
+        pdf = PdfStream(stream)
+        pdf.add_page(cover_content(geometry, grid, placed, set(used), tolerance), width, height)
+        for number, (row, column) in enumerate(used, start=2):
+            pieces = [content for content, (*_, box) in zip(contents, placed) if grid.shows(row, column, box)]
+            pdf.add_page(tile_content(grid, row, column, pieces, targets, number, len(used) + 1,
+                                      geometry.size_name), width, height)
+        pdf.close()
+        logger.info(f"Tiled {sheet[0]:.1f}\" x {sheet[1]:.1f}\" sheet onto {len(used)} {paper} pages "
+                    f"({grid.rows} x {grid.columns})")
+        return {'paper': paper, 'pages': len(used) + 1, 'rows': grid.rows, 'columns': grid.columns,
+                'tiles': len(used), 'blank_tiles': grid.rows * grid.columns - len(used),
+                'sheet_inches': sheet, 'bytes': pdf.position}
+    except Exception as e:
+        logger.error(f"Error writing tiled PDF: {e}")
+        raise
+
+def save_tiled_pdf(path, geometry, **options):
+    """write_tiled_pdf to a file; returns its summary dict."""
+    with open(path, 'wb') as f:
+        return write_tiled_pdf(f, geometry, **options)
@@ -0,0 +1,145 @@
+"""Raster-mask nesting: FFT collision search on a fabric bitmap.
+
+An alternative to the polygon placers in pattern_nesting. Each piece's cut
+outline is rasterised to a boolean mask at a fixed resolution (1/8" by
+default). A cell is set when any point of it comes within spacing / 2 of
+the piece, so pieces whose masks share no cell keep at least that
+clearance however coarse the grid. The fabric is a bitmap of occupied
+cells; cross-correlating it with a piece's mask by FFT counts, for every
+grid position at once, the cells the piece would collide with, and the
+lowest, then leftmost, position with no collision wins. The cost depends
+on the fabric and piece sizes in cells, not on how many vertices the
+curved armholes and necklines have.
+"""
+import logging
+import math
+
+import numpy as np
+
+from pattern_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Grid cell size in inches
+DEFAULT_RESOLUTION = 0.125
+# Rows of cells rasterised at a time, bounding the (rows, columns, edges) temporaries
+RASTER_ROWS = 64
+
+MASK_CACHE = LRUCache(maxsize=1024)
+
+def mask_pad(resolution, spacing=0.0):
+    """Cells a mask extends beyond its piece's bounding box on every side."""
+    return int(math.ceil((spacing / 2 + resolution * math.sqrt(0.5)) / resolution - 1e-9))
+
+def rasterize(polygon, resolution=DEFAULT_RESOLUTION, spacing=0.0):
+    """Boolean mask of the cells within spacing / 2 of a polygon whose bounding box starts at the origin.
+
+    Row i, column j of the mask covers the cell whose lower-left corner is
+    ((j - pad) * resolution, (i - pad) * resolution), pad being
+    mask_pad(resolution, spacing). A cell is set when its centre is inside
+    the polygon or within spacing / 2 plus half a cell diagonal of an edge.
+    """
+    try:
+        polygon = np.asarray(polygon, dtype=float)
+        pad = mask_pad(resolution, spacing)
+        reach = spacing / 2 + resolution * math.sqrt(0.5)
+        cols, rows = (np.ceil(polygon.max(axis=0) / resolution - 1e-9).astype(int) + 2 * pad).tolist()
+        xs = (np.arange(cols) - pad + 0.5) * resolution
+        ys = (np.arange(rows) - pad + 0.5) * resolution
+        start = polygon
+        direction = np.roll(polygon, -1, axis=0) - start
+        length2 = np.maximum(np.einsum('ij,ij->i', direction, direction), 1e-18)
+        mask = np.zeros((rows, cols), dtype=bool)
+        for top in range(0, rows, RASTER_ROWS):
+            y = ys[top:top + RASTER_ROWS, None]
+            # Even-odd rule: count edge crossings to the right of each cell centre.
+            straddles = (start[:, 1] > y) != (start[:, 1] + direction[:, 1] > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = start[:, 0] + (y - start[:, 1]) * direction[:, 0] / direction[:, 1]
+            x_cross = np.where(straddles, x_cross, -np.inf)
+            inside = np.count_nonzero(x_cross[:, None, :] > xs[None, :, None], axis=2) % 2 == 1
+            # Distance from each cell centre to its nearest edge.
+            px = xs[None, :, None] - start[:, 0]
+            py = y[:, :, None] - start[:, 1]
+            t = np.clip((px * direction[:, 0] + py * direction[:, 1]) / length2, 0.0, 1.0)
+            dx, dy = px - t * direction[:, 0], py - t * direction[:, 1]
+            near = (dx * dx + dy * dy <= reach * reach).any(axis=2)
+            mask[top:top + RASTER_ROWS] = inside | near
+        return mask
+    except Exception as e:
+        logger.error(f"Error rasterising polygon: {e}")
+        raise
+
+def piece_mask(piece, rotation, resolution=DEFAULT_RESOLUTION, spacing=0.0):
+    """Cached mask of a marker piece (see pattern_nesting.MarkerPiece) at a rotation."""
+    key = (piece.key, rotation, resolution, spacing)
+    return MASK_CACHE.get_or_compute(key, lambda: rasterize(piece.rotated(rotation), resolution, spacing))
+
+def _fft_size(n):
+    """Smallest 2-3-5-smooth length of at least n, which numpy's FFT handles fastest."""
+    size = n
+    while True:
+        m = size
+        for factor in (2, 3, 5):
+            while m % factor == 0:
+                m //= factor
+        if m == 1:
+            return size
+        size += 1
+
+class FabricMask:
+    """Occupied cells of a fabric width, growing in length as pieces are placed.
+
+    Row k, column l covers the cell whose lower-left corner is
+    ((l - pad) * resolution, (k - pad) * resolution), so the pad cells of a
+    piece's mask may fall below y = 0 and past the selvedges while the
+    piece itself stays on the fabric.
+    """
+    __slots__ = ('width', 'resolution', 'spacing', 'pad', 'cells', 'top')
+
+    def __init__(self, width, resolution=DEFAULT_RESOLUTION, spacing=0.0):
+        self.width = width
+        self.resolution = resolution
+        self.spacing = spacing
+        self.pad = mask_pad(resolution, spacing)
+        self.cells = np.zeros((0, int(math.ceil(width / resolution)) + 2 * self.pad + 1), dtype=bool)
+        self.top = 0
+
+    def __repr__(self):
+        return f"FabricMask(width={self.width}, resolution={self.resolution}, rows={self.top})"
+
+    def position(self, piece, rotations):
+        """Lowest, then leftmost, collision-free (y, x, rotation) of piece over the given rotations.
+
+        The occupied cells are transformed once and cross-correlated with
+        each rotation's mask; positions are multiples of the resolution.
+        """
+        masks = [(rotation, piece_mask(piece, rotation, self.resolution, self.spacing)) for rotation in rotations]
+        last = int(math.floor((self.width - piece.size[0]) / self.resolution + 1e-9))
+        rows = self.top + max(mask.shape[0] for _, mask in masks)
+        cols = max([self.cells.shape[1]] + [last + mask.shape[1] for _, mask in masks])
+        shape = (_fft_size(rows), _fft_size(cols))
+        fabric = np.fft.rfft2(self.cells[:self.top].astype(float), shape)
+        best = None
+        for rotation, mask in masks:
+            counts = np.fft.irfft2(fabric * np.conj(np.fft.rfft2(mask.astype(float), shape)), shape)
+            # Row self.top is above every occupied cell, so some row is always free.
+            free = counts[:self.top + 1, :last + 1] < 0.5
+            row = int(np.argmax(free.any(axis=1)))
+            col = int(np.argmax(free[row]))
+            if best is None or (row, col) < best[:2]:
+                best = (row, col, rotation)
+        row, col, rotation = best
+        return row * self.resolution, col * self.resolution, rotation
+
+    def place(self, piece, rotation, x, y):
+        """Mark a piece's cells occupied with its lower-left corner at (x, y), a grid position."""
+        mask = piece_mask(piece, rotation, self.resolution, self.spacing)
+        row, col = round(y / self.resolution), round(x / self.resolution)
+        end = row + mask.shape[0]
+        if end > len(self.cells):
+            grown = np.zeros((max(end, 2 * len(self.cells)), self.cells.shape[1]), dtype=bool)
+            grown[:len(self.cells)] = self.cells
+            self.cells = grown
+        self.cells[row:end, col:col + mask.shape[1]] |= mask
+        self.top = max(self.top, end)
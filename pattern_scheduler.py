@@ -0,0 +1,115 @@
+"""Task-graph scheduler for pattern generation.
+
+A pattern order is a small DAG: the geometry task (which yields
+collar_length_calculated and every piece) feeds the three page-render
+tasks, which are independent of each other. TaskGraph runs any such DAG on
+a thread or process pool, submitting each task as soon as its dependencies
+have finished.
+"""
+import logging
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from pattern_cache import cached_build_polo_pattern
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+class Task:
+    """A node of a TaskGraph: func(*args, *dependency_results)."""
+    __slots__ = ('name', 'func', 'args', 'deps')
+
+    def __init__(self, name, func, args=(), deps=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Task({self.name!r}, deps={list(self.deps)!r})"
+
+class TaskGraph:
+    """A DAG of tasks whose results are passed on to their dependents."""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, name, func, *args, deps=()):
+        """Add a task; its dependencies' results are appended to args when it runs."""
+        if name in self.tasks:
+            raise ValueError(f"Duplicate task '{name}'")
+        missing = [dep for dep in deps if dep not in self.tasks]
+        if missing:
+            raise ValueError(f"Task '{name}' depends on unknown tasks: {', '.join(missing)}")
+        self.tasks[name] = Task(name, func, args, deps)
+        return name
+
+    def run(self, executor='thread', workers=None):
+        """Run the graph and return {task name: result}.
+
+        executor is 'thread', 'process' or an existing concurrent.futures
+        executor (which is left open). The first failing task cancels the
+        tasks not yet started and its exception is re-raised.
+        """
+        try:
+            if isinstance(executor, str):
+                if executor not in EXECUTORS:
+                    raise ValueError(f"Unknown executor '{executor}'. Choose from: {', '.join(EXECUTORS)}")
+                with EXECUTORS[executor](max_workers=workers) as pool:
+                    return self._run(pool)
+            return self._run(executor)
+        except Exception as e:
+            logger.error(f"Error running task graph: {e}")
+            raise
+
+    def _run(self, pool):
+        results, running = {}, {}
+        pending = dict(self.tasks)
+        while pending or running:
+            for name, task in list(pending.items()):
+                if all(dep in results for dep in task.deps):
+                    args = task.args + tuple(results[dep] for dep in task.deps)
+                    running[pool.submit(task.func, *args)] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Task graph has a cycle among: {', '.join(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception:
+                    for other in running:
+                        other.cancel()
+                    raise
+        return results
+
+def render_page_task(page_index, tolerance, fmt, dpi, geometry, svg_backend='direct'):
+    """Render one page of a pattern headless; returns (filename, bytes)."""
+    # Imported inside the task so process workers load the renderer on demand.
+    from script import PAGE_RENDERERS, render_page_bytes
+    name, render_page = PAGE_RENDERERS[page_index]
+    return f"{name}.{fmt}", render_page_bytes(render_page, geometry, tolerance, fmt, dpi, True, svg_backend)
+
+def pattern_task_graph(size_name, measurements, tolerance='screen', fmt='png', dpi=None):
+    """Build the geometry -> page render DAG for one order."""
+    from script import PAGE_RENDERERS
+    graph = TaskGraph()
+    graph.add('geometry', cached_build_polo_pattern, dict(measurements), size_name)
+    for index, (name, _) in enumerate(PAGE_RENDERERS):
+        graph.add(name, render_page_task, index, tolerance, fmt, dpi, deps=('geometry',))
+    return graph
+
+def render_pattern_parallel(size_name, measurements, tolerance='screen', fmt='png', dpi=None,
+                            executor='process', workers=None):
+    """Render all pages of one order concurrently.
+
+    Returns (geometry, [(filename, bytes), ...]) with pages in page order.
+    """
+    try:
+        from script import PAGE_RENDERERS
+        results = pattern_task_graph(size_name, measurements, tolerance, fmt, dpi).run(executor, workers)
+        return results['geometry'], [results[name] for name, _ in PAGE_RENDERERS]
+    except Exception as e:
+        logger.error(f"Error rendering pattern pages in parallel: {e}")
+        raise
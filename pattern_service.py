@@ -0,0 +1,342 @@
+"""Local HTTP pattern service.
+
+An asyncio server in front of a pre-warmed process pool:
+
+    python pattern_service.py --port 8765 --workers 4
+
+    GET  /health
+    GET  /geometry?size=M&half_chest_flat=21      pieces, derived values and lengths as JSON
+    GET  /details?size=L                          product details as JSON
+    GET  /pages/pattern_page2.svg?size=S          one rendered page (png, svg or pdf)
+
+Measurements come from the query string (size plus any measurement keys)
+or from a POST body in the pattern_jobs.py request format. Identical
+requests that arrive while one is being computed share its result, at most
+max_inflight jobs run on the pool at once, and requests beyond max_queue
+distinct pending jobs get 503.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from pattern_cache import (
+    DEFAULT_RENDER_CACHE_BYTES, DEFAULT_RENDER_CACHE_DIR, DiskRenderCache, cached_build_polo_pattern,
+    measurement_key, render_cache_key, shared_render_cache,
+)
+from pattern_geometry import MEASUREMENT_KEYS, PREDEFINED_MEASUREMENTS, product_details
+from pattern_jobs import resolve_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 256
+MAX_BODY_BYTES = 1024 * 1024
+KEEPALIVE_TIMEOUT = 15.0
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf',
+                 'json': 'application/json'}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class ServiceOverloaded(Exception):
+    """Raised when too many distinct jobs are already pending."""
+
+def warm_worker():
+    """Pool initializer: load the renderer and matplotlib before the first request."""
+    import script
+    script.load_matplotlib(headless=True)
+    cached_build_polo_pattern(PREDEFINED_MEASUREMENTS['M'], 'M')
+
+def worker_pid():
+    return os.getpid()
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+def piece_payload(piece, tolerance='screen'):
+    """JSON-serialisable description of one piece in local coordinates."""
+    try:
+        payload = {
+            'name': piece.name,
+            'edges': [{'kind': edge.kind, 'points': np.asarray(edge.points, dtype=float).tolist()}
+                      for edge in piece.edges],
+            'allowances': piece.allowances.tolist(),
+            'fold_edge': int(piece.fold_edge),
+            'notches': piece.notches,
+            'grainline': piece.grainline,
+            'markings': piece.markings,
+            'bounds': piece.bounds,
+            'area': piece.area,
+            'perimeter': piece.perimeter,
+            'cut_line': None,
+        }
+        if piece.allowances.any():
+            payload['cut_line'] = piece.cut_line(tolerance=tolerance).tolist()
+        return payload
+    except Exception as e:
+        logger.error(f"Error serialising piece '{piece.name}': {e}")
+        raise
+
+def geometry_job(size_name, measurements, tolerance='screen'):
+    """Pool task: the full pattern geometry as JSON bytes."""
+    geometry = cached_build_polo_pattern(measurements, size_name)
+    payload = {
+        'size': size_name,
+        'measurements': geometry.measurements,
+        'derived': dict(geometry.derived),
+        'lengths': geometry.lengths,
+        'pieces': [piece_payload(piece, tolerance) for piece in geometry.pieces.values()],
+    }
+    return json.dumps(payload, default=_json_default).encode()
+
+def page_cache_key(size_name, measurements, page_name, fmt, tolerance='screen', dpi=None):
+    """Render cache key of one page, as used by page_job."""
+    from script import DEFAULT_SVG_BACKEND, RENDERER_VERSION
+    return render_cache_key(measurements, size_name, page_name, fmt, dpi, tolerance, RENDERER_VERSION,
+                            DEFAULT_SVG_BACKEND if fmt == 'svg' else None)
+
+def page_job(size_name, measurements, page_index, fmt, tolerance='screen', dpi=None,
+             render_cache_dir=None, render_cache_bytes=DEFAULT_RENDER_CACHE_BYTES):
+    """Pool task: one rendered page as bytes, through the worker's render cache if configured."""
+    from script import PAGE_RENDERERS, render_page_bytes
+    geometry = cached_build_polo_pattern(measurements, size_name)
+    name, render_page = PAGE_RENDERERS[page_index]
+    cache = shared_render_cache(render_cache_dir, render_cache_bytes) if render_cache_dir else None
+    key = page_cache_key(size_name, geometry.measurements, name, fmt, tolerance, dpi)
+    data = cache.get(key, fmt) if cache is not None else None
+    if data is None:
+        data = render_page_bytes(render_page, geometry, tolerance, fmt, dpi, headless=True)
+        if cache is not None:
+            cache.put(key, fmt, data)
+    return data
+
+def request_measurements(query, body):
+    """(size name, measurements) from the query string or a JSON request body."""
+    if body:
+        try:
+            request = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON body: {e}")
+    else:
+        measurements = {key: float(query[key]) for key in MEASUREMENT_KEYS if key in query}
+        # Partial measurements are overrides of a predefined size, M unless given.
+        size = query.get('size', None if len(measurements) == len(MEASUREMENT_KEYS) else 'M')
+        request = {'size': size, 'measurements': measurements}
+        if 'id' in query:
+            request['id'] = query['id']
+    # resolve_request rejects missing, non-numeric and non-positive measurements.
+    _, size_name, measurements = resolve_request(request, 'custom')
+    return size_name, measurements
+
+class PatternService:
+    """Routes HTTP requests to a process pool with request coalescing and load limits."""
+
+    def __init__(self, workers=None, max_inflight=None, max_queue=DEFAULT_MAX_QUEUE,
+                 render_cache_dir=None, render_cache_bytes=DEFAULT_RENDER_CACHE_BYTES):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or self.workers
+        self.max_queue = max_queue
+        self.render_cache_dir = render_cache_dir
+        self.render_cache_bytes = render_cache_bytes
+        # Pages already on disk are served from here without a round trip to the pool.
+        self.render_cache = DiskRenderCache(render_cache_dir, render_cache_bytes) if render_cache_dir else None
+        self.page_names = None
+        self.pool = None
+        self.jobs = {}
+        self.stats = {'requests': 0, 'jobs': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+        self._slots = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start and warm the worker pool, then listen; returns the asyncio server."""
+        try:
+            from script import PAGE_RENDERERS
+            self.page_names = [name for name, _ in PAGE_RENDERERS]
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+            loop = asyncio.get_running_loop()
+            # One concurrent task per worker makes the pool start (and warm) all of them now.
+            pids = await asyncio.gather(*(loop.run_in_executor(self.pool, worker_pid)
+                                          for _ in range(self.workers)))
+            logger.info(f"Warmed {len(set(pids))} worker processes")
+            return await asyncio.start_server(self.handle_connection, host, port)
+        except Exception as e:
+            logger.error(f"Error starting pattern service: {e}")
+            raise
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def run_job(self, key, func, *args):
+        """Run func(*args) on the pool, sharing the result with identical in-flight requests."""
+        job = self.jobs.get(key)
+        if job is not None:
+            self.stats['coalesced'] += 1
+        else:
+            if len(self.jobs) >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise ServiceOverloaded(f"{len(self.jobs)} jobs pending")
+            job = asyncio.ensure_future(self._submit(func, *args))
+            self.jobs[key] = job
+            self.stats['jobs'] += 1
+            job.add_done_callback(lambda _: self.jobs.pop(key, None))
+        # Shielded so a client hanging up does not cancel a job others are waiting on.
+        return await asyncio.shield(job)
+
+    async def _submit(self, func, *args):
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def dispatch(self, method, target, body):
+        """Handle one request; returns (status, content type, body bytes)."""
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        path = url.path.rstrip('/') or '/'
+        if method not in ('GET', 'POST'):
+            return 405, 'json', {'error': f"method {method} not allowed"}
+        if path == '/health':
+            return 200, 'json', {'status': 'ok', 'workers': self.workers, 'pending': len(self.jobs), **self.stats}
+        tolerance = query.get('tolerance', 'screen')
+        dpi = float(query['dpi']) if 'dpi' in query else None
+        if path == '/details':
+            size_name, measurements = request_measurements(query, body)
+            return 200, 'json', {'size': size_name, 'product_details': product_details(measurements)}
+        if path == '/geometry':
+            size_name, measurements = request_measurements(query, body)
+            key = ('geometry', measurement_key(measurements, size_name, tolerance))
+            return 200, 'json', await self.run_job(key, geometry_job, size_name, measurements, tolerance)
+        if path.startswith('/pages/'):
+            name, _, fmt = path[len('/pages/'):].rpartition('.')
+            if name not in self.page_names or fmt not in ('png', 'svg', 'pdf'):
+                return 404, 'json', {'error': f"unknown page {path[len('/pages/'):]}",
+                                     'pages': [f"{n}.{{png,svg,pdf}}" for n in self.page_names]}
+            size_name, measurements = request_measurements(query, body)
+            if self.render_cache is not None:
+                data = self.render_cache.get(page_cache_key(size_name, measurements, name, fmt, tolerance, dpi), fmt)
+                if data is not None:
+                    return 200, fmt, data
+            key = ('page', measurement_key(measurements, size_name, name, fmt, tolerance, dpi))
+            data = await self.run_job(key, page_job, size_name, measurements, self.page_names.index(name),
+                                      fmt, tolerance, dpi, self.render_cache_dir, self.render_cache_bytes)
+            return 200, fmt, data
+        return 404, 'json', {'error': f"no route for {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes or idles out."""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, 'json', {'error': 'malformed request line'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    await self.respond(writer, 400, 'json', {'error': 'invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, 'json', {'error': 'request body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                status, content_type, payload = await self.handle_request(method, target, body)
+                await self.respond(writer, status, content_type, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Error serving connection: {e}")
+        finally:
+            writer.close()
+
+    async def handle_request(self, method, target, body):
+        self.stats['requests'] += 1
+        try:
+            return await self.dispatch(method, target, body)
+        except ServiceOverloaded as e:
+            return 503, 'json', {'error': f"service overloaded: {e}"}
+        except ValueError as e:
+            # Request validation raises ValueError; anything else is a server fault.
+            return 400, 'json', {'error': str(e)}
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error handling {method} {target}: {e}")
+            return 500, 'json', {'error': str(e)}
+
+    async def respond(self, writer, status, content_type, payload, keep_alive):
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload, default=_json_default).encode()
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                f"Content-Type: {CONTENT_TYPES[content_type]}",
+                f"Content-Length: {len(payload)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **options):
+    """Run the service until cancelled."""
+    service = PatternService(**options)
+    server = await service.start(host, port)
+    logger.info(f"Pattern service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    """Command line entry point for the pattern service."""
+    parser = argparse.ArgumentParser(description="Serve polo patterns over HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument('--max-inflight', type=int, default=None,
+                        help="Jobs running on the pool at once (default: one per worker).")
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Distinct pending jobs before requests are refused with 503.")
+    parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_DIR, default=None,
+                        help="Serve unchanged pages from this on-disk render cache directory.")
+    parser.add_argument('--render-cache-mb', type=float, default=DEFAULT_RENDER_CACHE_BYTES / 2**20,
+                        help="Size bound of the render cache in MiB.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, max_inflight=args.max_inflight,
+                          max_queue=args.max_queue, render_cache_dir=args.render_cache,
+                          render_cache_bytes=int(args.render_cache_mb * 2**20)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
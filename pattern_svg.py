@@ -0,0 +1,213 @@
+"""Direct SVG writer for pattern pages.
+
+Writes the pages described in pattern_layout.py straight to SVG text:
+sew line outlines, seam allowance cut lines, notches, grainlines, markings
+and labels, with the colours, line styles and framing of the matplotlib
+renderer in script.py. No figure, artist or font machinery is involved, so
+a page takes well under a millisecond once the piece outlines are cached;
+matplotlib remains the backend for PNG and PDF.
+"""
+import io
+import logging
+import math
+from html import escape
+
+import numpy as np
+
+from pattern_layout import PAGE_LAYOUTS, PIECE_STYLES
+
+logger = logging.getLogger(__name__)
+
+POINTS_PER_INCH = 72
+FONT_FAMILY = "DejaVu Sans, Bitstream Vera Sans, Arial, sans-serif"
+# matplotlib's '--' and '-.' dash patterns, in multiples of the line width
+DASHED = (3.7, 1.6)
+DASH_DOT = (6.4, 1.6, 1.0, 1.6)
+# Page margins and the room a panel keeps for its title, in points
+PAGE_PAD = 11.0
+TITLE_SPACE = 0.05
+PANEL_GAP = 22.0
+PANEL_TITLE_HEIGHT = 26.0
+
+def _dash(pattern, lw):
+    return ','.join(f"{step * lw:.2f}" for step in pattern)
+
+class PanelTransform:
+    """Maps piece coordinates (inches, y up) into a panel box on the page (points, y down).
+
+    offset is added to piece coordinates first, which places a piece
+    without copying it.
+    """
+    __slots__ = ('scale', 'left', 'top', 'width', 'height', '_origin', '_factors')
+
+    def __init__(self, limits, box, offset=(0.0, 0.0)):
+        (x_min, x_max), (y_min, y_max) = limits
+        left, top, width, height = box
+        # Equal aspect: shrink the box to the data's proportions, centred as matplotlib does.
+        self.scale = min(width / (x_max - x_min), height / (y_max - y_min))
+        self.width = (x_max - x_min) * self.scale
+        self.height = (y_max - y_min) * self.scale
+        self.left = left + (width - self.width) / 2
+        self.top = top + (height - self.height) / 2
+        self._origin = np.array([self.left + (offset[0] - x_min) * self.scale,
+                                 self.top + (y_max - offset[1]) * self.scale])
+        self._factors = np.array([self.scale, -self.scale])
+
+    def points(self, points):
+        return np.asarray(points, dtype=float).reshape(-1, 2) * self._factors + self._origin
+
+    def point(self, x, y):
+        return self._origin[0] + x * self.scale, self._origin[1] - y * self.scale
+
+    def path(self, points, close=True):
+        body = ' L'.join([f"{x},{y}" for x, y in self.points(points).round(2).tolist()])
+        return f"M{body}{'Z' if close else ''}"
+
+def panel_limits(piece, offset=(0.0, 0.0), tolerance='screen'):
+    """Data limits of a panel, padded as in script.draw_pattern_piece_with_details."""
+    outline = piece.outline(tolerance)
+    x_min, y_min = outline.min(axis=0).tolist()
+    x_max, y_max = outline.max(axis=0).tolist()
+    for kind, data in piece.markings:
+        if kind == 'button':
+            (cx, cy), radius = data
+            x_min, x_max = min(x_min, cx - radius), max(x_max, cx + radius)
+            y_min, y_max = min(y_min, cy - radius), max(y_max, cy + radius)
+        else:
+            for x, y in data:
+                x_min, x_max = min(x_min, x), max(x_max, x)
+                y_min, y_max = min(y_min, y), max(y_max, y)
+    x_min, x_max, y_min, y_max = x_min + offset[0], x_max + offset[0], y_min + offset[1], y_max + offset[1]
+    x_range = x_max - x_min if x_max > x_min else 1.0
+    y_range = y_max - y_min if y_max > y_min else 1.0
+    x_pad = max(x_range * 0.15, 1.0)
+    return ((x_min - x_pad, x_max + x_pad),
+            (y_min - max(y_range * 0.10, 1.0), y_max + max(y_range * 0.25, 2.0)))
+
+def panel_boxes(layout):
+    """(left, top, width, height) of each panel's plotting area, in points."""
+    width, height = (size * POINTS_PER_INCH for size in layout.figsize)
+    rows, cols = layout.shape
+    top = height * TITLE_SPACE + PAGE_PAD
+    cell_w = (width - 2 * PAGE_PAD - (cols - 1) * PANEL_GAP) / cols
+    cell_h = (height - top - PAGE_PAD - (rows - 1) * PANEL_GAP) / rows
+    return [(PAGE_PAD + col * (cell_w + PANEL_GAP),
+             top + row * (cell_h + PANEL_GAP) + PANEL_TITLE_HEIGHT,
+             cell_w, cell_h - PANEL_TITLE_HEIGHT)
+            for row in range(rows) for col in range(cols)]
+
+def _text(write, x, y, text, size, color='black', anchor='start', baseline='auto', rotate=0.0, extra=''):
+    transform = f' transform="rotate({-rotate:.2f} {x:.2f} {y:.2f})"' if rotate else ''
+    write(f'<text x="{x:.2f}" y="{y:.2f}" font-size="{size}" fill="{color}" text-anchor="{anchor}" '
+          f'dominant-baseline="{baseline}"{transform}{extra}>{escape(text, quote=False)}</text>\n')
+
+def _line(write, p1, p2, color='black', lw=1.0, dash=None):
+    dash_attr = f' stroke-dasharray="{_dash(dash, lw)}"' if dash else ''
+    write(f'<line x1="{p1[0]:.2f}" y1="{p1[1]:.2f}" x2="{p2[0]:.2f}" y2="{p2[1]:.2f}" '
+          f'stroke="{color}" stroke-width="{lw}"{dash_attr}/>\n')
+
+def write_piece(write, piece, t, tolerance='screen'):
+    """Outline, cut line, grainline, notches and markings of one placed piece."""
+    edge, face, lw, alpha = PIECE_STYLES[piece.name]
+    opacity = f' opacity="{alpha}"' if alpha < 1 else ''
+    write(f'<path d="{t.path(piece.outline(tolerance))}" fill="{face}" stroke="{edge}" '
+          f'stroke-width="{lw}" stroke-linejoin="miter"{opacity}/>\n')
+    if piece.allowances.any():
+        write(f'<path d="{t.path(piece.cut_line(tolerance=tolerance))}" fill="none" stroke="red" '
+              f'stroke-width="1" stroke-dasharray="{_dash(DASHED, 1)}"/>\n')
+    if piece.grainline is not None:
+        x, y_start, y_end = piece.grainline
+        _line(write, t.point(x, y_start), t.point(x, y_end))
+        # Arrows of 0.5" shaft plus a 0.2" x 0.2" head beyond each end
+        for y_from, sign in ((y_end, 1), (y_start, -1)):
+            _line(write, t.point(x, y_from), t.point(x, y_from + sign * 0.5))
+            head = t.points([(x - 0.1, y_from + sign * 0.5), (x + 0.1, y_from + sign * 0.5),
+                             (x, y_from + sign * 0.7)])
+            write(f'<path d="M{head[0, 0]:.2f},{head[0, 1]:.2f} L{head[1, 0]:.2f},{head[1, 1]:.2f} '
+                  f'L{head[2, 0]:.2f},{head[2, 1]:.2f}Z" fill="black"/>\n')
+    for point, direction in piece.notches:
+        tip = (point[0] + 0.25 * direction[0], point[1] + 0.25 * direction[1])
+        _line(write, t.point(*point), t.point(*tip), lw=1.5)
+    for kind, data in piece.markings:
+        if kind == 'fold_line':
+            write(f'<path d="{t.path(data)}" fill="none" stroke="darkgreen" stroke-width="1.5" '
+                  f'stroke-dasharray="{_dash(DASH_DOT, 1.5)}"/>\n')
+            (x, y_start), (_, y_end) = data
+            cx, cy = t.point(x + 0.3, (y_start + y_end) / 2)
+            halo = ' stroke="white" stroke-opacity="0.5" stroke-width="3" paint-order="stroke"'
+            _text(write, cx - 5, cy, "FOLD", 8, 'darkgreen', 'middle', 'central', 90, halo)
+            _text(write, cx + 5, cy, "LINE", 8, 'darkgreen', 'middle', 'central', 90, halo)
+        elif kind == 'placket_guide':
+            write(f'<path d="{t.path(data)}" fill="none" stroke="red" stroke-width="1" '
+                  f'stroke-dasharray="{_dash(DASHED, 1)}"/>\n')
+        elif kind == 'collar_fold':
+            write(f'<path d="{t.path(data)}" fill="none" stroke="orange" stroke-width="1" '
+                  f'stroke-dasharray="{_dash(DASHED, 1)}"/>\n')
+        elif kind == 'button':
+            (cx, cy), radius = data
+            x, y = t.point(cx, cy)
+            write(f'<circle cx="{x:.2f}" cy="{y:.2f}" r="{radius * t.scale:.2f}" fill="darkgrey" '
+                  f'stroke="black" stroke-width="1"/>\n')
+
+def write_dimensions(write, piece, t, dimensions, offset=0.3):
+    """Blue length labels: every straight sew edge, or a rectangle's width and height."""
+    if dimensions == 'rectangle':
+        (x, y), (x_max, y_max) = piece.bounds
+        width, height = x_max - x, y_max - y
+        _text(write, *t.point(x + width / 2, y - 0.5), f"{width:.2f}\"", 8, 'blue', 'middle', 'hanging')
+        px, py = t.point(x - 0.5, y + height / 2)
+        _text(write, px, py, f"{height:.2f}\"", 8, 'blue', 'middle', 'auto', 90)
+        return
+    for edge_type, points in piece.seam_edges:
+        if edge_type != 'straight':
+            continue
+        (x1, y1), (x2, y2) = points[0], points[1]
+        length = math.hypot(x2 - x1, y2 - y1)
+        if length == 0:
+            continue
+        nx, ny = (y2 - y1) / length, -(x2 - x1) / length
+        px, py = t.point((x1 + x2) / 2 + nx * offset, (y1 + y2) / 2 + ny * offset)
+        angle = math.degrees(math.atan2(y2 - y1, x2 - x1))
+        _text(write, px, py, f"{length:.2f}\"", 8, 'blue', 'middle', 'central', angle)
+
+def write_panel(write, geometry, panel, box, tolerance='screen'):
+    """One panel: piece, dimensions, title and notes."""
+    # The geometry's own piece is drawn through an offset transform, so its
+    # cached outline and cut line are used as they are.
+    piece = geometry[panel.piece]
+    offset = (panel.dx, panel.dy)
+    t = PanelTransform(panel_limits(piece, offset, tolerance), box, offset)
+    write(f'<g id="{escape(piece.name)}">\n')
+    write_piece(write, piece, t, tolerance)
+    write_dimensions(write, piece, t, panel.dimensions)
+    _text(write, t.left + t.width / 2, t.top - 10, piece.name, 12, anchor='middle')
+    spacing = 0.07 if len(panel.details) <= 5 else 0.06
+    for i, line in enumerate(panel.details):
+        _text(write, t.left + 0.05 * t.width, t.top + (0.05 + i * spacing) * t.height, line, 8,
+              baseline='hanging')
+    write('</g>\n')
+
+def write_svg_page(stream, geometry, page_index, tolerance='screen'):
+    """Write page page_index (0-based, in PAGE_LAYOUTS order) of a pattern as SVG to a text stream."""
+    try:
+        layout = PAGE_LAYOUTS[page_index][1](geometry)
+        width, height = (size * POINTS_PER_INCH for size in layout.figsize)
+        write = stream.write
+        write(f'<?xml version="1.0" encoding="utf-8" standalone="no"?>\n'
+              f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}pt" height="{height}pt" '
+              f'viewBox="0 0 {width} {height}" font-family="{FONT_FAMILY}">\n'
+              f'<rect width="100%" height="100%" fill="white"/>\n')
+        _text(write, width / 2, height * 0.02, layout.title, 14, anchor='middle', baseline='hanging')
+        boxes = panel_boxes(layout)
+        for panel in layout.panels:
+            write_panel(write, geometry, panel, boxes[panel.axis], tolerance)
+        write('</svg>\n')
+    except Exception as e:
+        logger.error(f"Error writing SVG page {page_index + 1}: {e}")
+        raise
+
+def svg_page(geometry, page_index, tolerance='screen'):
+    """One page of a pattern as an SVG document string."""
+    buffer = io.StringIO()
+    write_svg_page(buffer, geometry, page_index, tolerance)
+    return buffer.getvalue()
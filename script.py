@@ -1,73 +1,104 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import argparse
+import io
 import math
 import logging
+import os
 import sys
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import numpy as np
+
+from pattern_geometry import (
+    IN_TO_CM, PREDEFINED_MEASUREMENTS, MEASUREMENT_KEYS, PIECE_NAMES, FLATTEN_TOLERANCES,
+    SEAM_ALLOWANCE, EDGE_KINDS, Edge, Piece, PatternGeometry, build_polo_pattern,
+    dist, get_path_length, quadratic_bezier, generate_bezier_points, offset_bezier_curve,
+    evaluate_bezier_batch, evaluate_bezier_derivative_batch, offset_bezier_batch,
+    quadratic_bezier_length, quadratic_bezier_length_batch, bezier_segment_count,
+    bezier_segment_count_batch, resolve_tolerance, find_max_y_bezier, find_min_y_bezier,
+    bezier_bounding_box, bezier_bounds_batch, flatten_edges, signed_area, offset_outline,
+    cut_line_polygon, rectangle_edges, product_details, update_polo_pattern,
+)
+from pattern_grading import size_measurements
+from pattern_layout import PAGE_LAYOUTS, PIECE_STYLES, body_page_layout, placket_page_layout, sleeve_collar_page_layout
+from pattern_print import DEFAULT_OVERLAP, PAPER_SIZES, save_tiled_pdf
+from pattern_cache import (
+    DEFAULT_RENDER_CACHE_BYTES, DEFAULT_RENDER_CACHE_DIR, GEOMETRY_CACHE, DiskRenderCache,
+    cached_build_polo_pattern, render_cache_key,
+)
+
+# The geometry core moved to pattern_geometry; its names stay importable from
+# script for code written against the original single-module version.
+__all__ = [
+    # Re-exported from pattern_geometry, pattern_layout and pattern_cache
+    'IN_TO_CM', 'PREDEFINED_MEASUREMENTS', 'MEASUREMENT_KEYS', 'PIECE_NAMES', 'FLATTEN_TOLERANCES',
+    'SEAM_ALLOWANCE', 'EDGE_KINDS', 'Edge', 'Piece', 'PatternGeometry', 'build_polo_pattern',
+    'dist', 'get_path_length', 'quadratic_bezier', 'generate_bezier_points', 'offset_bezier_curve',
+    'evaluate_bezier_batch', 'evaluate_bezier_derivative_batch', 'offset_bezier_batch',
+    'quadratic_bezier_length', 'quadratic_bezier_length_batch', 'bezier_segment_count',
+    'bezier_segment_count_batch', 'resolve_tolerance', 'find_max_y_bezier', 'find_min_y_bezier',
+    'bezier_bounding_box', 'bezier_bounds_batch', 'flatten_edges', 'signed_area', 'offset_outline',
+    'cut_line_polygon', 'rectangle_edges', 'product_details', 'update_polo_pattern',
+    'PAGE_LAYOUTS', 'PIECE_STYLES', 'GEOMETRY_CACHE', 'cached_build_polo_pattern',
+    # Defined here
+    'RENDERER_VERSION', 'SVG_BACKENDS', 'DEFAULT_SVG_BACKEND', 'PAGE_RENDERERS', 'PAGE_PIECES',
+    'load_matplotlib', 'new_figure', 'draw_straight_seam_allowance', 'draw_bezier_seam_allowance',
+    'draw_cut_line', 'draw_grainline', 'draw_notch', 'annotate_straight_edges',
+    'annotate_rectangle_dimensions', 'get_user_measurements', 'draw_pattern_piece_with_details',
+    'piece_style', 'piece_patches', 'place_piece', 'draw_rectangle_piece', 'render_layout_page',
+    'render_body_page', 'render_sleeve_collar_page', 'render_placket_page', 'dirty_pages',
+    'render_page_bytes', 'render_pattern_pages', 'generate_pattern_visuals', 'save_page',
+    'update_pattern_visuals', 'PatternPreview', 'output_product_details', 'main',
+]
+
 logger = logging.getLogger(__name__)
 
-# Conversion factor
-IN_TO_CM = 2.54
+# Bump whenever rendered output changes so the on-disk render cache is invalidated
+RENDERER_VERSION = 1
 
-# Helper Functions
-def dist(p1, p2):
-    """Calculate distance between two points."""
-    try:
-        return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
-    except Exception as e:
-        logger.error(f"Error calculating distance: {e}")
-        raise
+# SVG pages are written by pattern_svg unless the matplotlib backend is asked for
+SVG_BACKENDS = ('direct', 'matplotlib')
+DEFAULT_SVG_BACKEND = 'direct'
 
-def get_path_length(points_list):
-    """Calculate length of a path defined by points."""
-    try:
-        length = 0
-        for i in range(len(points_list) - 1):
-            length += dist(points_list[i], points_list[i + 1])
-        return length
-    except Exception as e:
-        logger.error(f"Error calculating path length: {e}")
-        raise
+# matplotlib is imported on first render; see load_matplotlib()
+plt = None
+patches = None
 
-def quadratic_bezier(p0, p1, p2, t):
-    """Calculate a point on a quadratic Bezier curve."""
-    try:
-        x = (1 - t)**2 * p0[0] + 2 * (1 - t) * t * p1[0] + t**2 * p2[0]
-        y = (1 - t)**2 * p0[1] + 2 * (1 - t) * t * p1[1] + t**2 * p2[1]
-        return (x, y)
-    except Exception as e:
-        logger.error(f"Error in quadratic Bezier calculation: {e}")
-        raise
+def load_matplotlib(headless=False):
+    """Import matplotlib on first use so compute-only runs never pay for it.
 
-def generate_bezier_points(p0, p1, p2, num_points=30):
-    """Generate points along a quadratic Bezier curve."""
+    Headless callers only need matplotlib.patches; pyplot (and with it the
+    GUI backend selection) is imported only for interactive rendering.
+    """
+    global plt, patches
     try:
-        return [quadratic_bezier(p0, p1, p2, i / num_points) for i in range(num_points + 1)]
+        if patches is None:
+            import matplotlib.patches as patches_module
+            patches = patches_module
+        if not headless and plt is None:
+            import matplotlib.pyplot as pyplot_module
+            plt = pyplot_module
+        return plt, patches
     except Exception as e:
-        logger.error(f"Error generating Bezier points: {e}")
+        logger.error(f"Error importing matplotlib: {e}")
         raise
 
-def offset_bezier_curve(p0, p1, p2, offset=0.375, num_points=10):
-    """Generate offset points for a Bezier curve."""
+def new_figure(figsize, headless=False):
+    """Create a figure.
+
+    Headless figures are plain Figure objects on an Agg canvas: they never
+    go through pyplot, so no GUI backend is touched and nothing can block
+    on a display.
+    """
     try:
-        offset_points = []
-        for i in range(num_points + 1):
-            t = i / num_points
-            x, y = quadratic_bezier(p0, p1, p2, t)
-            dx_dt = 2 * (1 - t) * (p1[0] - p0[0]) + 2 * t * (p2[0] - p1[0])
-            dy_dt = 2 * (1 - t) * (p1[1] - p0[1]) + 2 * t * (p2[1] - p1[1])
-            normal = (-dy_dt, dx_dt)
-            normal_length = math.sqrt(normal[0]**2 + normal[1]**2)
-            if normal_length > 0:
-                normal_unit = (normal[0] / normal_length, normal[1] / normal_length)
-                x_offset = x + offset * normal_unit[0]
-                y_offset = y + offset * normal_unit[1]
-                offset_points.append((x_offset, y_offset))
-        return offset_points
+        if headless:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            return fig
+        load_matplotlib()
+        return plt.figure(figsize=figsize)
     except Exception as e:
-        logger.error(f"Error offsetting Bezier curve: {e}")
+        logger.error(f"Error creating figure: {e}")
         raise
 
 def draw_straight_seam_allowance(ax, p1, p2, offset=0.375):
@@ -85,15 +116,29 @@ def draw_straight_seam_allowance(ax, p1, p2, offset=0.375):
         logger.error(f"Error drawing straight seam allowance: {e}")
         raise
 
-def draw_bezier_seam_allowance(ax, p0, p1, p2, offset=0.375, num_points=10):
+def draw_bezier_seam_allowance(ax, p0, p1, p2, offset=0.375, num_points=10, tolerance=None):
     """Draw seam allowance for a Bezier edge."""
     try:
-        offset_points = offset_bezier_curve(p0, p1, p2, offset, num_points)
+        offset_points = offset_bezier_curve(p0, p1, p2, offset, num_points, tolerance)
         ax.plot([p[0] for p in offset_points], [p[1] for p in offset_points], color='red', linestyle='--', lw=1)
     except Exception as e:
         logger.error(f"Error drawing Bezier seam allowance: {e}")
         raise
 
+def draw_cut_line(ax, edges, offset_x=0, offset_y=0, allowance=SEAM_ALLOWANCE, join='miter', tolerance='screen'):
+    """Draw the closed seam allowance cut line of a piece (or edge list) as a single path."""
+    try:
+        if isinstance(edges, Piece):
+            polygon = edges.cut_line(join, tolerance)
+        else:
+            polygon = cut_line_polygon(edges, allowance, join, tolerance)
+        xs = np.append(polygon[:, 0], polygon[0, 0]) + offset_x
+        ys = np.append(polygon[:, 1], polygon[0, 1]) + offset_y
+        ax.plot(xs, ys, color='red', linestyle='--', lw=1)
+    except Exception as e:
+        logger.error(f"Error drawing cut line: {e}")
+        raise
+
 def draw_grainline(ax, x, y_start, y_end, arrow_size=0.5):
     """Draw a vertical grainline with arrows."""
     try:
@@ -104,22 +149,6 @@ def draw_grainline(ax, x, y_start, y_end, arrow_size=0.5):
         logger.error(f"Error drawing grainline: {e}")
         raise
 
-def find_max_y_bezier(p0, p1, p2, num_points=20):
-    """Find the point with maximum y-coordinate on a Bezier curve."""
-    try:
-        max_y = -float('inf')
-        max_point = None
-        for i in range(num_points + 1):
-            t = i / num_points
-            x, y = quadratic_bezier(p0, p1, p2, t)
-            if y > max_y:
-                max_y = y
-                max_point = (x, y)
-        return max_point
-    except Exception as e:
-        logger.error(f"Error finding max y on Bezier: {e}")
-        raise
-
 def draw_notch(ax, point, direction, length=0.25):
     """Draw a notch at a point."""
     try:
@@ -159,46 +188,27 @@ def annotate_rectangle_dimensions(ax, x, y, width, height):
         logger.error(f"Error annotating rectangle dimensions: {e}")
         raise
 
-# Predefined Measurements (Corrected)
-PREDEFINED_MEASUREMENTS = {
-    'S': {
-        'half_chest_flat': 18, 'garment_length': 24.5, 'neck_width_half': 3.0,
-        'front_neck_drop': 2.75, 'back_neck_drop': 0.75, 'shoulder_width': 4.5,
-        'shoulder_slope': 1.5, 'armhole_depth': 8.0, 'sleeve_length_outer': 7,
-        'sleeve_bicep_flat': 7, 'sleeve_cuff_flat': 6, 'collar_height_flat': 3,
-        'placket_width': 1.5, 'placket_length': 5
-    },
-    'M': {
-        'half_chest_flat': 20, 'garment_length': 25.5, 'neck_width_half': 3.25,
-        'front_neck_drop': 3.0, 'back_neck_drop': 1.0, 'shoulder_width': 5.0,
-        'shoulder_slope': 1.75, 'armhole_depth': 9.0, 'sleeve_length_outer': 7.5,
-        'sleeve_bicep_flat': 7.5, 'sleeve_cuff_flat': 6.5, 'collar_height_flat': 3,
-        'placket_width': 1.5, 'placket_length': 5.5
-    },
-    'L': {
-        'half_chest_flat': 22, 'garment_length': 26.5, 'neck_width_half': 3.5,
-        'front_neck_drop': 3.25, 'back_neck_drop': 1.0, 'shoulder_width': 5.5,
-        'shoulder_slope': 2.0, 'armhole_depth': 9.5, 'sleeve_length_outer': 8,
-        'sleeve_bicep_flat': 8, 'sleeve_cuff_flat': 7, 'collar_height_flat': 3.25,
-        'placket_width': 1.5, 'placket_length': 6
-    },
-}
+def get_user_measurements(preview=None):
+    """Prompt user for size and measurements.
 
-def get_user_measurements():
-    """Prompt user for size and measurements."""
+    preview, if given, is called as preview(size_name, measurements) when the
+    user asks to preview the pattern between edits (see PatternPreview).
+    Sizes other than the predefined ones are graded from the size chart (see
+    pattern_grading.size_measurements).
+    """
     try:
-        print("Available sizes:", ", ".join(PREDEFINED_MEASUREMENTS.keys()))
-        chosen_size = ""
-        while chosen_size not in PREDEFINED_MEASUREMENTS:
-            chosen_size_input = input("Enter size (e.g., S, M, L) or 'quit': ").upper()
-            if chosen_size_input == 'QUIT':
+        print("Available sizes:", ", ".join(PREDEFINED_MEASUREMENTS.keys()),
+              "and sizes graded from sizes.json (XS to 4XL)")
+        chosen_size = None
+        while chosen_size is None:
+            chosen_size_input = input("Enter size (e.g., S, M, L, XL) or 'quit': ").strip()
+            if chosen_size_input.upper() == 'QUIT':
                 return None, None
-            if chosen_size_input in PREDEFINED_MEASUREMENTS:
-                chosen_size = chosen_size_input
-            else:
-                print(f"Invalid size. Choose from: {', '.join(PREDEFINED_MEASUREMENTS.keys())} or 'quit'.")
+            try:
+                chosen_size, current_measurements = size_measurements(chosen_size_input)
+            except Exception as e:
+                print(f"Invalid size. {e}, or 'quit'.")
 
-        current_measurements = PREDEFINED_MEASUREMENTS[chosen_size].copy()
         print(f"\nDefault Measurements for Size {chosen_size} (in inches):")
         for key, value in current_measurements.items():
             print(f"- {key.replace('_', ' ').title()}: {value}\"")
@@ -213,7 +223,7 @@ def get_user_measurements():
                     user_input = input(f"  {display_key} (current: {default_value}\"): ")
                     if user_input.lower() == 'cancel':
                         print("Customization cancelled. Restarting...")
-                        return get_user_measurements()
+                        return get_user_measurements(preview)
                     if not user_input:
                         break
                     new_value = float(user_input)
@@ -229,8 +239,9 @@ def get_user_measurements():
         for key, value in customized_measurements.items():
             print(f"- {key.replace('_', ' ').title()}: {value}\"")
         
+        options = "Enter to generate, 'e' to edit, " + ("'p' to preview, " if preview else "") + "'s' to select size"
         while True:
-            confirm = input("\nPress Enter to generate, 'e' to edit, 's' to select size: ").lower()
+            confirm = input(f"\nPress {options}: ").lower()
             if confirm == '':
                 return chosen_size, customized_measurements
             elif confirm == 'e':
@@ -252,10 +263,12 @@ def get_user_measurements():
                 print("\nUpdated Measurements:")
                 for key, value in customized_measurements.items():
                     print(f"- {key.replace('_', ' ').title()}: {value}\"")
+            elif confirm == 'p' and preview:
+                preview(chosen_size, customized_measurements)
             elif confirm == 's':
-                return get_user_measurements()
+                return get_user_measurements(preview)
             else:
-                print("Invalid option. Press Enter, 'e', or 's'.")
+                print(f"Invalid option. Press {options}.")
     except Exception as e:
         logger.error(f"Error in get_user_measurements: {e}")
         return None, None
@@ -263,6 +276,7 @@ def get_user_measurements():
 def draw_pattern_piece_with_details(ax, piece_title, patches_list, details_text_lines, grid=True):
     """Draw a pattern piece with details."""
     try:
+        load_matplotlib(headless=True)
         ax.set_title(piece_title, fontsize=12, pad=10)
         y_start_text = 0.95
         line_spacing = 0.07 if len(details_text_lines) <= 5 else 0.06
@@ -314,357 +328,407 @@ def draw_pattern_piece_with_details(ax, piece_title, patches_list, details_text_
         logger.error(f"Error drawing pattern piece: {e}")
         raise
 
-def generate_pattern_visuals(size_name, measurements):
-    """Generate and display pattern visuals."""
+def piece_style(piece_name):
+    """matplotlib Polygon keyword arguments for a piece's outline."""
+    edge, face, lw, alpha = PIECE_STYLES[piece_name]
+    style = dict(edgecolor=edge, facecolor=face, lw=lw)
+    if alpha < 1:
+        style['alpha'] = alpha
+    return style
+
+def piece_patches(ax, piece, tolerance='screen'):
+    """Draw a piece's cut line, grainline, notches and text markings; return its patches."""
+    try:
+        load_matplotlib(headless=True)
+        shapes = [patches.Polygon(piece.outline(tolerance), **piece_style(piece.name))]
+        if piece.allowances.any():
+            draw_cut_line(ax, piece, tolerance=tolerance)
+        if piece.grainline is not None:
+            draw_grainline(ax, *piece.grainline)
+        for point, direction in piece.notches:
+            draw_notch(ax, point, direction)
+        for kind, data in piece.markings:
+            if kind == 'fold_line':
+                shapes.append(patches.Polygon(data, edgecolor='darkgreen', linestyle='-.', lw=1.5))
+                (x, y_start), (_, y_end) = data
+                ax.text(x + 0.3, (y_start + y_end) / 2, "FOLD\nLINE",
+                        ha='center', va='center', fontsize=8, rotation=90, color='darkgreen',
+                        bbox=dict(boxstyle='round,pad=0.1', fc='white', alpha=0.5))
+            elif kind == 'placket_guide':
+                shapes.append(patches.Polygon(data, edgecolor='red', facecolor='none', linestyle='--', lw=1))
+            elif kind == 'collar_fold':
+                shapes.append(patches.Polygon(data, edgecolor='orange', linestyle='--', lw=1))
+            elif kind == 'button':
+                center, radius = data
+                shapes.append(patches.Circle(center, radius, edgecolor='black', facecolor='darkgrey'))
+        return shapes
+    except Exception as e:
+        logger.error(f"Error drawing piece '{piece.name}': {e}")
+        raise
+
+def place_piece(geometry, name, dx, dy, tolerance='screen'):
+    """Move a piece into plot position.
+
+    The outline, cut line and bounds are derived on the geometry's own piece
+    first, so they stay cached there (see cached_build_polo_pattern) and the
+    moved copy only shifts them.
+    """
+    try:
+        piece = geometry[name]
+        piece.outline(tolerance)
+        piece.bounds
+        if piece.allowances.any():
+            piece.cut_line(tolerance=tolerance)
+        return piece.translated(dx, dy)
+    except Exception as e:
+        logger.error(f"Error placing piece '{name}': {e}")
+        raise
+
+def draw_rectangle_piece(ax, piece, details, tolerance='screen'):
+    """Draw a rectangular piece (collar, placket, interfacing) with its dimensions."""
+    try:
+        (x, y), (x_max, y_max) = piece.bounds
+        shapes = piece_patches(ax, piece, tolerance)
+        annotate_rectangle_dimensions(ax, x, y, x_max - x, y_max - y)
+        draw_pattern_piece_with_details(ax, piece.name, shapes, details)
+    except Exception as e:
+        logger.error(f"Error drawing rectangular piece '{piece.name}': {e}")
+        raise
+
+def render_layout_page(layout, geometry, tolerance='screen', headless=False):
+    """Draw a PageLayout with matplotlib and return the figure."""
+    try:
+        fig = new_figure(layout.figsize, headless)
+        axs = np.ravel(fig.subplots(*layout.shape))
+        fig.suptitle(layout.title, fontsize=14)
+        for panel in layout.panels:
+            ax = axs[panel.axis]
+            piece = place_piece(geometry, panel.piece, panel.dx, panel.dy, tolerance)
+            if panel.dimensions == 'rectangle':
+                draw_rectangle_piece(ax, piece, panel.details, tolerance)
+            else:
+                shapes = piece_patches(ax, piece, tolerance)
+                annotate_straight_edges(ax, piece.seam_edges, 0, 0)
+                draw_pattern_piece_with_details(ax, piece.name, shapes, panel.details)
+        fig.tight_layout(rect=[0, 0, 1, 0.95])
+        return fig
+    except Exception as e:
+        logger.error(f"Error rendering page {layout.number}: {e}")
+        raise
+
+def render_body_page(geometry, tolerance='screen', headless=False):
+    """Draw Page 1 (front and back body) and return the figure."""
+    logger.info("Generating Page 1: Body Pieces")
+    return render_layout_page(body_page_layout(geometry), geometry, tolerance, headless)
+
+def render_sleeve_collar_page(geometry, tolerance='screen', headless=False):
+    """Draw Page 2 (sleeves and collars) and return the figure."""
+    logger.info("Generating Page 2: Sleeves & Collars")
+    return render_layout_page(sleeve_collar_page_layout(geometry), geometry, tolerance, headless)
+
+def render_placket_page(geometry, tolerance='screen', headless=False):
+    """Draw Page 3 (plackets and interfacing) and return the figure."""
+    logger.info("Generating Page 3: Plackets & Interfacing")
+    return render_layout_page(placket_page_layout(geometry), geometry, tolerance, headless)
+
+PAGE_RENDERERS = (
+    ('pattern_page1', render_body_page),
+    ('pattern_page2', render_sleeve_collar_page),
+    ('pattern_page3', render_placket_page),
+)
+
+# Pieces drawn on each page; a page only needs redrawing when one of them changes
+PAGE_PIECES = {
+    'pattern_page1': PIECE_NAMES[0:2],
+    'pattern_page2': PIECE_NAMES[2:6],
+    'pattern_page3': PIECE_NAMES[6:10],
+}
+
+def dirty_pages(piece_names):
+    """Names of the pages (in page order) that draw any of the given pieces."""
+    return [name for name, _ in PAGE_RENDERERS if set(PAGE_PIECES[name]).intersection(piece_names)]
+
+def render_page_bytes(render_page, geometry, tolerance='screen', fmt='png', dpi=None, headless=True,
+                      svg_backend=DEFAULT_SVG_BACKEND):
+    """Render one page and return the encoded file contents.
+
+    SVG goes through the direct writer in pattern_svg, without matplotlib,
+    unless svg_backend is 'matplotlib'.
+    """
+    try:
+        if fmt == 'svg' and svg_backend == 'direct':
+            from pattern_svg import svg_page
+            page_index = [render for _, render in PAGE_RENDERERS].index(render_page)
+            return svg_page(geometry, page_index, tolerance).encode()
+        fig = render_page(geometry, tolerance, headless)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi)
+        if not headless:
+            plt.close(fig)
+        return buffer.getvalue()
+    except Exception as e:
+        logger.error(f"Error rendering page to {fmt}: {e}")
+        raise
+
+def render_pattern_pages(geometry, tolerance='screen', fmt='png', dpi=None, headless=True,
+                         cache=None, parallel=None, workers=None, svg_backend=DEFAULT_SVG_BACKEND, pages=None):
+    """Render pages in memory; returns a list of (filename, bytes).
+
+    cache is an optional DiskRenderCache: pages already rendered for the same
+    measurements, size label, renderer version and options are served from
+    it. parallel ('thread' or 'process', headless only) renders the
+    remaining pages concurrently. pages limits the output to these page
+    names (default: every page).
+    """
+    try:
+        selected = [i for i, (name, _) in enumerate(PAGE_RENDERERS) if pages is None or name in pages]
+        names = [f"{name}.{fmt}" for name, _ in PAGE_RENDERERS]
+        keys = [render_cache_key(geometry.measurements, geometry.size_name, name, fmt, dpi,
+                                 tolerance, RENDERER_VERSION, svg_backend if fmt == 'svg' else None)
+                for name in names]
+        rendered_pages = [cache.get(key, fmt) if cache is not None and i in selected else None
+                          for i, key in enumerate(keys)]
+        missing = [i for i in selected if rendered_pages[i] is None]
+        if headless and parallel and len(missing) > 1:
+            from pattern_scheduler import TaskGraph, render_page_task
+            graph = TaskGraph()
+            for i in missing:
+                graph.add(i, render_page_task, i, tolerance, fmt, dpi, geometry, svg_backend)
+            rendered = graph.run(parallel, workers)
+            for i in missing:
+                rendered_pages[i] = rendered[i][1]
+        else:
+            for i in missing:
+                rendered_pages[i] = render_page_bytes(PAGE_RENDERERS[i][1], geometry, tolerance, fmt, dpi, headless,
+                                             svg_backend)
+        if cache is not None:
+            for i in missing:
+                cache.put(keys[i], fmt, rendered_pages[i])
+        return [(names[i], rendered_pages[i]) for i in selected]
+    except Exception as e:
+        logger.error(f"Error rendering pattern pages: {e}")
+        raise
+
+def generate_pattern_visuals(size_name, measurements, tolerance='screen', headless=False,
+                             output_dir='.', fmt='png', dpi=None, parallel=None, workers=None,
+                             render_cache=None, svg_backend=DEFAULT_SVG_BACKEND):
+    """Generate and display pattern visuals.
+
+    tolerance is the curve flattening tolerance in inches or a preset name
+    from FLATTEN_TOLERANCES ('screen', 'print', 'plotter'). In headless mode
+    pages are rendered on an Agg canvas and written to output_dir without
+    ever calling plt.show(); parallel ('thread' or 'process') then renders
+    the three pages concurrently and render_cache (a DiskRenderCache) serves
+    pages rendered before. SVG pages are written directly by pattern_svg
+    unless svg_backend is 'matplotlib'. Returns the pattern geometry.
+    """
     try:
         logger.info("Starting pattern generation")
-        piece_edgecolor = 'black'
-        interfacing_alpha = 0.4
-        base_offset_x, base_offset_y = 1, 1
-        m = measurements
-
-        if m['shoulder_width'] < m['shoulder_slope']:
-            m['shoulder_slope'] = m['shoulder_width'] * 0.98
-        dx_shoulder = math.sqrt(max(0, m['shoulder_width']**2 - m['shoulder_slope']**2))
-
-        # Page 1: Front and Back Body
-        logger.info("Generating Page 1: Body Pieces")
-        fig1, axs1 = plt.subplots(1, 2, figsize=(12, 8))
-        fig1.suptitle(f"Polo Shirt - Size {size_name} - Page 1/3: Body Pieces", fontsize=14)
-
-        # Back Body (Cut 1 on Fold)
-        p1_b = (0, 0)
-        p2_b = (m['half_chest_flat'] / 2, 0)
-        p3_b = (m['half_chest_flat'] / 2, m['garment_length'] - m['armhole_depth'])
-        p4_b = (m['neck_width_half'] + dx_shoulder, m['garment_length'] - m['shoulder_slope'])
-        p5_b = (m['neck_width_half'], m['garment_length'])
-        p6_b = (0, m['garment_length'] - m['back_neck_drop'])
-        p_neck_ctrl_b = (m['neck_width_half'] * 0.5, (p6_b[1] + p5_b[1]) / 2 + m['back_neck_drop'] * 0.2)
-        p_arm_ctrl_b = ((p4_b[0] + p3_b[0]) / 2 + (m['half_chest_flat']/2 - (m['neck_width_half'] + dx_shoulder)) * 0.2,
-                        (p4_b[1] + p3_b[1]) / 2 - m['armhole_depth'] * 0.1)
-
-        back_pts_local_smooth = (
-            [p1_b, p2_b, p3_b] +
-            generate_bezier_points(p3_b, p_arm_ctrl_b, p4_b)[1:-1] +
-            [p4_b, p5_b] +
-            generate_bezier_points(p5_b, p_neck_ctrl_b, p6_b)[1:-1] +
-            [p6_b]
-        )
-        back_pts_plot_smooth = [(x + base_offset_x, y + base_offset_y) for x, y in back_pts_local_smooth]
-        back_shape = patches.Polygon(back_pts_plot_smooth, edgecolor=piece_edgecolor, facecolor='lightgreen', lw=1.5)
-
-        back_edges = [
-            ('straight', [p1_b, p2_b]),
-            ('straight', [p2_b, p3_b]),
-            ('bezier', [p3_b, p_arm_ctrl_b, p4_b]),
-            ('straight', [p4_b, p5_b]),
-            ('bezier', [p5_b, p_neck_ctrl_b, p6_b])
-        ]
-        for edge in back_edges:
-            if edge[0] == 'straight':
-                p1 = (edge[1][0][0] + base_offset_x, edge[1][0][1] + base_offset_y)
-                p2 = (edge[1][1][0] + base_offset_x, edge[1][1][1] + base_offset_y)
-                draw_straight_seam_allowance(axs1[1], p1, p2)
-            elif edge[0] == 'bezier':
-                p0 = (edge[1][0][0] + base_offset_x, edge[1][0][1] + base_offset_y)
-                p1 = (edge[1][1][0] + base_offset_x, edge[1][1][1] + base_offset_y)
-                p2 = (edge[1][2][0] + base_offset_x, edge[1][2][1] + base_offset_y)
-                draw_bezier_seam_allowance(axs1[1], p0, p1, p2)
-
-        grainline_x_back = base_offset_x + 1
-        grainline_y_start_back = base_offset_y + 1
-        grainline_y_end_back = base_offset_y + m['garment_length'] - 1
-        draw_grainline(axs1[1], grainline_x_back, grainline_y_start_back, grainline_y_end_back)
-
-        max_y_point_local = find_max_y_bezier(p3_b, p_arm_ctrl_b, p4_b)
-        max_y_point_plot = (max_y_point_local[0] + base_offset_x, max_y_point_local[1] + base_offset_y)
-        draw_notch(axs1[1], max_y_point_plot, (0, 1))
-
-        annotate_straight_edges(axs1[1], back_edges, base_offset_x, base_offset_y)
-
-        fold_line_back = patches.Polygon([(base_offset_x, p1_b[1] + base_offset_y), (base_offset_x, p6_b[1] + base_offset_y)],
-                                        edgecolor='darkgreen', linestyle='-.', lw=1.5)
-        axs1[1].text(base_offset_x + 0.3, base_offset_y + m['garment_length'] / 2, "FOLD\nLINE",
-                    ha='center', va='center', fontsize=8, rotation=90, color='darkgreen',
-                    bbox=dict(boxstyle='round,pad=0.1', fc='white', alpha=0.5))
-        
-        back_neck_path = [p5_b, p_neck_ctrl_b, p6_b]
-        half_back_neckline_length = get_path_length(back_neck_path)
-        back_details = [
-            "Cut 1 on Fold",
-            f"HPS to Hem: {m['garment_length']:.1f}\"",
-            f"Half Chest: {m['half_chest_flat']/2:.1f}\"",
-            f"Half Back Neckline: {half_back_neckline_length:.2f}\""
-        ]
-        draw_pattern_piece_with_details(axs1[1], "2. Back Body", [back_shape, fold_line_back], back_details)
-
-        # Front Body (Cut 1 Fabric)
-        p_cf_neck = (0, m['garment_length'] - m['front_neck_drop'])
-        p_hps_r = (m['neck_width_half'], m['garment_length'])
-        p_st_r = (m['neck_width_half'] + dx_shoulder, m['garment_length'] - m['shoulder_slope'])
-        p_au_r = (m['half_chest_flat'] / 2, m['garment_length'] - m['armhole_depth'])
-        p_sh_r = (m['half_chest_flat'] / 2, 0)
-        p_fn_ctrl_r = (m['neck_width_half'] * 0.4, p_cf_neck[1] + (p_hps_r[1] - p_cf_neck[1]) * 0.3)
-        p_fa_ctrl_r = ((p_st_r[0] + p_au_r[0])/2 + (m['half_chest_flat']/2 - (m['neck_width_half'] + dx_shoulder))*0.15,
-                    (p_st_r[1] + p_au_r[1])/2 - m['armhole_depth'] * 0.05)
-
-        front_polygon_pts_smooth = (
-            [p_cf_neck] + generate_bezier_points(p_cf_neck, p_fn_ctrl_r, p_hps_r)[1:-1] +
-            [p_hps_r, p_st_r] + generate_bezier_points(p_st_r, p_fa_ctrl_r, p_au_r)[1:-1] +
-            [p_au_r, p_sh_r, (-p_sh_r[0], p_sh_r[1]), (-p_au_r[0], p_au_r[1])] +
-            generate_bezier_points((-p_au_r[0], p_au_r[1]), (-p_fa_ctrl_r[0], p_fa_ctrl_r[1]), (-p_st_r[0], p_st_r[1]))[1:-1] +
-            [(-p_st_r[0], p_st_r[1]), (-p_hps_r[0], p_hps_r[1])] +
-            generate_bezier_points((-p_hps_r[0], p_hps_r[1]), (-p_fn_ctrl_r[0], p_fn_ctrl_r[1]), p_cf_neck)[1:-1]
-        )
-        front_plot_offset_x = base_offset_x + m['half_chest_flat'] / 2
-        front_pts_plot_smooth = [(x + front_plot_offset_x, y + base_offset_y) for x, y in front_polygon_pts_smooth]
-        front_shape = patches.Polygon(front_pts_plot_smooth, edgecolor=piece_edgecolor, facecolor='lightblue', lw=1.5)
-
-        front_edges = [
-            ('bezier', [p_cf_neck, p_fn_ctrl_r, p_hps_r]),
-            ('straight', [p_hps_r, p_st_r]),
-            ('bezier', [p_st_r, p_fa_ctrl_r, p_au_r]),
-            ('straight', [p_au_r, p_sh_r]),
-            ('straight', [p_sh_r, (-p_sh_r[0], p_sh_r[1])]),
-            ('straight', [(-p_sh_r[0], p_sh_r[1]), (-p_au_r[0], p_au_r[1])]),
-            ('bezier', [(-p_au_r[0], p_au_r[1]), (-p_fa_ctrl_r[0], p_fa_ctrl_r[1]), (-p_st_r[0], p_st_r[1])]),
-            ('straight', [(-p_st_r[0], p_st_r[1]), (-p_hps_r[0], p_hps_r[1])]),
-            ('bezier', [(-p_hps_r[0], p_hps_r[1]), (-p_fn_ctrl_r[0], p_fn_ctrl_r[1]), p_cf_neck])
-        ]
-        for edge in front_edges:
-            if edge[0] == 'straight':
-                p1 = (edge[1][0][0] + front_plot_offset_x, edge[1][0][1] + base_offset_y)
-                p2 = (edge[1][1][0] + front_plot_offset_x, edge[1][1][1] + base_offset_y)
-                draw_straight_seam_allowance(axs1[0], p1, p2)
-            elif edge[0] == 'bezier':
-                p0 = (edge[1][0][0] + front_plot_offset_x, edge[1][0][1] + base_offset_y)
-                p1 = (edge[1][1][0] + front_plot_offset_x, edge[1][1][1] + base_offset_y)
-                p2 = (edge[1][2][0] + front_plot_offset_x, edge[1][2][1] + base_offset_y)
-                draw_bezier_seam_allowance(axs1[0], p0, p1, p2)
-
-        grainline_x_front = front_plot_offset_x
-        grainline_y_start_front = base_offset_y + 1
-        grainline_y_end_front = base_offset_y + m['garment_length'] - 1
-        draw_grainline(axs1[0], grainline_x_front, grainline_y_start_front, grainline_y_end_front)
-
-        v = (p_fn_ctrl_r[0] - p_cf_neck[0], p_fn_ctrl_r[1] - p_cf_neck[1])
-        length_v = math.sqrt(v[0]**2 + v[1]**2)
-        n = (-v[1] / length_v, v[0] / length_v) if length_v > 0 else (1, 0)
-        p_cf_neck_plot = (p_cf_neck[0] + front_plot_offset_x, p_cf_neck[1] + base_offset_y)
-        draw_notch(axs1[0], p_cf_neck_plot, n)
-        max_y_point_local = find_max_y_bezier(p_st_r, p_fa_ctrl_r, p_au_r)
-        max_y_point_plot = (max_y_point_local[0] + front_plot_offset_x, max_y_point_local[1] + base_offset_y)
-        draw_notch(axs1[0], max_y_point_plot, (0, 1))
-
-        annotate_straight_edges(axs1[0], front_edges, front_plot_offset_x, base_offset_y)
-
-        placket_w, placket_l = m['placket_width'], m['placket_length']
-        placket_indicator_x = p_cf_neck[0] + front_plot_offset_x - placket_w / 2
-        placket_indicator_y = p_cf_neck[1] + base_offset_y - placket_l
-        placket_area_indicator = patches.Rectangle((placket_indicator_x, placket_indicator_y),
-                                                placket_w, placket_l, edgecolor='red', facecolor='none', linestyle='--', lw=1)
-        
-        front_neck_path_right = [p_cf_neck, p_fn_ctrl_r, p_hps_r]
-        half_front_neckline_length = get_path_length(front_neck_path_right)
-        front_details = [
-            "Cut 1 Fabric",
-            f"HPS to Hem: {m['garment_length']:.1f}\"",
-            f"Chest Width: {m['half_chest_flat']:.1f}\"",
-            f"Half Front Neckline: {half_front_neckline_length:.2f}\""
-        ]
-        draw_pattern_piece_with_details(axs1[0], "1. Front Body", [front_shape, placket_area_indicator], front_details)
-
-        plt.tight_layout(rect=[0, 0, 1, 0.95])
-        plt.savefig('pattern_page1.png')
-        logger.info("Page 1 saved as pattern_page1.png")
-        try:
-            plt.show()
-        except Exception as e:
-            logger.warning(f"Failed to display Page 1: {e}")
-        plt.close(fig1)
-
-        # Calculate collar length
-        m['collar_length_calculated'] = (half_back_neckline_length + half_front_neckline_length) * 2
-        logger.info(f"Calculated Collar Length: {m['collar_length_calculated']:.2f}\"")
-
-        # Page 2: Sleeves and Collars
-        logger.info("Generating Page 2: Sleeves & Collars")
-        fig2, axs2 = plt.subplots(2, 2, figsize=(12, 10))
-        fig2.suptitle(f"Polo Shirt - Size {size_name} - Page 2/3: Sleeves & Collars", fontsize=14)
-
-        # Sleeve
-        sL, sWB, sWC = m['sleeve_length_outer'], m['sleeve_bicep_flat'], m['sleeve_cuff_flat']
-        cap_height = sL * 0.25
-        underarm_length = sL - cap_height
-        if sWC > sWB:
-            sWC = sWB
-        plot_sleeve_offset_x, plot_sleeve_offset_y = base_offset_x, base_offset_y
-        p1_cuff_left = (plot_sleeve_offset_x + (sWB - sWC) / 2, plot_sleeve_offset_y)
-        p2_cuff_right = (plot_sleeve_offset_x + (sWB - sWC) / 2 + sWC, plot_sleeve_offset_y)
-        p5_underarm_left = (plot_sleeve_offset_x, plot_sleeve_offset_y + underarm_length)
-        p3_underarm_right = (plot_sleeve_offset_x + sWB, plot_sleeve_offset_y + underarm_length)
-        cap_peak_x = plot_sleeve_offset_x + sWB / 2
-        cap_peak_y = plot_sleeve_offset_y + sL
-        p_carrier_left = (plot_sleeve_offset_x + sWB * 0.1, plot_sleeve_offset_y + underarm_length + cap_height * 0.5)
-        p_carrier_right = (plot_sleeve_offset_x + sWB * 0.9, plot_sleeve_offset_y + underarm_length + cap_height * 0.5)
-        sleeve_pts_smooth = (
-            [p1_cuff_left, p2_cuff_right, p3_underarm_right] +
-            generate_bezier_points(p3_underarm_right, p_carrier_right, (cap_peak_x, cap_peak_y))[1:-1] +
-            [(cap_peak_x, cap_peak_y)] +
-            generate_bezier_points((cap_peak_x, cap_peak_y), p_carrier_left, p5_underarm_left)[1:-1] +
-            [p5_underarm_left]
-        )
-        sleeve_patch_1 = patches.Polygon(sleeve_pts_smooth, edgecolor=piece_edgecolor, facecolor='thistle', lw=1.5)
-        sleeve_patch_2 = patches.Polygon(sleeve_pts_smooth, edgecolor=piece_edgecolor, facecolor='thistle', lw=1.5)
-
-        sleeve_edges = [
-            ('straight', [p1_cuff_left, p2_cuff_right]),
-            ('straight', [p2_cuff_right, p3_underarm_right]),
-            ('bezier', [p3_underarm_right, p_carrier_right, (cap_peak_x, cap_peak_y)]),
-            ('bezier', [(cap_peak_x, cap_peak_y), p_carrier_left, p5_underarm_left]),
-            ('straight', [p5_underarm_left, p1_cuff_left])
-        ]
-        for ax in [axs2[0, 0], axs2[0, 1]]:
-            for edge in sleeve_edges:
-                if edge[0] == 'straight':
-                    draw_straight_seam_allowance(ax, edge[1][0], edge[1][1])
-                elif edge[0] == 'bezier':
-                    draw_bezier_seam_allowance(ax, edge[1][0], edge[1][1], edge[1][2])
-            annotate_straight_edges(ax, sleeve_edges, 0, 0)
-
-        sleeve_details = [
-            "Cut 2 Fabric",
-            f"Length: {sL:.1f}\"",
-            f"Bicep (flat): {sWB:.1f}\"",
-            f"Cuff (flat): {sWC:.1f}\"",
-            "Sleeve cap to be refined"
-        ]
-        draw_pattern_piece_with_details(axs2[0, 0], "3. Sleeve (Piece 1)", sleeve_patch_1, sleeve_details)
-        draw_pattern_piece_with_details(axs2[0, 1], "4. Sleeve (Piece 2)", sleeve_patch_2, sleeve_details)
-
-        # Collar
-        collar_l, collar_h = m['collar_length_calculated'], m['collar_height_flat']
-        collar_shape_1 = patches.Rectangle((base_offset_x, base_offset_y), collar_l, collar_h,
-                                        edgecolor=piece_edgecolor, facecolor='moccasin', lw=1.5)
-        collar_shape_2 = patches.Rectangle((base_offset_x, base_offset_y), collar_l, collar_h,
-                                        edgecolor=piece_edgecolor, facecolor='moccasin', lw=1.5)
-        collar_fold_1 = patches.Polygon([(base_offset_x, base_offset_y + collar_h / 2), (base_offset_x + collar_l, base_offset_y + collar_h / 2)],
-                                        edgecolor='orange', linestyle='--', lw=1)
-        collar_fold_2 = patches.Polygon([(base_offset_x, base_offset_y + collar_h / 2), (base_offset_x + collar_l, base_offset_y + collar_h / 2)],
-                                        edgecolor='orange', linestyle='--', lw=1)
-        for ax, shape in zip([axs2[1, 0], axs2[1, 1]], [collar_shape_1, collar_shape_2]):
-            draw_straight_seam_allowance(ax, (base_offset_x, base_offset_y), (base_offset_x + collar_l, base_offset_y))
-            draw_straight_seam_allowance(ax, (base_offset_x + collar_l, base_offset_y), (base_offset_x + collar_l, base_offset_y + collar_h))
-            draw_straight_seam_allowance(ax, (base_offset_x + collar_l, base_offset_y + collar_h), (base_offset_x, base_offset_y + collar_h))
-            draw_straight_seam_allowance(ax, (base_offset_x, base_offset_y + collar_h), (base_offset_x, base_offset_y))
-            annotate_rectangle_dimensions(ax, base_offset_x, base_offset_y, collar_l, collar_h)
-        
-        collar_details = [
-            "Cut 2 Fabric, Cut 1 Interfacing",
-            f"Length: {collar_l:.2f}\"",
-            f"Height: {collar_h:.1f}\""
-        ]
-        draw_pattern_piece_with_details(axs2[1, 0], "5. Collar (Piece 1)", [collar_shape_1, collar_fold_1], collar_details)
-        draw_pattern_piece_with_details(axs2[1, 1], "6. Collar (Piece 2)", [collar_shape_2, collar_fold_2], collar_details)
-        plt.tight_layout(rect=[0, 0, 1, 0.95])
-        plt.savefig('pattern_page2.png')
-        logger.info("Page 2 saved as pattern_page2.png")
-        try:
-            plt.show()
-        except Exception as e:
-            logger.warning(f"Failed to display Page 2: {e}")
-        plt.close(fig2)
-
-        # Page 3: Plackets and Interfacing
-        logger.info("Generating Page 3: Plackets & Interfacing")
-        fig3, axs3 = plt.subplots(2, 2, figsize=(12, 10))
-        fig3.suptitle(f"Polo Shirt - Size {size_name} - Page 3/3: Plackets & Interfacing", fontsize=14)
-
-        placket_w, placket_l = m['placket_width'], m['placket_length']
-        placket_shape_1 = patches.Rectangle((base_offset_x, base_offset_y), placket_w, placket_l,
-                                            edgecolor=piece_edgecolor, facecolor='sandybrown', lw=1.5)
-        placket_shape_2 = patches.Rectangle((base_offset_x, base_offset_y), placket_w, placket_l,
-                                            edgecolor=piece_edgecolor, facecolor='sandybrown', lw=1.5)
-        buttons = []
-        num_buttons = 3
-        if placket_l > 1 and placket_w > 0.2:
-            button_spacing = placket_l / (num_buttons + 1)
-            button_radius = min(placket_w * 0.15, 0.18)
-            for i in range(num_buttons):
-                button_y = base_offset_y + (i + 1) * button_spacing
-                button_x = base_offset_x + placket_w / 2
-                buttons.append(patches.Circle((button_x, button_y), button_radius, edgecolor='black', facecolor='darkgrey'))
-        
-        for ax, shape in zip([axs3[0, 0], axs3[0, 1]], [placket_shape_1, placket_shape_2]):
-            draw_straight_seam_allowance(ax, (base_offset_x, base_offset_y), (base_offset_x + placket_w, base_offset_y))
-            draw_straight_seam_allowance(ax, (base_offset_x + placket_w, base_offset_y), (base_offset_x + placket_w, base_offset_y + placket_l))
-            draw_straight_seam_allowance(ax, (base_offset_x + placket_w, base_offset_y + placket_l), (base_offset_x, base_offset_y + placket_l))
-            draw_straight_seam_allowance(ax, (base_offset_x, base_offset_y + placket_l), (base_offset_x, base_offset_y))
-            annotate_rectangle_dimensions(ax, base_offset_x, base_offset_y, placket_w, placket_l)
-        
-        placket_details_buttons = [
-            "Cut 2 Fabric", "Cut 1-2 Interfacing",
-            f"Piece: {placket_w:.1f}\" x {placket_l:.1f}\""
-        ]
-        draw_pattern_piece_with_details(axs3[0, 0], "7. Placket (Button Side)", [placket_shape_1] + buttons, placket_details_buttons)
-        draw_pattern_piece_with_details(axs3[0, 1], "8. Placket (Buttonhole Side)", placket_shape_2, placket_details_buttons)
-
-        interfacing_collar_shape = patches.Rectangle((base_offset_x, base_offset_y), collar_l, collar_h,
-                                                    edgecolor='dimgray', facecolor='lightgray', lw=1, alpha=interfacing_alpha)
-        interfacing_placket_shape = patches.Rectangle((base_offset_x, base_offset_y), placket_w, placket_l,
-                                                    edgecolor='dimgray', facecolor='lightgray', lw=1, alpha=interfacing_alpha)
-        for ax, shape in zip([axs3[1, 0], axs3[1, 1]], [interfacing_collar_shape, interfacing_placket_shape]):
-            annotate_rectangle_dimensions(ax, base_offset_x, base_offset_y, collar_l if shape == interfacing_collar_shape else placket_w,
-                                        collar_h if shape == interfacing_collar_shape else placket_l)
-        
-        interfacing_details = [
-            "Cut 1 Interfacing",
-            f"Collar: {collar_l:.2f}\" x {collar_h:.1f}\"",
-            f"Placket: {placket_w:.1f}\" x {placket_l:.1f}\""
-        ]
-        draw_pattern_piece_with_details(axs3[1, 0], "9. Collar Interfacing", interfacing_collar_shape, interfacing_details)
-        draw_pattern_piece_with_details(axs3[1, 1], "10. Placket Interfacing", interfacing_placket_shape, interfacing_details)
-        plt.tight_layout(rect=[0, 0, 1, 0.95])
-        plt.savefig('pattern_page3.png')
-        logger.info("Page 3 saved as pattern_page3.png")
+        os.makedirs(output_dir, exist_ok=True)
+        geometry = cached_build_polo_pattern(measurements, size_name)
+        logger.info(f"Calculated Collar Length: {geometry.collar_length_calculated:.2f}\"")
+
+        if headless:
+            pages = render_pattern_pages(geometry, tolerance, fmt, dpi, True, render_cache, parallel, workers,
+                                         svg_backend)
+            for page_number, (filename, data) in enumerate(pages, start=1):
+                path = os.path.join(output_dir, filename)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                logger.info(f"Page {page_number} saved as {path}")
+            return geometry
+
+        for page_number in range(1, len(PAGE_RENDERERS) + 1):
+            save_page(page_number, geometry, tolerance, headless, output_dir, fmt, dpi, svg_backend)
+        return geometry
+    except Exception as e:
+        logger.error(f"Error in generate_pattern_visuals: {e}")
+        raise
+
+def save_page(page_number, geometry, tolerance='screen', headless=False, output_dir='.', fmt='png', dpi=None,
+              svg_backend=DEFAULT_SVG_BACKEND):
+    """Render one page (numbered from 1) to output_dir, displaying it unless headless."""
+    try:
+        name, render_page = PAGE_RENDERERS[page_number - 1]
+        filename = os.path.join(output_dir, f"{name}.{fmt}")
+        if headless:
+            with open(filename, 'wb') as f:
+                f.write(render_page_bytes(render_page, geometry, tolerance, fmt, dpi, True, svg_backend))
+            logger.info(f"Page {page_number} saved as {filename}")
+            return filename
+        fig = render_page(geometry, tolerance, headless)
+        if fmt == 'svg' and svg_backend == 'direct':
+            with open(filename, 'wb') as f:
+                f.write(render_page_bytes(render_page, geometry, tolerance, fmt, dpi, True, svg_backend))
+        else:
+            fig.savefig(filename, format=fmt, dpi=dpi)
+        logger.info(f"Page {page_number} saved as {filename}")
         try:
             plt.show()
         except Exception as e:
-            logger.warning(f"Failed to display Page 3: {e}")
-        plt.close(fig3)
+            logger.warning(f"Failed to display Page {page_number}: {e}")
+        plt.close(fig)
+        return filename
     except Exception as e:
-        logger.error(f"Error in generate_pattern_visuals: {e}")
+        logger.error(f"Error saving page {page_number}: {e}")
+        raise
+
+def update_pattern_visuals(geometry, size_name, measurements, tolerance='screen', headless=False,
+                           output_dir='.', fmt='png', dpi=None, parallel=None, workers=None,
+                           render_cache=None, svg_backend=DEFAULT_SVG_BACKEND):
+    """Redraw only the pages affected by edited measurements.
+
+    geometry is the pattern the pages in output_dir were last drawn from
+    (None draws everything). Only the pieces whose measurements changed are
+    redrafted (see update_polo_pattern) and only the pages showing them are
+    rendered again, with the same options as generate_pattern_visuals.
+    Returns the new geometry.
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        updated, pieces = update_polo_pattern(geometry, measurements, size_name)
+        if geometry is not None and geometry.size_name != size_name:
+            pieces = PIECE_NAMES  # every page title carries the size
+        pages = dirty_pages(pieces)
+        logger.info(f"Redrafted {len(pieces)} of {len(PIECE_NAMES)} pieces, redrawing: {', '.join(pages) or 'nothing'}")
+        if headless:
+            for filename, data in render_pattern_pages(updated, tolerance, fmt, dpi, True, render_cache,
+                                                       parallel, workers, svg_backend, pages):
+                path = os.path.join(output_dir, filename)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                logger.info(f"Page saved as {path}")
+            return updated
+        for page_number, (name, _) in enumerate(PAGE_RENDERERS, start=1):
+            if name in pages:
+                save_page(page_number, updated, tolerance, headless, output_dir, fmt, dpi, svg_backend)
+        return updated
+    except Exception as e:
+        logger.error(f"Error in update_pattern_visuals: {e}")
         raise
 
-def output_product_details(size_name, measurements):
+class PatternPreview:
+    """Preview callback for get_user_measurements that redraws only what an edit changed."""
+
+    def __init__(self, tolerance='screen', headless=False, output_dir='.', fmt='png', dpi=None,
+                 parallel=None, render_cache=None, svg_backend=DEFAULT_SVG_BACKEND):
+        self.tolerance = tolerance
+        self.headless = headless
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.dpi = dpi
+        self.parallel = parallel
+        self.render_cache = render_cache
+        self.svg_backend = svg_backend
+        self.geometry = None
+
+    def __call__(self, size_name, measurements):
+        self.geometry = update_pattern_visuals(self.geometry, size_name, measurements, self.tolerance,
+                                               self.headless, self.output_dir, self.fmt, self.dpi,
+                                               self.parallel, render_cache=self.render_cache,
+                                               svg_backend=self.svg_backend)
+        return self.geometry
+
+def output_product_details(size_name, measurements, derived=None):
     """Print final garment dimensions in cm."""
     try:
-        m = measurements
+        details = product_details(measurements, derived)
         print(f"\nProduct Details for Size {size_name}:")
         print("Approximate finished garment dimensions in cm:")
-        print(f"Chest (circumference): {2 * m['half_chest_flat'] * IN_TO_CM:.1f} cm")
-        print(f"Length (HPS to hem): {m['garment_length'] * IN_TO_CM:.1f} cm")
-        print(f"Sleeve Length: {m['sleeve_length_outer'] * IN_TO_CM:.1f} cm")
-        print(f"Bicep (circumference): {2 * m['sleeve_bicep_flat'] * IN_TO_CM:.1f} cm")
-        print(f"Cuff (circumference): {2 * m['sleeve_cuff_flat'] * IN_TO_CM:.1f} cm")
-        if 'collar_length_calculated' in m:
-            print(f"Collar Opening: {m['collar_length_calculated'] * IN_TO_CM:.1f} cm")
+        print(f"Chest (circumference): {details['chest_cm']:.1f} cm")
+        print(f"Length (HPS to hem): {details['length_cm']:.1f} cm")
+        print(f"Sleeve Length: {details['sleeve_length_cm']:.1f} cm")
+        print(f"Bicep (circumference): {details['bicep_cm']:.1f} cm")
+        print(f"Cuff (circumference): {details['cuff_cm']:.1f} cm")
+        if 'collar_opening_cm' in details:
+            print(f"Collar Opening: {details['collar_opening_cm']:.1f} cm")
+        from pattern_consumption import DEFAULT_INTERFACING_WIDTH, DEFAULT_FABRIC_WIDTH, fabric_consumption
+        consumption = fabric_consumption(measurements)
+        print("Cut area including seam allowances:")
+        print(f"Fabric: {consumption['fabric_area'][0] * IN_TO_CM**2:.0f} cm^2 "
+              f"(about {consumption['fabric_yards'][0]:.2f} yd at {DEFAULT_FABRIC_WIDTH:g}\" wide)")
+        print(f"Interfacing: {consumption['interfacing_area'][0] * IN_TO_CM**2:.0f} cm^2 "
+              f"(about {consumption['interfacing_yards'][0]:.2f} yd at {DEFAULT_INTERFACING_WIDTH:g}\" wide)")
     except Exception as e:
-        logger.errormapsto(f"Error in output_product_details: {e}")
+        logger.error(f"Error in output_product_details: {e}")
         raise
 
-if __name__ == '__main__':
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Polo shirt sewing pattern generator.")
+    parser.add_argument('--size', type=str, default=None,
+                        help="Use a predefined (S, M, L) or chart-graded size (e.g. XS, 2XL) "
+                             "instead of the interactive prompt.")
+    parser.add_argument('--details-only', action='store_true',
+                        help="Print product details without rendering (matplotlib is not imported).")
+    parser.add_argument('--headless', action='store_true',
+                        help="Render on a non-interactive canvas and never open a window.")
+    parser.add_argument('--output-dir', default='.', help="Directory for the rendered pages.")
+    parser.add_argument('--format', default='png', choices=['png', 'pdf', 'svg'], help="Output file format.")
+    parser.add_argument('--svg-backend', choices=SVG_BACKENDS, default=DEFAULT_SVG_BACKEND,
+                        help="Write SVG pages directly (default) or through matplotlib.")
+    parser.add_argument('--tiled', type=str.lower, choices=list(PAPER_SIZES), default=None,
+                        help="Write a full-scale tiled PDF for this paper size instead of the preview pages.")
+    parser.add_argument('--tile-overlap', type=float, default=DEFAULT_OVERLAP,
+                        help="Overlap between neighbouring tiled pages in inches.")
+    parser.add_argument('--parallel', choices=['thread', 'process'], default=None,
+                        help="With --headless, render the three pages concurrently on this kind of pool.")
+    parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_DIR, default=None,
+                        help="With --headless, serve unchanged pages from this on-disk cache directory.")
+    parser.add_argument('--render-cache-mb', type=float, default=DEFAULT_RENDER_CACHE_BYTES / 2**20,
+                        help="Size bound of the render cache in MiB.")
+    parser.add_argument('--tolerance', default='screen',
+                        help=f"Curve flattening tolerance in inches or one of: {', '.join(FLATTEN_TOLERANCES)}.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.size:
+        try:
+            selected_size, final_measurements = size_measurements(args.size)
+        except Exception as e:
+            parser.error(str(e))
     try:
         logger.info("Starting Polo Shirt Pattern Generator")
-        print("Welcome to the Enhanced Polo Shirt Pattern Generator!")
-        selected_size, final_measurements = get_user_measurements()
+        preview = None
+        render_cache = None
+        if args.render_cache:
+            render_cache = DiskRenderCache(args.render_cache, int(args.render_cache_mb * 2**20))
+        if not args.size:
+            print("Welcome to the Enhanced Polo Shirt Pattern Generator!")
+            if not args.details_only and not args.tiled:
+                preview = PatternPreview(args.tolerance, args.headless, args.output_dir, args.format,
+                                         parallel=args.parallel, render_cache=render_cache,
+                                         svg_backend=args.svg_backend)
+            selected_size, final_measurements = get_user_measurements(preview)
         if final_measurements:
-            print("\nGenerating patterns... Check for PNG files: pattern_page1.png, pattern_page2.png, pattern_page3.png")
-            generate_pattern_visuals(selected_size, final_measurements)
-            output_product_details(selected_size, final_measurements)
+            # With --details-only, product_details evaluates just the neckline lengths it needs.
+            derived = None
+            if preview is not None and preview.geometry is not None:
+                # Pages from the last preview are already on disk; redraw only what changed since.
+                derived = preview(selected_size, final_measurements).derived
+            elif args.tiled:
+                os.makedirs(args.output_dir, exist_ok=True)
+                geometry = cached_build_polo_pattern(final_measurements, selected_size)
+                path = os.path.join(args.output_dir, f"pattern_tiled_{args.tiled}.pdf")
+                summary = save_tiled_pdf(path, geometry, paper=args.tiled, overlap=args.tile_overlap)
+                print(f"\nFull-scale pattern written to {path}: {summary['pages']} pages "
+                      f"(cover plus {summary['tiles']} tiles of a {summary['rows']} x {summary['columns']} grid)")
+                derived = geometry.derived
+            elif not args.details_only:
+                names = ', '.join(f"{name}.{args.format}" for name, _ in PAGE_RENDERERS)
+                print(f"\nGenerating patterns... Check for files in {args.output_dir}: {names}")
+                derived = generate_pattern_visuals(selected_size, final_measurements, args.tolerance, args.headless,
+                                                   args.output_dir, args.format, parallel=args.parallel,
+                                                   render_cache=render_cache, svg_backend=args.svg_backend).derived
+            output_product_details(selected_size, final_measurements, derived)
             print("\nPattern generation complete.")
         else:
             print("Pattern generation exited.")
+        return 0
     except Exception as e:
         logger.error(f"Main execution failed: {e}")
         print("An error occurred. Check the log for details.")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
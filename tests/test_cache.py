@@ -0,0 +1,39 @@
+import asyncio
+
+from pattern_batch import run_batch
+from pattern_cache import DiskRenderCache, shared_render_cache
+from pattern_geometry import PREDEFINED_MEASUREMENTS
+from pattern_service import PatternService
+
+def test_shared_render_cache_is_one_instance_per_directory_and_bound(tmp_path):
+    cache = shared_render_cache(str(tmp_path), 1024)
+    assert shared_render_cache(str(tmp_path / '.' ), 1024) is cache
+    assert shared_render_cache(str(tmp_path), 2048) is not cache
+
+def test_batch_jobs_scan_the_cache_once(tmp_path, monkeypatch):
+    scans = []
+    entries = DiskRenderCache.entries
+    monkeypatch.setattr(DiskRenderCache, 'entries', lambda self: scans.append(1) or entries(self))
+    jobs = [(size, measurements) for size, measurements in PREDEFINED_MEASUREMENTS.items()]
+    results = list(run_batch(jobs, workers=1, output_dir=str(tmp_path / 'out'), fmt='svg',
+                             render_cache_dir=str(tmp_path / 'cache')))
+    assert not any(result['error'] for result in results)
+    assert len(scans) == 1
+
+def test_service_serves_cached_pages_itself(tmp_path):
+    async def run():
+        service = PatternService(workers=1, render_cache_dir=str(tmp_path))
+        server = await service.start('127.0.0.1', 0)
+        try:
+            target = '/pages/pattern_page3.svg?size=S'
+            first = await service.handle_request('GET', target, b'')
+            jobs = service.stats['jobs']
+            second = await service.handle_request('GET', target, b'')
+            return first, second, jobs, service.stats['jobs'], service.render_cache.hits
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+    first, second, jobs_before, jobs_after, hits = asyncio.run(run())
+    assert first[0] == 200 and second == first
+    assert jobs_after == jobs_before and hits == 1
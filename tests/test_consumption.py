@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from pattern_consumption import measurement_columns, piece_areas
+from pattern_geometry import PIECE_NAMES, PREDEFINED_MEASUREMENTS, build_polo_pattern, signed_area
+
+@pytest.mark.parametrize('size', ['S', 'M', 'L'])
+def test_batch_areas_match_piece_cut_lines(size):
+    measurements = PREDEFINED_MEASUREMENTS[size]
+    geometry = build_polo_pattern(measurements, size)
+    # A fine flattening tolerance stands in for the exact curved cut lines.
+    expected = np.array([abs(signed_area(geometry.pieces[name].unfolded_cut_line(tolerance=1e-5)))
+                         for name in PIECE_NAMES])
+    areas = piece_areas(measurement_columns([measurements]))
+    assert areas.shape == (1, len(PIECE_NAMES))
+    np.testing.assert_allclose(areas[0], expected, rtol=1e-4)
+
+def test_batch_areas_do_not_depend_on_chunking():
+    measurements = [PREDEFINED_MEASUREMENTS[size] for size in ('S', 'M', 'L')]
+    together = piece_areas(measurement_columns(measurements))
+    apart = np.vstack([piece_areas(measurement_columns([m])) for m in measurements])
+    np.testing.assert_allclose(together, apart, rtol=1e-12)
@@ -0,0 +1,33 @@
+import io
+
+import pytest
+
+from pattern_dxf import resolve_sample_size, write_dxf
+from pattern_geometry import PREDEFINED_MEASUREMENTS, build_polo_pattern
+
+def export(geometries, **options):
+    stream = io.StringIO()
+    summary = write_dxf(stream, geometries, **options)
+    lines = stream.getvalue().splitlines()
+    return summary, [(code.strip(), value.strip()) for code, value in zip(lines[::2], lines[1::2])]
+
+def test_header_holds_only_r12_variables():
+    _, pairs = export([build_polo_pattern(PREDEFINED_MEASUREMENTS['M'], 'M')])
+    header = pairs[:pairs.index(('0', 'ENDSEC'))]
+    assert [value for code, value in header if code == '9'] == ['$ACADVER']
+    assert ('1', 'AC1009') in header
+
+def test_sizes_sharing_a_name_get_distinct_blocks():
+    geometries = [build_polo_pattern(PREDEFINED_MEASUREMENTS[size], 'M') for size in ('M', 'L')]
+    summary, pairs = export(geometries)
+    starts = [i for i, pair in enumerate(pairs) if pair == ('0', 'BLOCK')]
+    names = [next(value for code, value in pairs[i:] if code == '2') for i in starts]
+    assert len(names) == summary['blocks'] == len(set(names)) == 20
+
+def test_sample_size_resolves_to_a_chart_label():
+    sizes = ['Men/Size/S', 'Men/Size/M', 'Kids/Girls/Age/2 yrs', 'Kids/Boys/Age/2 yrs']
+    assert resolve_sample_size('M', sizes) == 'Men/Size/M'
+    assert resolve_sample_size(None, sizes) == 'Men/Size/S'
+    for ambiguous_or_missing in ('2 yrs', 'XL'):
+        with pytest.raises(ValueError):
+            resolve_sample_size(ambiguous_or_missing, sizes)
@@ -0,0 +1,24 @@
+import math
+
+import pytest
+
+from pattern_geometry import FLATTEN_TOLERANCES, PREDEFINED_MEASUREMENTS, build_polo_pattern, resolve_tolerance
+
+@pytest.mark.parametrize('name', list(FLATTEN_TOLERANCES))
+def test_tolerance_presets(name):
+    assert resolve_tolerance(name) == FLATTEN_TOLERANCES[name]
+
+@pytest.mark.parametrize('tolerance, expected', [('0.01', 0.01), (' 0.5 ', 0.5), ('1e-3', 0.001), (0.02, 0.02), (1, 1.0)])
+def test_numeric_tolerances(tolerance, expected):
+    assert resolve_tolerance(tolerance) == pytest.approx(expected)
+
+@pytest.mark.parametrize('tolerance', ['0', '-0.01', 0, -1.0, 'nan', 'inf', math.nan, 'fine', '', None, [0.1]])
+def test_invalid_tolerances(tolerance):
+    with pytest.raises(ValueError):
+        resolve_tolerance(tolerance)
+
+def test_numeric_tolerance_flattens_the_pattern():
+    geometry = build_polo_pattern(PREDEFINED_MEASUREMENTS['M'], 'M')
+    coarse = geometry.pieces['1. Front Body'].outline('0.05')
+    fine = geometry.pieces['1. Front Body'].outline('0.001')
+    assert len(fine) > len(coarse)
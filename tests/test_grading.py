@@ -0,0 +1,35 @@
+import pytest
+
+import pattern_grading
+from pattern_geometry import PREDEFINED_MEASUREMENTS
+from pattern_grading import chart_size_jobs, grading_range, row_chest, size_measurements
+
+def test_predefined_sizes_do_not_read_the_chart(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("size chart read for a predefined size")
+    monkeypatch.setattr(pattern_grading, 'load_size_chart', fail)
+    assert size_measurements('m') == ('M', PREDEFINED_MEASUREMENTS['M'])
+
+def test_graded_sizes_by_short_and_full_label():
+    name, measurements = size_measurements('2xl')
+    assert name == '2XL'
+    assert measurements['half_chest_flat'] > PREDEFINED_MEASUREMENTS['L']['half_chest_flat']
+    assert size_measurements('men/size/2xl')[1] == measurements
+
+def test_rows_outside_the_anchor_chart_are_not_graded():
+    low, high = grading_range()
+    labels = [label for label, _ in chart_size_jobs()]
+    assert 'Men/Size/XS' in labels and 'Men/Size/4XL' in labels
+    assert not any(label.startswith('Kids/') for label in labels)
+    with pytest.raises(ValueError):
+        size_measurements('Kids/Boys/Age/2 yrs')
+    chart = pattern_grading.load_size_chart()
+    for path, row in pattern_grading.iter_size_chart(chart):
+        if '/'.join(path) in labels:
+            assert low <= row_chest(row) <= high
+
+def test_skipped_chart_rows_are_reported():
+    skipped = []
+    labels = [label for label, _ in chart_size_jobs(quiet=True, skipped=skipped)]
+    assert len(labels) + len(skipped) == sum(1 for _ in pattern_grading.iter_size_chart(pattern_grading.load_size_chart()))
+    assert ('Kids/Boys/Age/2 yrs', 'chest 20.5 outside the graded range 35-54') in skipped
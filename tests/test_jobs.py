@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from pattern_jobs import resolve_request, stream_jobs
+
+def run(requests, tmp_path, **options):
+    lines = [json.dumps(request) + '\n' for request in requests]
+    return list(stream_jobs(lines, workers=1, output_dir=str(tmp_path), fmt='svg', **options))
+
+def test_colliding_output_directories_are_reported(tmp_path):
+    results = run([{'id': 'a_b', 'size': 'S'}, {'id': 'a/b', 'size': 'M'}, {'id': 'a_b', 'size': 'L'},
+                   {'id': 'c', 'size': 'M'}], tmp_path)
+    assert results[0]['error'] is None and results[3]['error'] is None
+    for result in results[1:3]:
+        assert 'already used by the request on line 1' in result['error']
+        assert result['outputs'] == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['a_b', 'c']
+
+def test_collisions_do_not_matter_without_rendering(tmp_path):
+    results = run([{'id': 'x', 'size': 'S'}, {'id': 'x', 'size': 'M'}], tmp_path, render=False)
+    assert [result['error'] for result in results] == [None, None]
+
+@pytest.mark.parametrize('value', [True, False, -1, 0, 'nan', None, 'wide'])
+def test_invalid_measurements_are_rejected(value):
+    with pytest.raises(ValueError):
+        resolve_request({'size': 'M', 'measurements': {'half_chest_flat': value}}, 1)
+
+def test_dot_ids_stay_inside_the_output_directory(tmp_path):
+    out = tmp_path / 'out'
+    results = run([{'id': '..', 'size': 'M'}], out)
+    assert results[0]['error'] is None
+    assert all(path.startswith(str(out / 'size')) for path in results[0]['outputs'])
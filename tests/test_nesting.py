@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from pattern_cache import cached_build_polo_pattern
+from pattern_geometry import PREDEFINED_MEASUREMENTS
+from pattern_nesting import DEFAULT_SPACING, PLACEMENT_METHODS, bottom_left_fill, order_pieces, polygons_overlap
+
+def edge_distance(points, polygon):
+    """Smallest distance from any of points to the edges of polygon."""
+    a = polygon
+    edge = np.roll(polygon, -1, axis=0) - a
+    length2 = np.maximum(np.einsum('ij,ij->i', edge, edge), 1e-18)
+    offset = points[:, None, :] - a
+    t = np.clip(np.einsum('pij,ij->pi', offset, edge) / length2, 0.0, 1.0)
+    return float(np.hypot(*(offset - t[..., None] * edge).transpose(2, 0, 1)).min())
+
+def min_clearance(marker):
+    """Smallest distance between two placed pieces; -inf if any overlap."""
+    polygons = [p.polygon for p in marker.placements]
+    best = np.inf
+    for i, a in enumerate(polygons):
+        for b in polygons[i + 1:]:
+            if polygons_overlap(a, b):
+                return -np.inf
+            best = min(best, edge_distance(a, b), edge_distance(b, a))
+    return best
+
+@pytest.mark.parametrize('method', PLACEMENT_METHODS)
+@pytest.mark.parametrize('size', ['S', 'M', 'L'])
+def test_pieces_keep_spacing(size, method):
+    geometry = cached_build_polo_pattern(PREDEFINED_MEASUREMENTS[size], size)
+    marker = bottom_left_fill(order_pieces(geometry, garments=2), 60.0, spacing=DEFAULT_SPACING, method=method)
+    assert min_clearance(marker) >= DEFAULT_SPACING - 1e-9
+    for placement in marker.placements:
+        x0, y0, x1, _ = placement.box
+        assert x0 >= -1e-9 and y0 >= -1e-9 and x1 <= 60.0 + 1e-9
+
+@pytest.mark.parametrize('method', PLACEMENT_METHODS)
+def test_wider_spacing_is_kept(method):
+    geometry = cached_build_polo_pattern(PREDEFINED_MEASUREMENTS['M'], 'M')
+    marker = bottom_left_fill(order_pieces(geometry), 60.0, spacing=0.5, method=method)
+    assert min_clearance(marker) >= 0.5 - 1e-9
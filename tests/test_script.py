@@ -0,0 +1,25 @@
+import pytest
+
+import script
+
+# Names the original single-module script.py defined
+ORIGINAL_NAMES = [
+    'IN_TO_CM', 'PREDEFINED_MEASUREMENTS', 'dist', 'get_path_length', 'quadratic_bezier',
+    'generate_bezier_points', 'offset_bezier_curve', 'draw_straight_seam_allowance',
+    'draw_bezier_seam_allowance', 'draw_grainline', 'find_max_y_bezier', 'draw_notch',
+    'annotate_straight_edges', 'annotate_rectangle_dimensions', 'get_user_measurements',
+    'draw_pattern_piece_with_details', 'generate_pattern_visuals', 'output_product_details',
+]
+
+@pytest.mark.parametrize('name', ORIGINAL_NAMES)
+def test_original_names_are_still_exported(name):
+    assert hasattr(script, name)
+    assert name in script.__all__
+
+def test_all_names_exist():
+    assert [name for name in script.__all__ if not hasattr(script, name)] == []
+
+def test_curve_helpers_still_work_through_script():
+    p0, p1, p2 = (0.0, 0.0), (1.0, 2.0), (2.0, 0.0)
+    assert script.quadratic_bezier(p0, p1, p2, 0.5) == pytest.approx((1.0, 1.0))
+    assert script.find_max_y_bezier(p0, p1, p2) == pytest.approx((1.0, 1.0))
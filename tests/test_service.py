@@ -0,0 +1,47 @@
+import asyncio
+import json
+
+import pytest
+
+from pattern_service import PatternService
+
+@pytest.fixture(scope='module')
+def service():
+    loop = asyncio.new_event_loop()
+    service = PatternService(workers=1)
+    server = loop.run_until_complete(service.start('127.0.0.1', 0))
+    yield loop, service
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    service.close()
+    loop.close()
+
+def request(service, target):
+    loop, service = service
+    return loop.run_until_complete(service.handle_request('GET', target, b''))
+
+def test_numeric_tolerance_renders_a_page(service):
+    status, content_type, data = request(service, '/pages/pattern_page2.svg?size=M&tolerance=0.01')
+    assert (status, content_type) == (200, 'svg')
+    assert data.lstrip().startswith(b'<?xml') or b'<svg' in data[:500]
+
+def test_numeric_tolerance_sets_geometry_cut_lines(service):
+    coarse = json.loads(request(service, '/geometry?size=M&tolerance=0.05')[2])
+    fine = json.loads(request(service, '/geometry?size=M&tolerance=0.001')[2])
+    vertices = lambda payload: sum(len(p['cut_line'] or ()) for p in payload['pieces'])
+    assert vertices(fine) > vertices(coarse)
+
+@pytest.mark.parametrize('target', ['/geometry?size=M&tolerance=0', '/geometry?size=M&tolerance=fine',
+                                    '/geometry?size=M&half_chest_flat=-1', '/details?size=XXXL'])
+def test_invalid_requests_are_client_errors(service, target):
+    assert request(service, target)[0] == 400
+
+def test_internal_lookup_errors_are_server_errors(service, monkeypatch):
+    import pattern_service
+
+    def broken(measurements):
+        raise KeyError('neck_curve')
+    monkeypatch.setattr(pattern_service, 'product_details', broken)
+    errors = service[1].stats['errors']
+    assert request(service, '/details?size=M')[0] == 500
+    assert service[1].stats['errors'] == errors + 1